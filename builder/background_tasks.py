@@ -0,0 +1,330 @@
+"""Background task execution for the editor with a Tk main-thread bridge.
+
+Task functions run on a worker pool and must not touch Tk widgets. They get a
+:class:`TaskContext` as first argument for progress reporting and cooperative
+cancellation. Results, errors and progress are posted to a thread-safe queue
+that the Tk thread drains with ``root.after``; completion callbacks therefore
+always run on the Tk thread.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+ACTIVE_STATES = {"queued", "running"}
+
+# Finished tasks kept for the task panel.
+MAX_FINISHED_TASKS = 50
+
+# Worker threads of the runner for short preview jobs such as thumbnails.
+PREVIEW_WORKERS = 2
+
+
+class TaskCancelled(BaseException):
+    """Raised inside a task once its cancellation token is set.
+
+    Derives from BaseException so broad ``except Exception`` handlers in task
+    code do not swallow a cancellation.
+    """
+
+
+class TaskContext:
+    """Progress and cancellation handle given to a running task function."""
+
+    def __init__(self, runner: "BackgroundTaskRunner", task_id: int) -> None:
+        self._runner = runner
+        self.task_id = task_id
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def check(self) -> None:
+        """Raise :class:`TaskCancelled` when cancellation was requested."""
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def report(self, done: int, total: Optional[int] = None, message: str = "") -> None:
+        """Publish progress and honour cancellation at the same point."""
+        self.check()
+        self._runner._post(("progress", self.task_id, done, total, message))
+
+
+class BackgroundTask:
+    """State of one submitted task as seen from the Tk thread."""
+
+    def __init__(self, task_id: int, title: str, context: TaskContext, key: Optional[str] = None) -> None:
+        self.task_id = task_id
+        self.title = title
+        self.context = context
+        self.key = key
+        self.status = "queued"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.error_details = ""
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self.on_error: Optional[Callable[[BaseException], None]] = None
+        self.on_cancel: Optional[Callable[[], None]] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    def cancel(self) -> None:
+        self.context.cancel()
+
+    def progress_text(self) -> str:
+        if self.total:
+            percent = int(100 * min(self.done, self.total) / self.total)
+            return f"{self.done}/{self.total} ({percent}%)"
+        if self.done:
+            return str(self.done)
+        return ""
+
+
+class BackgroundTaskRunner:
+    """Thread pool whose task results are delivered on the Tk thread."""
+
+    def __init__(self, root, max_workers: int = 4, poll_ms: int = 60) -> None:
+        self.root = root
+        self.poll_ms = poll_ms
+        self.max_workers = max_workers
+        # Created on first submit so an idle runner costs nothing at startup.
+        self._executor = None
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._tasks: Dict[int, BackgroundTask] = {}
+        self._ids = itertools.count(1)
+        self._listeners: List[Callable[["BackgroundTaskRunner"], None]] = []
+        self._poll_job = None
+        self._closed = False
+        try:
+            root.bind("<Destroy>", self._on_root_destroy, add="+")
+        except Exception:
+            pass
+
+    # -- Submission (Tk thread) ----------------------------------------
+
+    def submit(self, title: str, func: Callable, *args,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_cancel: Optional[Callable[[], None]] = None,
+               key: Optional[str] = None, **kwargs) -> BackgroundTask:
+        """Run ``func(context, *args, **kwargs)`` on a worker thread.
+
+        When ``key`` is given and a task with the same key is still active,
+        that task is returned instead of starting a duplicate.
+        """
+        if key is not None:
+            for task in self._tasks.values():
+                if task.key == key and task.active:
+                    return task
+
+        task_id = next(self._ids)
+        task = BackgroundTask(task_id, title, TaskContext(self, task_id), key=key)
+        task.on_done = on_done
+        task.on_error = on_error
+        task.on_cancel = on_cancel
+        self._tasks[task_id] = task
+        self._prune_finished()
+
+        if self._closed:
+            task.status = "cancelled"
+            return task
+
+        self._ensure_executor().submit(self._run, task, func, args, kwargs)
+        self._schedule_poll()
+        self._notify()
+        return task
+
+    def cancel(self, task_id: int) -> None:
+        task = self._tasks.get(task_id)
+        if task is not None and task.active:
+            task.cancel()
+            task.message = "Cancelling..."
+            self._notify()
+
+    def cancel_all(self) -> None:
+        for task in self._tasks.values():
+            if task.active:
+                task.cancel()
+
+    def tasks(self) -> List[BackgroundTask]:
+        return list(self._tasks.values())
+
+    def active_tasks(self) -> List[BackgroundTask]:
+        return [task for task in self._tasks.values() if task.active]
+
+    def clear_finished(self) -> None:
+        for task_id in [tid for tid, task in self._tasks.items() if not task.active]:
+            del self._tasks[task_id]
+        self._notify()
+
+    def add_listener(self, callback: Callable[["BackgroundTaskRunner"], None]) -> None:
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[["BackgroundTaskRunner"], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def shutdown(self) -> None:
+        """Cancel everything and stop accepting work."""
+        self._closed = True
+        self.cancel_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="editor-task")
+        return self._executor
+
+    # -- Worker side ---------------------------------------------------
+
+    def _post(self, event: tuple) -> None:
+        self._queue.put(event)
+
+    def _run(self, task: BackgroundTask, func: Callable, args: tuple, kwargs: dict) -> None:
+        context = task.context
+        if context.cancelled:
+            self._post(("cancelled", task.task_id))
+            return
+        self._post(("started", task.task_id))
+        try:
+            result = func(context, *args, **kwargs)
+        except TaskCancelled:
+            self._post(("cancelled", task.task_id))
+        except BaseException as exc:
+            self._post(("failed", task.task_id, exc, traceback.format_exc()))
+        else:
+            # Work that ran to completion is delivered even if cancel came late.
+            self._post(("done", task.task_id, result))
+
+    # -- Tk thread bridge ----------------------------------------------
+
+    def _schedule_poll(self) -> None:
+        if self._poll_job is None and not self._closed:
+            try:
+                self._poll_job = self.root.after(self.poll_ms, self._drain)
+            except Exception:
+                self._poll_job = None
+
+    def _drain(self) -> None:
+        self._poll_job = None
+        changed = False
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._apply(event)
+            changed = True
+
+        if changed:
+            self._notify()
+        if any(task.active for task in self._tasks.values()):
+            self._schedule_poll()
+
+    def _apply(self, event: tuple) -> None:
+        kind, task_id = event[0], event[1]
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+
+        if kind == "started":
+            task.status = "running"
+            return
+        if kind == "progress":
+            _, _, done, total, message = event
+            task.done = done
+            task.total = total
+            if message:
+                task.message = message
+            return
+
+        task.finished_at = time.time()
+        callback = None
+        callback_args: tuple = ()
+        if kind == "done":
+            task.status = "done"
+            task.result = event[2]
+            if task.total:
+                task.done = task.total
+            task.message = "Completed"
+            callback, callback_args = task.on_done, (task.result,)
+        elif kind == "failed":
+            task.status = "failed"
+            task.error = event[2]
+            task.error_details = event[3]
+            task.message = str(task.error) or type(task.error).__name__
+            callback, callback_args = task.on_error, (task.error,)
+            if callback is None:
+                print(f"Background task '{task.title}' failed:\n{task.error_details}")
+        elif kind == "cancelled":
+            task.status = "cancelled"
+            task.message = "Cancelled"
+            callback = task.on_cancel
+
+        if callback is not None:
+            try:
+                callback(*callback_args)
+            except Exception:
+                print(f"Background task '{task.title}' callback failed:\n{traceback.format_exc()}")
+
+    def _notify(self) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception:
+                print(f"Task listener failed:\n{traceback.format_exc()}")
+
+    def _prune_finished(self) -> None:
+        finished = [task for task in self._tasks.values() if not task.active]
+        for task in finished[:max(0, len(finished) - MAX_FINISHED_TASKS)]:
+            del self._tasks[task.task_id]
+
+    def _on_root_destroy(self, event=None) -> None:
+        if event is not None and event.widget is not self.root:
+            return
+        self.shutdown()
+
+
+def get_task_runner(widget) -> BackgroundTaskRunner:
+    """Return the shared task runner for the Tk root that owns ``widget``."""
+    root = widget._root() if hasattr(widget, "_root") else widget
+    runner = getattr(root, "_background_task_runner", None)
+    if runner is None:
+        runner = BackgroundTaskRunner(root)
+        root._background_task_runner = runner
+    return runner
+
+
+def get_preview_runner(widget) -> BackgroundTaskRunner:
+    """Return the runner for short preview jobs of the Tk root that owns ``widget``.
+
+    It is separate from :func:`get_task_runner` and the task panel does not
+    list it, so previews requested while browsing questions neither crowd
+    the panel nor push real results out of its history.
+    """
+    root = widget._root() if hasattr(widget, "_root") else widget
+    runner = getattr(root, "_preview_task_runner", None)
+    if runner is None:
+        runner = BackgroundTaskRunner(root, max_workers=PREVIEW_WORKERS)
+        root._preview_task_runner = runner
+    return runner
@@ -0,0 +1,115 @@
+"""Startup-time benchmark for the editor.
+
+Usage:
+    python builder/bench_startup.py [--runs 5] [--budget-ms 250]
+
+Each run starts a fresh interpreter so import caches do not hide regressions.
+It measures how long ``import editor`` takes, how long it takes until the main
+window has painted, and when the section list has been loaded in the
+background. Without a display only the import phase is reported. With
+``--budget-ms``, the exit status is 1 when the median time to first paint (or
+the median import time if no display is available) goes over the budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BUILDER_DIR = Path(__file__).resolve().parent
+
+# Runs inside the child interpreter; prints one JSON line with timings in ms.
+_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {builder!r})
+import editor
+timings = {{"import_ms": (time.perf_counter() - start) * 1000}}
+try:
+    import ttkbootstrap as ttk
+    root = ttk.Window(title="Startup benchmark", themename="darkly", size=(1480, 860))
+except Exception as exc:
+    timings["display"] = str(exc)
+    print(json.dumps(timings))
+    sys.exit(0)
+style = ttk.Style()
+editor._configure_custom_styles(style)
+app = editor.ExamEditor(root)
+root.update()
+timings["first_paint_ms"] = (time.perf_counter() - start) * 1000
+deadline = time.perf_counter() + 10
+while not app.sections and app.task_runner.active_tasks() and time.perf_counter() < deadline:
+    root.update()
+    time.sleep(0.002)
+root.update()
+timings["sections_loaded_ms"] = (time.perf_counter() - start) * 1000
+timings["sections"] = len(app.sections)
+root.destroy()
+print(json.dumps(timings))
+"""
+
+
+def run_once() -> Dict[str, float]:
+    """Start the editor in a fresh interpreter and return its timings."""
+    code = _PROBE.format(builder=str(BUILDER_DIR))
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(completed.stderr.strip() or "benchmark probe produced no output")
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Return min/median/max for every timing present in all samples."""
+    keys = [key for key in ("import_ms", "first_paint_ms", "sections_loaded_ms")
+            if all(key in sample for sample in samples)]
+    summary = {}
+    for key in keys:
+        values = [sample[key] for sample in samples]
+        summary[key] = {
+            "min": min(values),
+            "median": statistics.median(values),
+            "max": max(values),
+        }
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail when the median startup time exceeds this many milliseconds")
+    args = parser.parse_args(argv)
+
+    samples = [run_once() for _ in range(max(1, args.runs))]
+    summary = summarize(samples)
+
+    print(f"Editor startup over {len(samples)} cold run(s):")
+    for key, stats in summary.items():
+        print(f"  {key:<20} median {stats['median']:8.1f}  min {stats['min']:8.1f}  max {stats['max']:8.1f}")
+    if "display" in samples[0]:
+        print(f"  (no display: {samples[0]['display']})")
+
+    if args.budget_ms is not None:
+        gate = "first_paint_ms" if "first_paint_ms" in summary else "import_ms"
+        median = summary[gate]["median"]
+        if median > args.budget_ms:
+            print(f"FAIL: {gate} median {median:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+            return 1
+        print(f"OK: {gate} median {median:.1f} ms within budget {args.budget_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
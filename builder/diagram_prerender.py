@@ -0,0 +1,193 @@
+"""Publish-time pre-rendering of Graphviz diagram blocks to static SVG.
+
+When a local ``dot`` binary is available, every fenced block that
+:func:`diagram_support.resolve_engine` classifies as Graphviz is rendered to
+``assets/diagrams/<key>.svg``. ``<key>`` is :func:`diagram_key` of the block
+code, which ``js/diagram-handler.js`` computes the same way, and
+``assets/diagrams/manifest.json`` maps keys to files. The browser uses the
+pre-rendered SVG when the manifest lists the block and only loads Viz.js for
+blocks it does not know. Existing SVGs are reused, so only new or edited
+diagrams are rendered again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from diagram_support import iter_corpus_blocks, resolve_engine
+
+DIAGRAM_ASSET_DIR = "assets/diagrams"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Question fields that may contain diagram blocks.
+DIAGRAM_FIELDS = ("text", "explanation")
+
+RENDER_TIMEOUT = 30
+MAX_RENDER_WORKERS = 4
+
+_MASK32 = 0xFFFFFFFF
+
+
+def _imul(a: int, b: int) -> int:
+    return (a * b) & _MASK32
+
+
+def diagram_key(code: str) -> str:
+    """Return the cyrb53 hash of ``code`` as hex, matching ``DiagramHandler._diagramKey``.
+
+    The hash runs over UTF-16 code units like JavaScript's ``charCodeAt``.
+    """
+    h1 = 0xDEADBEEF
+    h2 = 0x41C6CE57
+    data = str(code).strip().encode("utf-16-le")
+    for i in range(0, len(data), 2):
+        ch = data[i] | (data[i + 1] << 8)
+        h1 = _imul(h1 ^ ch, 2654435761)
+        h2 = _imul(h2 ^ ch, 1597334677)
+    h1 = _imul(h1 ^ (h1 >> 16), 2246822507)
+    h1 ^= _imul(h2 ^ (h2 >> 13), 3266489909)
+    h2 = _imul(h2 ^ (h2 >> 16), 2246822507)
+    h2 ^= _imul(h1 ^ (h1 >> 13), 3266489909)
+    return format(4294967296 * (2097151 & h2) + h1, "x")
+
+
+def find_dot() -> Optional[str]:
+    """Return the path of the Graphviz ``dot`` binary, or None when it is not installed."""
+    return shutil.which("dot")
+
+
+def render_dot_svg(code: str, dot_path: str, timeout: float = RENDER_TIMEOUT) -> str:
+    """Render DOT source to an SVG string with the ``dot`` binary."""
+    completed = subprocess.run(
+        [dot_path, "-Tsvg"],
+        input=code.encode("utf-8"),
+        capture_output=True,
+        timeout=timeout,
+    )
+    if completed.returncode != 0:
+        message = completed.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(message or f"dot exited with status {completed.returncode}")
+    svg = completed.stdout.decode("utf-8")
+    # Drop the XML prolog and DOCTYPE so the file can be inlined into HTML.
+    start = svg.find("<svg")
+    return svg[start:] if start >= 0 else svg
+
+
+def _load_json(path: Path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def _iter_question_texts(base_path: Path, sections: Iterable[Dict]) -> Iterator[Tuple[str, str]]:
+    """Yield ``(subject_id, text)`` for every diagram-capable field in the project."""
+    for section in sections or []:
+        section_rel = str(section.get("path", "")).strip()
+        if not section_rel:
+            continue
+        section_dir = base_path / section_rel
+        try:
+            chapters = _load_json(section_dir / "chapters.json")
+        except (OSError, ValueError):
+            continue
+        if not isinstance(chapters, list):
+            continue
+        for chapter in chapters:
+            if not isinstance(chapter, dict) or not chapter.get("file"):
+                continue
+            try:
+                payload = _load_json(section_dir / chapter["file"])
+            except (OSError, ValueError):
+                continue
+            data = payload[0] if isinstance(payload, list) and payload else payload
+            questions = data.get("questions", []) if isinstance(data, dict) else []
+            for question in questions if isinstance(questions, list) else []:
+                if not isinstance(question, dict):
+                    continue
+                for field in DIAGRAM_FIELDS:
+                    text = question.get(field)
+                    if text:
+                        yield section_dir.name, str(text)
+
+
+def collect_graphviz_blocks(base_path, sections: Iterable[Dict]) -> Dict[str, str]:
+    """Return ``{key: code}`` for every Graphviz block in the project."""
+    blocks: Dict[str, str] = {}
+    for subject_id, block in iter_corpus_blocks(_iter_question_texts(Path(base_path), sections)):
+        code = block["code"]
+        if code and resolve_engine(block["lang"], code, subject_id) == "graphviz":
+            blocks.setdefault(diagram_key(code), code)
+    return blocks
+
+
+def prerender_graphviz(base_path, sections: Iterable[Dict], context=None,
+                       dot_path: Optional[str] = None) -> Dict[str, int]:
+    """Render the project's Graphviz blocks to SVG and rewrite the manifest.
+
+    Returns counts of ``blocks``, ``rendered``, ``cached`` and ``failed``
+    blocks. Without a ``dot`` binary nothing is touched and ``available`` is 0.
+    Blocks that fail to render are left out of the manifest so the browser
+    falls back to Viz.js for them.
+    """
+    dot_path = dot_path or find_dot()
+    stats = {"available": 1 if dot_path else 0, "blocks": 0, "rendered": 0, "cached": 0, "failed": 0, "removed": 0}
+    if not dot_path:
+        return stats
+
+    base = Path(base_path)
+    asset_dir = base / DIAGRAM_ASSET_DIR
+    blocks = collect_graphviz_blocks(base, sections)
+    stats["blocks"] = len(blocks)
+
+    entries: Dict[str, str] = {}
+    pending = []
+    for key, code in blocks.items():
+        if (asset_dir / f"{key}.svg").exists():
+            entries[key] = f"{DIAGRAM_ASSET_DIR}/{key}.svg"
+            stats["cached"] += 1
+        else:
+            pending.append((key, code))
+
+    if pending:
+        asset_dir.mkdir(parents=True, exist_ok=True)
+
+    def render(item):
+        key, code = item
+        svg = render_dot_svg(code, dot_path)
+        target = asset_dir / f"{key}.svg"
+        temp_path = target.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(svg)
+        os.replace(temp_path, target)
+        return key
+
+    with ThreadPoolExecutor(max_workers=MAX_RENDER_WORKERS) as executor:
+        futures = [(item[0], executor.submit(render, item)) for item in pending]
+        for done, (key, future) in enumerate(futures):
+            if context is not None:
+                context.report(done, len(futures), "Rendering Graphviz diagrams")
+            try:
+                future.result()
+            except Exception as exc:
+                stats["failed"] += 1
+                print(f"Graphviz pre-render failed for {key}: {exc}")
+                continue
+            entries[key] = f"{DIAGRAM_ASSET_DIR}/{key}.svg"
+            stats["rendered"] += 1
+
+    # Diagrams no longer used by any question are dropped with the manifest entry.
+    if asset_dir.exists():
+        for svg_path in asset_dir.glob("*.svg"):
+            if svg_path.stem not in entries:
+                svg_path.unlink()
+                stats["removed"] += 1
+        manifest = {"version": MANIFEST_VERSION, "graphviz": dict(sorted(entries.items()))}
+        with open(asset_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    return stats
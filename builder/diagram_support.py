@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from markdown_tokens import fenced_blocks
 
 LANGUAGE_ALIASES = {
     "mermaid": "mermaid",
@@ -31,26 +33,51 @@ SUBJECT_ENGINE_MAP = {
     "algorithm": ["mermaid"],
 }
 
-FENCED_BLOCK_RE = re.compile(r"```([a-zA-Z0-9_\-]*)\n([\s\S]*?)```")
 
+def iter_fenced_blocks(text: str) -> Iterator[Dict[str, str]]:
+    """Yield fenced code blocks with language and line number metadata.
 
-def extract_fenced_blocks(text: str) -> List[Dict[str, str]]:
-    """Extract fenced code blocks with language and line number metadata."""
+    Line numbers are counted incrementally from the previous block, so the
+    whole text is scanned for newlines only once.
+    """
     src = str(text or "")
-    blocks: List[Dict[str, str]] = []
-
-    for match in FENCED_BLOCK_RE.finditer(src):
-        lang = (match.group(1) or "").strip().lower()
-        code = (match.group(2) or "").strip()
-        start_pos = match.start()
-        line_number = src.count("\n", 0, start_pos) + 1
-        blocks.append({
-            "lang": lang,
-            "code": code,
+    line_number = 1
+    pos = 0
+
+    for token in fenced_blocks(src):
+        line_number += src.count("\n", pos, token.start)
+        pos = token.start
+        yield {
+            "lang": token.lang.strip().lower(),
+            "code": token.inner(src).strip(),
             "line": line_number,
-        })
+        }
+
+
+def extract_fenced_blocks(text: str) -> List[Dict[str, str]]:
+    """Extract fenced code blocks with language and line number metadata."""
+    return list(iter_fenced_blocks(text))
+
 
-    return blocks
+def iter_corpus_blocks(items: Iterable[Tuple[Any, str]]) -> Iterator[Tuple[Any, Dict[str, str]]]:
+    """Yield ``(location, block)`` for every fenced block of ``(location, text)`` items.
+
+    ``location`` is passed through untouched, so callers can stream whole
+    chapters or projects and still tell where each block came from.
+    """
+    for location, text in items:
+        if not text or "```" not in text:
+            continue
+        for block in iter_fenced_blocks(text):
+            yield location, block
+
+
+_GRAPHVIZ_CODE_RE = re.compile(r"^\s*(graph\s+\w+|digraph\s+\w+)", re.IGNORECASE)
+_MERMAID_CODE_RE = re.compile(r"\b(flowchart|sequenceDiagram|classDiagram|erDiagram|stateDiagram|mindmap)\b", re.IGNORECASE)
+_NOMNOML_TITLE_RE = re.compile(r"^\s*#?title\s*:", re.IGNORECASE)
+_NOMNOML_EDGE_RE = re.compile(r"\[[^\]]+\]\s*[-:o+<>*]+\s*\[[^\]]+\]")
+
+PLAIN_LANGUAGES = {"", "plain", "text", "plaintext"}
 
 
 def resolve_engine(lang: str, code: str = "", subject_id: str = "") -> str:
@@ -60,11 +87,11 @@ def resolve_engine(lang: str, code: str = "", subject_id: str = "") -> str:
         return LANGUAGE_ALIASES[lang_key]
 
     code_text = str(code or "")
-    if re.search(r"^\s*(graph\s+\w+|digraph\s+\w+)", code_text, flags=re.IGNORECASE):
+    if _GRAPHVIZ_CODE_RE.search(code_text):
         return "graphviz"
-    if re.search(r"\b(flowchart|sequenceDiagram|classDiagram|erDiagram|stateDiagram|mindmap)\b", code_text, flags=re.IGNORECASE):
+    if _MERMAID_CODE_RE.search(code_text):
         return "mermaid"
-    if re.search(r"^\s*#?title\s*:", code_text, flags=re.IGNORECASE) or re.search(r"\[[^\]]+\]\s*[-:o+<>*]+\s*\[[^\]]+\]", code_text):
+    if _NOMNOML_TITLE_RE.search(code_text) or _NOMNOML_EDGE_RE.search(code_text):
         return "nomnoml"
 
     if lang_key in {"diagram", "chart"}:
@@ -75,32 +102,33 @@ def resolve_engine(lang: str, code: str = "", subject_id: str = "") -> str:
     return ""
 
 
-def validate_diagram_blocks(text: str, subject_id: str = "") -> List[Dict[str, str]]:
-    """Return warnings for malformed or unsupported diagram fences."""
-    warnings: List[Dict[str, str]] = []
-
-    for block in extract_fenced_blocks(text):
+def iter_diagram_warnings(items: Iterable[Tuple[Any, str]], subject_id: str = "") -> Iterator[Tuple[Any, Dict[str, str]]]:
+    """Yield ``(location, warning)`` for malformed or unsupported diagram fences."""
+    for location, block in iter_corpus_blocks(items):
         lang = block["lang"]
         code = block["code"]
         line = block["line"]
 
-        if lang in {"", "plain", "text", "plaintext"}:
+        if lang in PLAIN_LANGUAGES:
             continue
 
         engine = resolve_engine(lang, code, subject_id)
         if not engine:
-            warnings.append({
+            yield location, {
                 "line": str(line),
                 "lang": lang,
                 "message": f"Unknown diagram language '{lang}'."
-            })
+            }
             continue
 
         if not code.strip():
-            warnings.append({
+            yield location, {
                 "line": str(line),
                 "lang": lang,
                 "message": "Diagram block is empty."
-            })
+            }
+
 
-    return warnings
+def validate_diagram_blocks(text: str, subject_id: str = "") -> List[Dict[str, str]]:
+    """Return warnings for malformed or unsupported diagram fences."""
+    return [warning for _, warning in iter_diagram_warnings([(None, str(text or ""))], subject_id)]
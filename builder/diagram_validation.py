@@ -0,0 +1,283 @@
+"""Project-wide diagram block validation with an on-disk result cache.
+
+:class:`ProjectDiagramValidator` runs
+:func:`diagram_support.iter_diagram_warnings` over the question text and
+explanation of every chapter in a project. Warnings are cached per text hash
+and chapter files are re-read only when their size or modification time
+changed, so re-validating after editing one chapter only touches that file.
+Uncached texts are validated in a process pool when there are enough of them
+to pay for starting the workers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from diagram_support import iter_diagram_warnings
+from editor_cache import cache_dir_for
+
+CACHE_FILE_NAME = "diagram_validation.json"
+REPORT_FILE_NAME = "diagram_report.json"
+CACHE_VERSION = 1
+
+# Question fields checked for diagram blocks.
+VALIDATED_FIELDS = ("text", "explanation")
+
+# Below this many uncached texts the pool start-up costs more than it saves.
+PARALLEL_MIN_TEXTS = 200
+BATCH_SIZE = 100
+
+
+def text_key(text: str, subject_id: str = "") -> str:
+    """Cache key of one text; the subject takes part because it picks engines."""
+    digest = hashlib.sha1()
+    digest.update(str(subject_id).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _validate_batch(subject_id: str, items: List[Tuple[str, str]]) -> Dict[str, list]:
+    """Validate ``(key, text)`` items of one subject; runs in a worker process."""
+    results: Dict[str, list] = {key: [] for key, _ in items}
+    for key, warning in iter_diagram_warnings(items, subject_id=subject_id):
+        results[key].append(warning)
+    return results
+
+
+def _load_json(path: Path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def _chapter_questions(path: Path) -> list:
+    payload = _load_json(path)
+    data = payload[0] if isinstance(payload, list) and payload else payload
+    if not isinstance(data, dict):
+        return []
+    questions = data.get("questions", [])
+    return questions if isinstance(questions, list) else []
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+class ProjectDiagramValidator:
+    """Validates diagram blocks across a project, reusing cached results.
+
+    Not thread-safe; run one validation at a time (the editor submits it as a
+    keyed background task).
+    """
+
+    def __init__(self, base_path) -> None:
+        self.base_path = Path(base_path)
+        self.cache_path = cache_dir_for(self.base_path) / CACHE_FILE_NAME
+        self.report_path = cache_dir_for(self.base_path) / REPORT_FILE_NAME
+        self._files: Dict[str, Dict] = {}
+        self._results: Dict[str, list] = {}
+        self._loaded = False
+
+    # -- Cache ---------------------------------------------------------
+
+    def load_cache(self) -> None:
+        self._loaded = True
+        try:
+            payload = _load_json(self.cache_path)
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("version") != CACHE_VERSION:
+            return
+        self._files = payload.get("files") or {}
+        self._results = payload.get("results") or {}
+
+    def save_cache(self) -> None:
+        # Keep only results still referenced by some chapter file.
+        used = {field[3] for entry in self._files.values() for field in entry["fields"]}
+        self._results = {key: value for key, value in self._results.items() if key in used}
+        payload = {"version": CACHE_VERSION, "files": self._files, "results": self._results}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, self.cache_path)
+
+    def clear_cache(self) -> None:
+        self._files = {}
+        self._results = {}
+        self._loaded = True
+        try:
+            self.cache_path.unlink()
+        except OSError:
+            pass
+
+    # -- Validation ----------------------------------------------------
+
+    def validate(self, sections: Iterable[Dict], context=None, max_workers: Optional[int] = None) -> Dict:
+        """Validate every chapter listed in ``sections`` and return a report.
+
+        ``context`` is an optional background-task context used for progress
+        and cancellation. The cache is saved and the report written to
+        :attr:`report_path` before returning.
+        """
+        started = time.perf_counter()
+        if not self._loaded:
+            self.load_cache()
+
+        chapters = list(self._iter_chapters(sections))
+        stats = {"files": len(chapters), "reread": 0, "texts": 0, "validated": 0, "cached": 0}
+        pending: Dict[str, Tuple[str, str]] = {}
+        seen = set()
+
+        for pos, (path, location) in enumerate(chapters):
+            if context is not None:
+                context.report(pos, len(chapters), f"Scanning {location['chapter_name']}")
+            key = str(path)
+            seen.add(key)
+            signature = _file_signature(path)
+            entry = self._files.get(key)
+            if (entry and entry["signature"] == signature and entry["location"] == location
+                    and all(field[3] in self._results for field in entry["fields"])):
+                fields = entry["fields"]
+            else:
+                fields = self._scan_file(path, location["subject_id"], pending)
+                self._files[key] = {"signature": signature, "location": location, "fields": fields}
+                stats["reread"] += 1
+            stats["texts"] += len(fields)
+
+        for key in [key for key in self._files if key not in seen]:
+            del self._files[key]
+
+        stats["validated"] = len(pending)
+        stats["cached"] = stats["texts"] - len(pending)
+        self._results.update(self._run_pending(pending, context, max_workers))
+
+        report = self._build_report(stats, started)
+        self.save_cache()
+        self.write_report(report)
+        return report
+
+    def _iter_chapters(self, sections: Iterable[Dict]):
+        for section in sections or []:
+            section_rel = str(section.get("path", "")).strip()
+            if not section_rel:
+                continue
+            section_dir = self.base_path / section_rel
+            try:
+                chapters = _load_json(section_dir / "chapters.json")
+            except (OSError, ValueError):
+                continue
+            if not isinstance(chapters, list):
+                continue
+            for chapter in chapters:
+                if not isinstance(chapter, dict) or not chapter.get("file"):
+                    continue
+                yield section_dir / chapter["file"], {
+                    "subject_id": section_dir.name,
+                    "section_name": section.get("name", section.get("id", "")),
+                    "chapter_name": chapter.get("name", chapter.get("id", "")),
+                }
+
+    def _scan_file(self, path: Path, subject_id: str, pending: Dict) -> List[list]:
+        """Return ``[q_idx, number, field, key]`` rows and queue uncached texts."""
+        try:
+            questions = _chapter_questions(path)
+        except (OSError, ValueError):
+            return []
+        fields = []
+        for q_idx, question in enumerate(questions):
+            if not isinstance(question, dict):
+                continue
+            number = str(question.get("number") or q_idx + 1)
+            for field in VALIDATED_FIELDS:
+                text = str(question.get(field) or "")
+                if "```" not in text:
+                    continue
+                key = text_key(text, subject_id)
+                fields.append([q_idx, number, field, key])
+                if key not in self._results:
+                    pending[key] = (subject_id, text)
+        return fields
+
+    def _run_pending(self, pending: Dict[str, Tuple[str, str]], context, max_workers: Optional[int]) -> Dict[str, list]:
+        """Validate ``{key: (subject_id, text)}`` in per-subject batches."""
+        if not pending:
+            return {}
+        by_subject: Dict[str, List[Tuple[str, str]]] = {}
+        for key, (subject_id, text) in pending.items():
+            by_subject.setdefault(subject_id, []).append((key, text))
+        batches = [
+            (subject_id, items[i:i + BATCH_SIZE])
+            for subject_id, items in by_subject.items()
+            for i in range(0, len(items), BATCH_SIZE)
+        ]
+        results: Dict[str, list] = {}
+
+        def collect(done, batch_results):
+            results.update(batch_results)
+            if context is not None:
+                context.report(done, len(batches), "Validating diagram blocks")
+
+        if len(pending) >= PARALLEL_MIN_TEXTS:
+            try:
+                from concurrent.futures import ProcessPoolExecutor, as_completed
+
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [executor.submit(_validate_batch, *batch) for batch in batches]
+                    try:
+                        for done, future in enumerate(as_completed(futures), 1):
+                            collect(done, future.result())
+                    except BaseException:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        raise
+                return results
+            except (OSError, ImportError, RuntimeError):
+                # No usable process pool (frozen build, sandbox); validate here.
+                results.clear()
+
+        for done, batch in enumerate(batches, 1):
+            collect(done, _validate_batch(*batch))
+        return results
+
+    # -- Report --------------------------------------------------------
+
+    def _build_report(self, stats: Dict, started: float) -> Dict:
+        issues = []
+        for chapter_file, entry in self._files.items():
+            location = entry["location"]
+            for q_idx, number, field, key in entry["fields"]:
+                for warning in self._results.get(key, []):
+                    issues.append({
+                        "section": location["section_name"],
+                        "chapter": location["chapter_name"],
+                        "chapter_file": chapter_file,
+                        "question_index": q_idx,
+                        "question": number,
+                        "field": field,
+                        "line": warning["line"],
+                        "lang": warning["lang"],
+                        "message": warning["message"],
+                    })
+        stats = dict(stats, issues=len(issues), elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "base_path": str(self.base_path),
+            "stats": stats,
+            "issues": issues,
+        }
+
+    def write_report(self, report: Dict) -> Path:
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return self.report_path
@@ -4,37 +4,51 @@ Exam Engine Editor - Multi-Section Version
 Manages multiple subjects/sections with chapters.json structure
 """
 
-import uuid
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, font as tkfont
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
+import bisect
+import functools
 import json
 import os
 import stat
+import threading
 import time
 from pathlib import Path
 import re
 import shutil
-import zipfile
-import tempfile
 import urllib.parse
-import urllib.request
-import webbrowser
-from difflib import SequenceMatcher
 from datetime import datetime
-from diagram_support import validate_diagram_blocks
-
-try:
-    import winsound
-except Exception:
-    winsound = None
-
-try:
-    from PIL import Image, ImageTk
-except Exception:
-    Image = None
-    ImageTk = None
+from background_tasks import get_preview_runner, get_task_runner
+from diagram_support import iter_diagram_warnings, validate_diagram_blocks
+from diagram_prerender import prerender_graphviz
+from diagram_validation import ProjectDiagramValidator
+from image_references import ImageReferenceIndex, normalize_image_ref, question_image_refs
+from image_tools import (
+    OptimizationLedger, apply_image_dedup, build_icon_sprite, file_digest, find_identical_file,
+    find_section_images, optimize_image_file, optimize_images, plan_image_dedup, publish_image_variants,
+    remove_image_file, summarize_by_section,
+)
+from markdown_tokens import code_ranges, is_line_break, tokenize_document, top_level
+from question_search import ProjectSearchIndex, TrigramIndex, compile_query, question_fields
+from thumbnail_cache import get_thumbnail_cache
+
+# Rarely used modules (zipfile, tempfile, urllib.request, webbrowser, difflib,
+# uuid, winsound, Pillow) are imported where they are used to keep startup fast.
+_PIL_MODULES = None
+
+
+def _load_pil():
+    """Import Pillow on first use; returns (Image, ImageTk) or (None, None)."""
+    global _PIL_MODULES
+    if _PIL_MODULES is None:
+        try:
+            from PIL import Image, ImageTk
+            _PIL_MODULES = (Image, ImageTk)
+        except Exception:
+            _PIL_MODULES = (None, None)
+    return _PIL_MODULES
 
 # -- Dark Theme Color Constants (matches web app CSS dark theme) --
 COLORS = {
@@ -62,6 +76,11 @@ COLORS = {
 
 def _play_notification_sound(kind="info"):
     """Play a lightweight notification sound without showing a popup."""
+    try:
+        import winsound
+    except Exception:
+        winsound = None
+
     try:
         if winsound is not None:
             beep_map = {
@@ -232,6 +251,88 @@ def _style_dialog(dialog, title, geometry):
     dialog.configure(bg=palette["bg"])
 
 
+def _keyed_iids(prefix, keys):
+    """Build stable, unique Treeview iids from row keys (duplicates get '#n')."""
+    seen = {}
+    iids = []
+    for key in keys:
+        key = str(key or "")
+        count = seen.get(key, 0) + 1
+        seen[key] = count
+        iids.append(f"{prefix}:{key}" if count == 1 else f"{prefix}:{key}#{count}")
+    return iids
+
+
+class TreeRowReconciler:
+    """Apply a desired (iid, values) row list to a flat Treeview with minimal changes.
+
+    Rows keep their iids across refreshes; only rows that disappeared are
+    deleted, new rows inserted, changed values updated and out-of-place rows
+    moved. Even/odd stripe tags are recomputed once the event loop is idle.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._values = {}
+        self._tags = {}
+        self._order = []
+        self._stripe_job = None
+
+    def sync(self, rows):
+        """Reconcile the tree with ``rows`` and return the number of changed rows."""
+        tree = self.tree
+        desired = [iid for iid, _ in rows]
+        desired_set = set(desired)
+        changes = 0
+
+        stale = [iid for iid in self._order if iid not in desired_set]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                self._values.pop(iid, None)
+                self._tags.pop(iid, None)
+            changes += len(stale)
+
+        current = [iid for iid in self._order if iid in desired_set]
+        for position, (iid, values) in enumerate(rows):
+            values = tuple(values)
+            if iid not in self._values:
+                tree.insert("", position, iid=iid, values=values)
+                current.insert(position, iid)
+                changes += 1
+            else:
+                if self._values[iid] != values:
+                    tree.item(iid, values=values)
+                    changes += 1
+                if current[position] != iid:
+                    tree.move(iid, "", position)
+                    current.remove(iid)
+                    current.insert(position, iid)
+                    changes += 1
+            self._values[iid] = values
+
+        self._order = desired
+        if changes:
+            self._schedule_restripe()
+        return changes
+
+    def _schedule_restripe(self):
+        if self._stripe_job is None:
+            self._stripe_job = self.tree.after_idle(self._restripe)
+
+    def _restripe(self):
+        self._stripe_job = None
+        tree = self.tree
+        try:
+            for position, iid in enumerate(self._order):
+                tag = "evenrow" if position % 2 == 0 else "oddrow"
+                if self._tags.get(iid) != tag:
+                    tree.item(iid, tags=(tag,))
+                    self._tags[iid] = tag
+        except tk.TclError:
+            pass
+
+
 def _backup_root_for(base_path):
     return Path(base_path) / ".editor_backups"
 
@@ -244,6 +345,30 @@ def _backup_log_file(base_path):
     return _backup_root_for(base_path) / "backup_log.jsonl"
 
 
+def _backup_blob_dir(base_path):
+    return _backup_root_for(base_path) / "blobs"
+
+
+# Held while creating a backup entry and while pruning blobs, so a prune
+# either finishes before a new entry exists or sees it and keeps its blobs.
+_BACKUP_STORE_LOCK = threading.Lock()
+
+# An entry without manifest.json or payload/ is a backup still being
+# written; after this long it is treated as abandoned instead.
+BACKUP_IN_PROGRESS_SECONDS = 24 * 3600
+
+
+def _backup_entry_in_progress(entry_dir):
+    entry_dir = Path(entry_dir)
+    if (entry_dir / "manifest.json").exists() or (entry_dir / "payload").exists():
+        return False
+    try:
+        age = time.time() - (entry_dir / "metadata.json").stat().st_mtime
+    except OSError:
+        return False
+    return age < BACKUP_IN_PROGRESS_SECONDS
+
+
 def _ensure_backup_paths(base_path):
     _backup_history_dir(base_path).mkdir(parents=True, exist_ok=True)
 
@@ -298,13 +423,15 @@ def _append_backup_log(base_path, record):
 
 
 def _create_backup_entry(base_path, action, project, details):
-    """Create a backup entry directory and metadata file."""
+    """Create a backup entry directory and metadata file.
+
+    Returns ``(entry_dir, manifest, metadata)``; fill ``manifest`` with
+    :func:`_backup_copy_path` and save it with :func:`_write_backup_manifest`.
+    """
     _ensure_backup_paths(base_path)
     stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     entry_id = f"{stamp}_{action}"
     entry_dir = _backup_history_dir(base_path) / entry_id
-    payload_dir = entry_dir / "payload"
-    payload_dir.mkdir(parents=True, exist_ok=True)
 
     metadata = {
         "id": entry_id,
@@ -313,8 +440,11 @@ def _create_backup_entry(base_path, action, project, details):
         "action": action,
         "details": details,
     }
-    with open(entry_dir / "metadata.json", "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    # Until manifest.json is written this entry pins every blob (see _prune_backup_blobs).
+    with _BACKUP_STORE_LOCK:
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        with open(entry_dir / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
 
     _append_backup_log(base_path, {
         "timestamp": metadata["timestamp"],
@@ -323,28 +453,73 @@ def _create_backup_entry(base_path, action, project, details):
         "action": action,
         "details": details,
     })
-    return entry_dir, payload_dir, metadata
+    return entry_dir, {}, metadata
+
+
+def _store_backup_blob(base_path, src):
+    """Store a file's content in the backup blob store once; return its SHA-256.
+
+    Blobs are named by content, so a file backed up again unchanged is only
+    hashed, not copied.
+    """
+    import uuid
+    blob_dir = _backup_blob_dir(base_path)
+    digest = file_digest(src)
+    blob = blob_dir / digest[:2] / digest
+    if blob.exists():
+        return digest
+
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = blob.with_name(f"{digest}.{uuid.uuid4().hex[:8]}.tmp")
+    shutil.copyfile(src, temp_path)
+    # The file may have changed since it was hashed; name the blob after what was copied.
+    copied_digest = file_digest(temp_path)
+    if copied_digest != digest:
+        digest = copied_digest
+        blob = blob_dir / digest[:2] / digest
+        blob.parent.mkdir(parents=True, exist_ok=True)
+    if blob.exists():
+        temp_path.unlink()
+    else:
+        os.replace(temp_path, blob)
+    return digest
 
 
-def _backup_copy_path(path, root, payload_dir):
-    """Copy a file or directory into a backup payload preserving relative path."""
+def _backup_copy_path(path, root, manifest):
+    """Back up a file or directory into the blob store, recording it in ``manifest``.
+
+    ``manifest`` maps project-relative paths to ``{"blob", "size", "mtime_ns"}``;
+    empty directories are recorded as ``{"dir": True}``.
+    """
     src = Path(path)
     if not src.exists():
         return None
 
     rel = _safe_relative_path(src, root)
-    dest = Path(payload_dir) / rel
-    dest.parent.mkdir(parents=True, exist_ok=True)
-
-    if src.is_dir():
-        if dest.exists():
-            _safe_rmtree(dest)
-        shutil.copytree(src, dest)
-    else:
-        shutil.copy2(src, dest)
+    files = [src] if src.is_file() else sorted(src.rglob("*"))
+    for item in files:
+        item_rel = (rel / item.relative_to(src)).as_posix() if item != src else rel.as_posix()
+        if item.is_dir():
+            if not any(item.iterdir()):
+                manifest[item_rel] = {"dir": True}
+            continue
+        st = item.stat()
+        manifest[item_rel] = {
+            "blob": _store_backup_blob(root, item),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
     return str(rel).replace("\\", "/")
 
 
+def _write_backup_manifest(entry_dir, manifest):
+    manifest_path = Path(entry_dir) / "manifest.json"
+    temp_path = manifest_path.with_suffix(".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, manifest_path)
+
+
 def _load_backup_entries(base_path):
     """Load backup metadata entries sorted newest first."""
     history_dir = _backup_history_dir(base_path)
@@ -369,8 +544,37 @@ def _load_backup_entries(base_path):
 
 
 def _restore_backup_entry(base_path, entry_dir):
-    """Restore files from one backup entry payload into the project root."""
+    """Restore files from one backup entry into the project root.
+
+    Entries have a ``manifest.json`` pointing into the blob store; older
+    entries keep full copies under ``payload/``. Raises before touching any
+    project file when a blob the manifest needs is missing.
+    """
     root = Path(base_path)
+    manifest_path = Path(entry_dir) / "manifest.json"
+    if manifest_path.exists():
+        manifest = _load_json_file(manifest_path)
+        blob_dir = _backup_blob_dir(root)
+        missing = [rel for rel, info in manifest.items()
+                   if not info.get("dir") and not (blob_dir / info["blob"][:2] / info["blob"]).is_file()]
+        if missing:
+            raise FileNotFoundError(
+                f"Backup is incomplete: {len(missing)} stored file(s) are missing "
+                f"(first: {missing[0]}). Nothing was restored."
+            )
+        restored = 0
+        for rel, info in manifest.items():
+            target = root / rel
+            if info.get("dir"):
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(blob_dir / info["blob"][:2] / info["blob"], target)
+            if info.get("mtime_ns"):
+                os.utime(target, ns=(info["mtime_ns"], info["mtime_ns"]))
+            restored += 1
+        return restored
+
     payload_dir = Path(entry_dir) / "payload"
     if not payload_dir.exists():
         return 0
@@ -388,17 +592,63 @@ def _restore_backup_entry(base_path, entry_dir):
     return restored
 
 
+def _prune_backup_blobs(base_path):
+    """Delete blobs no remaining backup entry refers to; return how many were removed.
+
+    Nothing is removed while a backup is still being written, since its
+    blobs are stored before its manifest.
+    """
+    blob_dir = _backup_blob_dir(base_path)
+    if not blob_dir.exists():
+        return 0
+    with _BACKUP_STORE_LOCK:
+        used = set()
+        history_dir = _backup_history_dir(base_path)
+        for entry_dir in history_dir.iterdir() if history_dir.exists() else []:
+            if not entry_dir.is_dir():
+                continue
+            if _backup_entry_in_progress(entry_dir):
+                return 0
+            manifest_path = entry_dir / "manifest.json"
+            if not manifest_path.exists():
+                continue
+            try:
+                manifest = _load_json_file(manifest_path)
+            except Exception:
+                # An unreadable manifest could still need any blob; keep them all.
+                return 0
+            used.update(info["blob"] for info in manifest.values() if info.get("blob"))
+        removed = 0
+        for blob in blob_dir.glob("*/*"):
+            # *.tmp files are blobs still being copied.
+            if blob.suffix == ".tmp" or blob.name in used:
+                continue
+            try:
+                blob.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
 def _delete_backup_entry(entry_dir):
     entry_dir = Path(entry_dir)
     if entry_dir.exists() and entry_dir.is_dir():
         _safe_rmtree(entry_dir)
+        # .editor_backups/history/<entry> -> project root
+        _prune_backup_blobs(entry_dir.parent.parent.parent)
 
 
 def _clear_backup_history(base_path):
+    """Delete every finished backup entry and the blobs only they used."""
     history_dir = _backup_history_dir(base_path)
-    if history_dir.exists():
-        _safe_rmtree(history_dir)
     history_dir.mkdir(parents=True, exist_ok=True)
+    for entry_dir in list(history_dir.iterdir()):
+        if not entry_dir.is_dir():
+            entry_dir.unlink()
+        elif not _backup_entry_in_progress(entry_dir):
+            _safe_rmtree(entry_dir)
+    _prune_backup_blobs(base_path)
 
     log_path = _backup_log_file(base_path)
     if log_path.exists():
@@ -447,19 +697,16 @@ def _replace_double_backslashes(value):
     if "\\" not in text:
         return text, 0
 
-    parts = re.split(r'(```[\s\S]*?```|`[^`\n]+`)', text)
+    parts = []
     replacements = 0
-
-    for idx, part in enumerate(parts):
-        if not part:
-            continue
-        if part.startswith("```") or (part.startswith("`") and part.endswith("`")):
-            continue
-
-        collapsed = re.sub(r'\\{2,}', r'\\', part)
-        if collapsed != part:
-            replacements += sum(1 for _ in re.finditer(r'\\{2,}', part))
-            parts[idx] = collapsed
+    pos = 0
+    for start, end in code_ranges(tokenize_document(text)) + [(len(text), len(text))]:
+        part = text[pos:start]
+        collapsed, count = re.subn(r'\\{2,}', r'\\', part)
+        replacements += count
+        parts.append(collapsed)
+        parts.append(text[start:end])
+        pos = end
 
     return "".join(parts), replacements
 
@@ -492,6 +739,156 @@ def _load_json_file(path):
     with open(path, 'r', encoding='utf-8-sig') as f:
         return json.load(f)
 
+
+def _editor_image_refs(editors, exclude=()):
+    """Normalized image paths used in memory by chapter ``editors``, saved or not.
+
+    Editors of chapter files in ``exclude`` are skipped.
+    """
+    excluded = {Path(path).resolve() for path in exclude}
+    refs = set()
+    for editor in editors:
+        if editor.chapter_file.resolve() not in excluded:
+            refs |= editor.in_memory_image_refs()
+    return refs
+
+
+# Serializes writers of a section's chapters.json: ExamEditor.save_chapter on
+# the Tk thread and the sync in ExamEditor._build_js_config on a worker.
+_CHAPTERS_JSON_LOCK = threading.Lock()
+
+
+def _write_chapters_json(path, chapters):
+    """Atomically write a section's chapters.json; callers hold _CHAPTERS_JSON_LOCK."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(chapters, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _images_used_elsewhere(base_path, image_rels, exclude=(), editors=()):
+    """Return normalized paths of ``image_rels`` still referenced by chapters not in ``exclude``.
+
+    Images can be shared between questions and sections after deduplication,
+    so deleting a question's image must not break the other users. Unsaved
+    references held by open ``editors`` count as well.
+    """
+    try:
+        sections = _load_json_file(Path(base_path) / "config" / "sections.json")
+    except Exception:
+        sections = []
+    index = ImageReferenceIndex(base_path)
+    index.refresh(sections if isinstance(sections, list) else [])
+    references = index.references(exclude=exclude).keys() | _editor_image_refs(editors, exclude)
+    return {normalize_image_ref(rel, "") for rel in image_rels} & references
+
+
+def _preview_plain_text(text):
+    """Apply the preview's <br> and &nbsp; substitutions to span contents."""
+    return re.sub(r'<br\s*/?>', '\n', text).replace('&nbsp;', ' ')
+
+
+_PARAGRAPH_BREAK_RE = re.compile(r'\n[ \t]*\n')
+
+
+def _line_start_offsets(content):
+    """Return the character offset at which each line of ``content`` starts."""
+    offsets = [0]
+    total = 0
+    for line in content.split("\n")[:-1]:
+        total += len(line) + 1
+        offsets.append(total)
+    return offsets
+
+
+def _offset_to_index(line_starts, pos):
+    """Convert a character offset to a Tk text index using a line-start table."""
+    line = bisect.bisect_right(line_starts, pos)
+    return f"{line}.{pos - line_starts[line - 1]}"
+
+
+def _index_to_offset(line_starts, index):
+    """Convert a ``line.col`` Tk index back to a character offset."""
+    line, col = str(index).split(".")
+    line = int(line)
+    if line > len(line_starts):
+        return line_starts[-1] + int(col)
+    return line_starts[line - 1] + int(col)
+
+
+def _highlight_blocks(content, tokens):
+    """Split text into ``(start, end, kind, lang)`` highlight blocks.
+
+    Blocks tile the whole buffer: each fence token is one ``"fence"`` block and
+    the text between fences is cut into ``"text"`` paragraphs at blank lines.
+    """
+    blocks = []
+
+    def add_text(start, end):
+        cut = start
+        for m in _PARAGRAPH_BREAK_RE.finditer(content, start, end):
+            blocks.append((cut, m.end(), "text", ""))
+            cut = m.end()
+        if cut < end:
+            blocks.append((cut, end, "text", ""))
+
+    pos = 0
+    for token in tokens:
+        if token.kind != "fence":
+            continue
+        add_text(pos, token.start)
+        blocks.append((token.start, token.end, "fence", token.lang))
+        pos = token.end
+    add_text(pos, len(content))
+    return blocks
+
+
+@functools.lru_cache(maxsize=64)
+def _preview_segments(content):
+    """Return the preview of ``content`` as a tuple of ``(text, tag)`` segments.
+
+    Cached by content, so undo/redo and re-showing the preview reuse earlier
+    renders; the tokens come from the highlighter's cached scan.
+    """
+    segments = []
+    pos = 0
+    for token in top_level(tokenize_document(content)):
+        if pos < token.start:
+            segments.append((content[pos:token.start], None))
+        pos = token.end
+        inner = token.inner(content)
+        if token.kind == "fence":
+            segments.append((inner.strip(), "codeblock"))
+        elif token.kind in ("bold", "italic", "code"):
+            segments.append((_preview_plain_text(inner), token.kind))
+        elif token.kind in ("math", "display_math"):
+            segments.append((_preview_plain_text(inner), "math"))
+        elif is_line_break(token, content):
+            segments.append(("\n", None))
+        elif token.kind == "entity" and inner == "nbsp":
+            segments.append((" ", None))
+        # Other HTML tags and entities are dropped from the preview.
+    if pos < len(content):
+        segments.append((content[pos:], None))
+    return tuple(segment for segment in segments if segment[0])
+
+
+def _segment_diff(old, new):
+    """Return ``(head, old_end, new_end)`` so that only ``old[head:old_end]``
+    has to be replaced by ``new[head:new_end]``."""
+    head = 0
+    limit = min(len(old), len(new))
+    while head < limit and old[head] == new[head]:
+        head += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > head and new_end > head and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return head, old_end, new_end
+
+
 class FormattedTextEditor(ttk.Frame):
     """Rich text editor with formatting toolbar, syntax highlighting, and live preview."""
 
@@ -517,8 +914,16 @@ class FormattedTextEditor(ttk.Frame):
         super().__init__(parent)
         self.show_preview = show_preview
         self._highlight_job = None
+        self._preview_job = None
+        # Buffer and block layout from the last highlight pass.
+        self._highlight_content = ""
+        self._highlight_blocks = []
+        # Text and segments currently shown in the preview.
+        self._preview_content = ""
+        self._preview_shown = ()
         self._build_toolbar()
         self._build_text(height)
+        self._track_edits()
         if show_preview:
             self._build_preview()
         self._setup_tags()
@@ -631,161 +1036,186 @@ class FormattedTextEditor(ttk.Frame):
     def _schedule_highlight(self, event=None):
         if self._highlight_job:
             self.after_cancel(self._highlight_job)
-        self._highlight_job = self.after(250, self._do_highlight)
+        self._highlight_job = self.after(40, self._do_highlight)
 
     def _do_highlight(self):
+        self._highlight_job = None
         self._highlight_syntax()
         if (self.show_preview and hasattr(self, '_preview_var')
                 and self._preview_var.get()):
-            self._update_preview()
+            if self._preview_job:
+                self.after_cancel(self._preview_job)
+            self._preview_job = self.after(250, self._run_preview_update)
+
+    def _run_preview_update(self):
+        self._preview_job = None
+        self._update_preview()
 
     def _char_to_index(self, content, pos):
         """Convert character offset to tkinter text index."""
-        line = content[:pos].count('\n') + 1
-        col = pos - content[:pos].rfind('\n') - 1
-        return f"{line}.{col}"
+        return _offset_to_index(_line_start_offsets(content), pos)
+
+    def _track_edits(self):
+        """Route the text widget's insert/delete through Python to tag edited spots.
+
+        Every edit adds the ``hl_dirty`` tag around the changed characters, so
+        the next highlight pass knows exactly where the buffer changed. This is
+        the widget command redirection IDLE uses for its colorizer.
+        """
+        widget_cmd = str(self.text)
+        inner_cmd = widget_cmd + "_inner"
+        self.tk.call("rename", widget_cmd, inner_cmd)
+
+        def dispatch(operation, *args):
+            if operation not in ("insert", "delete", "replace") or not args:
+                return self.tk.call((inner_cmd, operation) + args)
+            call = lambda *cmd: self.tk.call((inner_cmd,) + cmd)
+            end = call("index", "end - 1c")
+            first = call("index", args[0])
+            if call("compare", first, ">", end):
+                first = end
+            last = first if operation == "insert" or len(args) < 2 else call("index", args[1])
+            call("mark", "set", "hl_edit_first", first)
+            call("mark", "gravity", "hl_edit_first", "left")
+            call("mark", "set", "hl_edit_last", last)
+            result = call(operation, *args)
+            if operation == "delete" and len(args) > 2:
+                call("tag", "add", "hl_dirty", "1.0", "end")
+            else:
+                call("tag", "add", "hl_dirty", "hl_edit_first - 1c", "hl_edit_last + 1c")
+            return result
+
+        self.tk.createcommand(widget_cmd, dispatch)
+        self.text.bind("<Destroy>", lambda e: self.tk.deletecommand(widget_cmd), add="+")
 
     def _highlight_syntax(self):
-        """Apply syntax highlighting to the editor text."""
+        """Re-highlight only the blocks touched since the last pass.
+
+        The buffer is split into code fences and blank-line separated
+        paragraphs. Text before the first edited spot is unchanged and text
+        after the last one is only shifted, so blocks there keep their tags
+        (Tk moves tags along with edits) and only the blocks in between are
+        re-tokenized.
+        """
         content = self.text.get("1.0", "end-1c")
-        idx = lambda pos: self._char_to_index(content, pos)
-
-        # Clear existing formatting tags
-        for tag in list(self.text.tag_names()):
-            if tag.startswith("fmt_"):
-                self.text.tag_remove(tag, "1.0", tk.END)
-
-        # Code blocks (highest priority)
-        codeblock_ranges = []
-        for m in re.finditer(r'```([\w\-]*)\n?([\s\S]*?)```', content):
-            s, e = m.start(), m.end()
-            codeblock_ranges.append((s, e))
-            self.text.tag_add("fmt_codeblock", idx(s), idx(e))
-            self.text.tag_add("fmt_diagram_marker", idx(s), idx(s + 3))
-            lang = (m.group(1) or "")
-            if lang:
-                lang_start = s + 3
-                self.text.tag_add("fmt_diagram_lang", idx(lang_start), idx(lang_start + len(lang)))
-            self.text.tag_add("fmt_diagram_marker", idx(e - 3), idx(e))
-
-        def in_codeblock(pos):
-            return any(s <= pos < e for s, e in codeblock_ranges)
-
-        # Bold **...**
-        for m in re.finditer(r'\*\*(.+?)\*\*', content):
-            if in_codeblock(m.start()):
-                continue
-            self.text.tag_add("fmt_bold_marker", idx(m.start()), idx(m.start() + 2))
-            self.text.tag_add("fmt_bold_text", idx(m.start() + 2), idx(m.end() - 2))
-            self.text.tag_add("fmt_bold_marker", idx(m.end() - 2), idx(m.end()))
-
-        # Italic *...*
-        for m in re.finditer(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', content):
-            if in_codeblock(m.start()):
-                continue
-            self.text.tag_add("fmt_italic_marker", idx(m.start()), idx(m.start() + 1))
-            self.text.tag_add("fmt_italic_text", idx(m.start() + 1), idx(m.end() - 1))
-            self.text.tag_add("fmt_italic_marker", idx(m.end() - 1), idx(m.end()))
-
-        # Inline code `...`
-        for m in re.finditer(r'(?<!`)`(?!`)([^`]+?)(?<!`)`(?!`)', content):
-            if in_codeblock(m.start()):
-                continue
-            self.text.tag_add("fmt_code_marker", idx(m.start()), idx(m.start() + 1))
-            self.text.tag_add("fmt_code", idx(m.start() + 1), idx(m.end() - 1))
-            self.text.tag_add("fmt_code_marker", idx(m.end() - 1), idx(m.end()))
-
-        # Math inline \(...\)
-        for m in re.finditer(r'\\\((.+?)\\\)', content, re.DOTALL):
-            if in_codeblock(m.start()):
+        previous = self._highlight_content
+        tokens = tokenize_document(content)
+        blocks = _highlight_blocks(content, tokens)
+        line_starts = _line_start_offsets(content)
+        idx = lambda pos: _offset_to_index(line_starts, pos)
+
+        edited = self.text.tag_ranges("hl_dirty")
+        self.text.tag_remove("hl_dirty", "1.0", tk.END)
+        if edited:
+            edit_start = _index_to_offset(line_starts, self.text.index(edited[0]))
+            edit_end = _index_to_offset(line_starts, self.text.index(edited[-1]))
+        elif content == previous:
+            return
+        else:
+            edit_start, edit_end = 0, len(content)
+        delta = len(content) - len(previous)
+        old_blocks = set(self._highlight_blocks)
+
+        dirty = []
+        for block in blocks:
+            start, end = block[0], block[1]
+            if end <= edit_start and block in old_blocks:
                 continue
-            self.text.tag_add("fmt_math_marker", idx(m.start()), idx(m.start() + 2))
-            self.text.tag_add("fmt_math", idx(m.start() + 2), idx(m.end() - 2))
-            self.text.tag_add("fmt_math_marker", idx(m.end() - 2), idx(m.end()))
-
-        # Math display \[...\]
-        for m in re.finditer(r'\\\[(.+?)\\\]', content, re.DOTALL):
-            if in_codeblock(m.start()):
+            if start >= edit_end and (start - delta, end - delta) + block[2:] in old_blocks:
                 continue
-            self.text.tag_add("fmt_math_marker", idx(m.start()), idx(m.start() + 2))
-            self.text.tag_add("fmt_math", idx(m.start() + 2), idx(m.end() - 2))
-            self.text.tag_add("fmt_math_marker", idx(m.end() - 2), idx(m.end()))
+            dirty.append(block)
 
-        # HTML tags
-        for m in re.finditer(r'<[^>]+>', content):
-            if in_codeblock(m.start()):
+        # Clear stale tags once per run of adjacent dirty blocks.
+        ranges = []
+        for block in dirty:
+            if ranges and ranges[-1][1] == block[0]:
+                ranges[-1][1] = block[1]
+            else:
+                ranges.append([block[0], block[1]])
+        for start, end in ranges:
+            end_index = tk.END if end >= len(content) else idx(end)
+            for tag in self._HIGHLIGHT_TAGS:
+                self.text.tag_remove(tag, idx(start), end_index)
+
+        token_starts = [token.start for token in tokens]
+        for block in dirty:
+            start, end = block[0], block[1]
+            if block[2] == "fence":
+                self._highlight_fence(block, idx)
                 continue
-            self.text.tag_add("fmt_html", idx(m.start()), idx(m.end()))
+            first = bisect.bisect_left(token_starts, start)
+            last = bisect.bisect_left(token_starts, end)
+            for token in tokens[first:last]:
+                self._highlight_token(token, idx)
+
+        self._highlight_content = content
+        self._highlight_blocks = blocks
+
+    _HIGHLIGHT_TAGS = (
+        "fmt_bold_marker", "fmt_bold_text", "fmt_italic_marker", "fmt_italic_text",
+        "fmt_code_marker", "fmt_code", "fmt_codeblock", "fmt_math_marker", "fmt_math",
+        "fmt_html", "fmt_entity", "fmt_diagram_marker", "fmt_diagram_lang",
+    )
 
-        # Entities &nbsp; etc
-        for m in re.finditer(r'&\w+;', content):
-            if in_codeblock(m.start()):
-                continue
-            self.text.tag_add("fmt_entity", idx(m.start()), idx(m.end()))
+    def _highlight_fence(self, block, idx):
+        s, e, _, lang = block
+        self.text.tag_add("fmt_codeblock", idx(s), idx(e))
+        self.text.tag_add("fmt_diagram_marker", idx(s), idx(s + 3))
+        if lang:
+            lang_start = s + 3
+            self.text.tag_add("fmt_diagram_lang", idx(lang_start), idx(lang_start + len(lang)))
+        self.text.tag_add("fmt_diagram_marker", idx(e - 3), idx(e))
+
+    def _highlight_token(self, token, idx):
+        """Tag one inline markdown token: markers, body, or the whole span."""
+        marker_tag, body_tag, whole_tag = self._TOKEN_TAGS[token.kind]
+        if whole_tag:
+            self.text.tag_add(whole_tag, idx(token.start), idx(token.end))
+            return
+        self.text.tag_add(marker_tag, idx(token.start), idx(token.inner_start))
+        self.text.tag_add(body_tag, idx(token.inner_start), idx(token.inner_end))
+        self.text.tag_add(marker_tag, idx(token.inner_end), idx(token.end))
+
+    # token kind -> (marker tag, body tag, whole-span tag)
+    _TOKEN_TAGS = {
+        "bold": ("fmt_bold_marker", "fmt_bold_text", None),
+        "italic": ("fmt_italic_marker", "fmt_italic_text", None),
+        "code": ("fmt_code_marker", "fmt_code", None),
+        "math": ("fmt_math_marker", "fmt_math", None),
+        "display_math": ("fmt_math_marker", "fmt_math", None),
+        "html": (None, None, "fmt_html"),
+        "entity": (None, None, "fmt_entity"),
+    }
 
     def _update_preview(self):
-        """Update the live preview panel."""
+        """Patch the live preview to match the editor text.
+
+        Nothing happens while the preview is hidden or the text is unchanged;
+        otherwise only the segments between the unchanged head and tail of
+        the segment list are deleted and re-inserted.
+        """
+        if not self._preview_var.get():
+            return
         content = self.text.get("1.0", "end-1c")
-        self._preview_text.configure(state="normal")
-        self._preview_text.delete("1.0", tk.END)
-        self._render_preview(content)
-        self._preview_text.configure(state="disabled")
-
-    def _render_preview(self, content):
-        """Render simplified formatted preview."""
-        # Pre-process HTML line breaks and entities
-        text = re.sub(r'<br\s*/?>', '\n', content)
-        text = text.replace('&nbsp;', ' ')
-
-        all_matches = []
-
-        # Code blocks
-        for m in re.finditer(r'```\w*\n?([\s\S]*?)```', text):
-            all_matches.append((m.start(), m.end(), m.group(1).strip(), 'codeblock'))
-        # Bold
-        for m in re.finditer(r'\*\*(.+?)\*\*', text):
-            all_matches.append((m.start(), m.end(), m.group(1), 'bold'))
-        # Italic
-        for m in re.finditer(r'(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)', text):
-            all_matches.append((m.start(), m.end(), m.group(1), 'italic'))
-        # Inline code
-        for m in re.finditer(r'(?<!`)`(?!`)([^`]+?)(?<!`)`(?!`)', text):
-            all_matches.append((m.start(), m.end(), m.group(1), 'code'))
-        # Math inline
-        for m in re.finditer(r'\\\((.+?)\\\)', text):
-            all_matches.append((m.start(), m.end(), m.group(1), 'math'))
-        # Math display
-        for m in re.finditer(r'\\\[(.+?)\\\]', text):
-            all_matches.append((m.start(), m.end(), m.group(1), 'math'))
-        # Remaining HTML tags (remove from preview)
-        for m in re.finditer(r'<[^>]+>', text):
-            all_matches.append((m.start(), m.end(), '', '_skip'))
-        # Remaining entities
-        for m in re.finditer(r'&\w+;', text):
-            all_matches.append((m.start(), m.end(), '', '_skip'))
-
-        # Sort by position, longer matches first for same position
-        all_matches.sort(key=lambda x: (x[0], -(x[1] - x[0])))
-
-        # Remove overlapping matches
-        filtered = []
-        last_end = 0
-        for start, end, inner, tag in all_matches:
-            if start >= last_end:
-                filtered.append((start, end, inner, tag))
-                last_end = end
-
-        # Render segments into preview
+        if content == self._preview_content:
+            return
+        segments = _preview_segments(content)
+        old = self._preview_shown
+        head, old_tail, new_tail = _segment_diff(old, segments)
+
         pw = self._preview_text
-        pos = 0
-        for start, end, inner, tag in filtered:
-            if pos < start:
-                pw.insert(tk.END, text[pos:start])
-            if tag != '_skip':
-                pw.insert(tk.END, inner, tag)
-            pos = end
-        if pos < len(text):
-            pw.insert(tk.END, text[pos:])
+        offset = sum(len(text) for text, _ in old[:head])
+        start = f"1.0 + {offset} chars"
+        removed = sum(len(text) for text, _ in old[head:old_tail])
+        pw.configure(state="normal")
+        if removed:
+            pw.delete(start, f"1.0 + {offset + removed} chars")
+        for text, tag in reversed(segments[head:new_tail]):
+            pw.insert(start, text, tag or ())
+        pw.configure(state="disabled")
+
+        self._preview_content = content
+        self._preview_shown = segments
 
     def _insert_format(self, prefix, suffix):
         """Insert formatting around selection or at cursor."""
@@ -847,6 +1277,310 @@ class FormattedTextEditor(ttk.Frame):
         return result
 
 
+class VirtualListbox(ttk.Frame):
+    """Listbox that only materializes the rows currently scrolled into view.
+
+    Row text is produced on demand by ``row_text(row)`` and the selection is
+    kept as row numbers, so filtering, scrolling and selection restore cost
+    the same for 50 or 50,000 rows. The selection API mirrors tk.Listbox.
+    """
+
+    def __init__(self, parent, row_text=None, selectmode=tk.EXTENDED):
+        super().__init__(parent)
+        self.row_text = row_text or (lambda row: "")
+        self.selectmode = selectmode
+        self._count = 0
+        self._first = 0
+        self._page_rows = 1
+        self._row_height = 0
+        self._selected = set()
+        self._anchor = None
+        self._active = None
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.listbox = tk.Listbox(self, selectmode=tk.EXTENDED, exportselection=False)
+        _style_tk_listbox(self.listbox)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Widget-level handlers return "break" so the Listbox class bindings
+        # never touch the on-screen selection behind the model's back.
+        lb = self.listbox
+        lb.bind("<Configure>", self._on_configure)
+        lb.bind("<Button-1>", self._on_click)
+        lb.bind("<Control-Button-1>", self._on_ctrl_click)
+        lb.bind("<Shift-Button-1>", self._on_shift_click)
+        lb.bind("<B1-Motion>", self._on_drag)
+        lb.bind("<ButtonRelease-1>", lambda e: "break")
+        lb.bind("<Double-Button-1>", lambda e: "break")
+        lb.bind("<Up>", lambda e: self._on_move(-1))
+        lb.bind("<Down>", lambda e: self._on_move(1))
+        lb.bind("<Shift-Up>", lambda e: self._on_move(-1, extend=True))
+        lb.bind("<Shift-Down>", lambda e: self._on_move(1, extend=True))
+        lb.bind("<Prior>", lambda e: self._on_move(-self._page_rows))
+        lb.bind("<Next>", lambda e: self._on_move(self._page_rows))
+        lb.bind("<Home>", lambda e: self._on_move(-self._count))
+        lb.bind("<End>", lambda e: self._on_move(self._count))
+        lb.bind("<Control-a>", self._on_select_all)
+        lb.bind("<MouseWheel>", self._on_wheel)
+        lb.bind("<Button-4>", self._on_wheel)
+        lb.bind("<Button-5>", self._on_wheel)
+
+    def bind(self, sequence=None, func=None, add=None):
+        """Bind on the row surface so callers can use Listbox events."""
+        return self.listbox.bind(sequence, func, add)
+
+    def focus_set(self):
+        self.listbox.focus_set()
+
+    # -- Row model -----------------------------------------------------
+
+    def set_row_count(self, count):
+        """Replace the row set; only the visible rows are formatted."""
+        self._count = max(0, int(count))
+        self._selected = {row for row in self._selected if row < self._count}
+        if self._anchor is not None and self._anchor >= self._count:
+            self._anchor = None
+        if self._active is not None and self._active >= self._count:
+            self._active = None
+        self._first = self._clamp_first(self._first)
+        self._render()
+
+    def refresh(self):
+        """Re-format the visible rows (after their underlying data changed)."""
+        self._render()
+
+    def size(self):
+        return self._count
+
+    def _span(self, first, last=None):
+        end = self._count - 1
+        first = end if first in (tk.END, "end") else int(first)
+        if last is None:
+            last = first
+        last = end if last in (tk.END, "end") else int(last)
+        if first > last:
+            first, last = last, first
+        return max(0, first), min(end, last)
+
+    # -- Selection API (tk.Listbox compatible) --------------------------
+
+    def curselection(self):
+        return tuple(sorted(self._selected))
+
+    def selection_includes(self, row):
+        return row in self._selected
+
+    def selection_clear(self, first=0, last=None):
+        first, last = self._span(first, last)
+        if first == 0 and last >= self._count - 1:
+            self._selected.clear()
+        else:
+            self._selected.difference_update(range(first, last + 1))
+        self._render_selection()
+
+    def selection_set(self, first, last=None):
+        first, last = self._span(first, last)
+        if last >= first:
+            self._selected.update(range(first, last + 1))
+        self._render_selection()
+
+    def activate(self, row):
+        if not self._count:
+            return
+        row = max(0, min(int(row), self._count - 1))
+        self._active = row
+        self._anchor = row
+        self._render_selection()
+
+    def see(self, row):
+        if not self._count:
+            return
+        row = max(0, min(int(row), self._count - 1))
+        if row < self._first:
+            self._set_first(row)
+        elif row >= self._first + self._page_rows:
+            self._set_first(row - self._page_rows + 1)
+
+    def nearest(self, y):
+        if not self._count:
+            return -1
+        row_height = self._row_height or 1
+        row = self._first + max(0, int(y) // row_height)
+        return min(row, self._count - 1)
+
+    # -- Scrolling -----------------------------------------------------
+
+    def yview(self, *args):
+        if not args:
+            if not self._count:
+                return 0.0, 1.0
+            return self._first / self._count, min(1.0, (self._first + self._page_rows) / self._count)
+        if args[0] == "moveto":
+            self._set_first(int(round(float(args[1]) * self._count)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= max(1, self._page_rows - 1)
+            self._set_first(self._first + step)
+        return None
+
+    def _clamp_first(self, first):
+        return max(0, min(int(first), self._count - self._page_rows))
+
+    def _set_first(self, first):
+        first = self._clamp_first(first)
+        if first != self._first:
+            self._first = first
+            self._render()
+
+    # -- Rendering -----------------------------------------------------
+
+    def _visible_range(self):
+        # One extra row fills the partially visible line at the bottom.
+        return self._first, min(self._count, self._first + self._page_rows + 1)
+
+    def _render(self):
+        lb = self.listbox
+        first, end = self._visible_range()
+        # Clear the on-screen selection first so deleting rows does not emit <<ListboxSelect>>.
+        lb.selection_clear(0, tk.END)
+        lb.delete(0, tk.END)
+        if end > first:
+            lb.insert(tk.END, *[self.row_text(row) for row in range(first, end)])
+        self._render_selection()
+
+    def _render_selection(self):
+        lb = self.listbox
+        first, end = self._visible_range()
+        lb.selection_clear(0, tk.END)
+        if self._selected:
+            for row in range(first, end):
+                if row in self._selected:
+                    lb.selection_set(row - first)
+        if self._active is not None and first <= self._active < end:
+            lb.activate(self._active - first)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        first, last = self.yview()
+        self.scrollbar.set(first, last)
+
+    def _on_configure(self, event=None):
+        lb = self.listbox
+        row_height = 0
+        if lb.size() > 1:
+            top, second = lb.bbox(0), lb.bbox(1)
+            if top and second:
+                row_height = second[1] - top[1]
+        if row_height <= 0:
+            row_height = tkfont.Font(font=lb.cget("font")).metrics("linespace") + 1
+        inset = 2 * (int(lb.cget("highlightthickness")) + int(lb.cget("borderwidth")))
+        page_rows = max(1, (lb.winfo_height() - inset) // row_height)
+        if (row_height, page_rows) != (self._row_height, self._page_rows):
+            self._row_height = row_height
+            self._page_rows = page_rows
+            self._first = self._clamp_first(self._first)
+            self._render()
+
+    # -- Mouse and keyboard --------------------------------------------
+
+    def _notify(self):
+        self.listbox.event_generate("<<ListboxSelect>>")
+
+    def _select_range(self, anchor, row):
+        low, high = sorted((anchor, row))
+        self._selected = set(range(low, high + 1))
+
+    def _on_click(self, event):
+        self.listbox.focus_set()
+        row = self.nearest(event.y)
+        if row < 0:
+            return "break"
+        self._selected = {row}
+        self._anchor = self._active = row
+        self._render_selection()
+        self._notify()
+        return "break"
+
+    def _on_ctrl_click(self, event):
+        if self.selectmode != tk.EXTENDED:
+            return self._on_click(event)
+        self.listbox.focus_set()
+        row = self.nearest(event.y)
+        if row < 0:
+            return "break"
+        if row in self._selected:
+            self._selected.discard(row)
+        else:
+            self._selected.add(row)
+        self._anchor = self._active = row
+        self._render_selection()
+        self._notify()
+        return "break"
+
+    def _on_shift_click(self, event):
+        if self.selectmode != tk.EXTENDED or self._anchor is None:
+            return self._on_click(event)
+        row = self.nearest(event.y)
+        if row < 0:
+            return "break"
+        self._select_range(self._anchor, row)
+        self._active = row
+        self._render_selection()
+        self._notify()
+        return "break"
+
+    def _on_drag(self, event):
+        if self.selectmode != tk.EXTENDED or self._anchor is None or not self._count:
+            return "break"
+        if event.y < 0:
+            self._set_first(self._first - 1)
+        elif event.y > self.listbox.winfo_height():
+            self._set_first(self._first + 1)
+        row = self.nearest(max(0, event.y))
+        self._select_range(self._anchor, row)
+        self._active = row
+        self._render_selection()
+        self._notify()
+        return "break"
+
+    def _on_move(self, delta, extend=False):
+        if not self._count:
+            return "break"
+        if self._active is None:
+            row = self._first
+        else:
+            row = max(0, min(self._active + delta, self._count - 1))
+        if extend and self.selectmode == tk.EXTENDED and self._anchor is not None:
+            self._select_range(self._anchor, row)
+        else:
+            self._selected = {row}
+            self._anchor = row
+        self._active = row
+        self.see(row)
+        self._render_selection()
+        self._notify()
+        return "break"
+
+    def _on_select_all(self, event=None):
+        if self.selectmode == tk.EXTENDED and self._count:
+            self._selected = set(range(self._count))
+            self._render_selection()
+            self._notify()
+        return "break"
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._set_first(self._first + step)
+        return "break"
+
+
 class AdvancedChapterEditor:
     """Advanced editor for chapter questions, choices, and images"""
     def __init__(self, parent, chapter_file, section_path, base_path):
@@ -872,14 +1606,33 @@ class AdvancedChapterEditor:
         self.current_question_idx = None
         self.questions = []
         self.current_image_path = None
+        # Serialized questions and form values as last loaded or saved; see has_unsaved_changes().
+        self._saved_questions = None
+        self._form_snapshot = None
+        self.thumbnail_cache = get_thumbnail_cache(self.base_path)
+        self._thumbnail_task = None
+        self._prefetch_task = None
+        self._thumbnail_target = None
         self.question_search_var = tk.StringVar(value="")
         self.search_in_text_var = tk.BooleanVar(value=True)
         self.search_in_explanation_var = tk.BooleanVar(value=True)
         self.search_in_choices_var = tk.BooleanVar(value=True)
         self.search_in_meta_var = tk.BooleanVar(value=False)
         self.filtered_question_indices = []
+        self._filtered_row_lookup = {}
+        self._search_field_cache = {}
+        self._search_results_cache = {}
+        self._last_search_key = None
+        self._question_search_job = None
+        self._question_trigram_index = None
+        self._question_trigram_fields = None
+        self._question_trigram_members = {}
+        self.question_search_is_fuzzy = False
         self.is_maximized = False
-        self.question_search_var.trace_add("write", lambda *_: self.refresh_questions_list())
+        self.on_close = None
+        # Set by the owner to a callable returning every open (not pooled) editor.
+        self.list_editors = None
+        self.question_search_var.trace_add("write", lambda *_: self._schedule_question_search())
         self.search_in_text_var.trace_add("write", lambda *_: self.refresh_questions_list())
         self.search_in_explanation_var.trace_add("write", lambda *_: self.refresh_questions_list())
         self.search_in_choices_var.trace_add("write", lambda *_: self.refresh_questions_list())
@@ -889,10 +1642,106 @@ class AdvancedChapterEditor:
         self.window.bind("<Control-m>", self.toggle_maximize)
         self.window.bind("<Control-Shift-M>", self.minimize_window)
         self.window.bind("<Configure>", self.on_window_configure)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
         
         self.load_chapter_data()
         self.setup_ui()
         self.refresh_questions_list()
+
+    def load_chapter(self, chapter_file, section_path, base_path=None):
+        """Swap another chapter into this editor, keeping the built widget tree."""
+        self.chapter_file = Path(chapter_file)
+        self.section_path = Path(section_path)
+        if base_path is not None:
+            self.base_path = Path(base_path)
+        self.images_folder = self.base_path / self.section_path / "images"
+        self.images_folder.mkdir(parents=True, exist_ok=True)
+        self.thumbnail_cache = get_thumbnail_cache(self.base_path)
+        _ensure_backup_paths(self.base_path)
+        self.window.title(f"Advanced Chapter Editor - {self.chapter_file.stem}")
+
+        self.current_question_idx = None
+        self.current_image_path = None
+        self.question_search_var.set("")
+        self._cancel_question_search_job()
+
+        self.load_chapter_data()
+        if not self.window.winfo_exists():
+            return False
+        self.clear_question_form()
+        self.refresh_questions_list()
+        return True
+
+    def clear_question_form(self):
+        """Empty the question form so no field shows data from a previous chapter."""
+        for entry in (self.q_id, self.q_number, self.q_correct):
+            entry.delete(0, tk.END)
+        self.q_image.config(state="normal")
+        self.q_image.delete(0, tk.END)
+        self.q_image.config(state="readonly")
+        self._set_preview_text("No image selected")
+        self.q_input_type.set("radio")
+        for text_editor in (self.q_text, self.q_explanation):
+            text_editor.delete(1.0, tk.END)
+            text_editor.text.edit_reset()
+        self.choices_listbox.delete(0, tk.END)
+        self.editor_canvas.yview_moveto(0)
+
+    def _form_state(self):
+        if self.current_question_idx is None:
+            return None
+        return (
+            self.q_id.get(), self.q_number.get(), self.q_text.get(1.0, tk.END), self.q_image.get(),
+            self.q_input_type.get(), self.q_correct.get(), self.q_explanation.get(1.0, tk.END),
+        )
+
+    def _mark_saved(self):
+        self._saved_questions = json.dumps(self.questions, sort_keys=True, ensure_ascii=False)
+        self._form_snapshot = self._form_state()
+
+    def has_unsaved_changes(self):
+        """True when the questions or the question form differ from the chapter file."""
+        try:
+            if not self.window.winfo_exists():
+                return False
+        except tk.TclError:
+            return False
+        if self._form_state() != self._form_snapshot:
+            return True
+        return json.dumps(self.questions, sort_keys=True, ensure_ascii=False) != self._saved_questions
+
+    def in_memory_image_refs(self):
+        """Normalized image paths used by the questions and the form, including unsaved ones."""
+        section_rel = self.section_path.as_posix()
+        refs = set()
+        for q in self.questions:
+            if isinstance(q, dict):
+                refs.update(question_image_refs(q, section_rel))
+        if self.current_question_idx is not None:
+            try:
+                form = {
+                    "image": self.q_image.get(),
+                    "text": self.q_text.get(1.0, tk.END),
+                    "explanation": self.q_explanation.get(1.0, tk.END),
+                }
+            except tk.TclError:
+                form = {}
+            refs.update(question_image_refs(form, section_rel))
+        return refs
+
+    def show(self):
+        """Bring the editor window to the front."""
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+
+    def close(self):
+        """Close the editor, handing the window back to its owner when pooled."""
+        self._cancel_question_search_job()
+        if self.on_close is not None:
+            self.on_close(self)
+        else:
+            self.window.destroy()
         
     def load_chapter_data(self):
         """Load chapter JSON file"""
@@ -909,7 +1758,9 @@ class AdvancedChapterEditor:
                 self.chapter_data = {"questions": [], "title": ""}
             
             self.questions = self.chapter_data.get("questions", [])
+            self._invalidate_question_search()
             self.sync_question_count()
+            self._mark_saved()
             
             # Debug: Show how many questions loaded and if they have images
             print(f"DEBUG: Loaded {len(self.questions)} questions from {self.chapter_file.name}")
@@ -1042,8 +1893,11 @@ class AdvancedChapterEditor:
             side=tk.LEFT, padx=(0, 6))
         search_entry = ttk.Entry(search_frame, textvariable=self.question_search_var, bootstyle="info")
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind("<Return>", self._run_question_search)
         ttk.Button(search_frame, text="Clear", command=self.clear_question_search,
                   width=6, bootstyle="secondary-outline").pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Button(search_frame, text="?", command=self.show_search_syntax_help,
+                  width=2, bootstyle="secondary-outline").pack(side=tk.LEFT, padx=(4, 0))
 
         search_options_frame = ttk.Frame(left_frame)
         search_options_frame.pack(fill=tk.X, pady=(0, 6))
@@ -1073,18 +1927,8 @@ class AdvancedChapterEditor:
             bootstyle="info-round-toggle",
         ).pack(side=tk.LEFT, padx=4)
 
-        list_scroll = ttk.Scrollbar(left_frame, orient=tk.VERTICAL)
-        self.questions_listbox = tk.Listbox(
-            left_frame,
-            yscrollcommand=list_scroll.set,
-            selectmode=tk.EXTENDED,
-            exportselection=False,
-        )
-        _style_tk_listbox(self.questions_listbox)
-        list_scroll.config(command=self.questions_listbox.yview)
-
-        self.questions_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        list_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.questions_listbox = VirtualListbox(left_frame, row_text=self._question_row_text)
+        self.questions_listbox.pack(fill=tk.BOTH, expand=True)
 
         self.questions_listbox.bind("<<ListboxSelect>>", self.on_question_select)
         self.questions_listbox.bind("<Button-3>", self.show_question_context_menu)
@@ -1195,7 +2039,7 @@ class AdvancedChapterEditor:
         if hasattr(self, "editor_canvas"):
             self.editor_canvas.configure(bg=palette["card_bg"])
         if hasattr(self, "questions_listbox"):
-            _style_tk_listbox(self.questions_listbox)
+            _style_tk_listbox(self.questions_listbox.listbox)
         if hasattr(self, "choices_listbox"):
             _style_tk_listbox(self.choices_listbox)
         if hasattr(self, "q_text") and isinstance(self.q_text, FormattedTextEditor):
@@ -1204,7 +2048,7 @@ class AdvancedChapterEditor:
             self.q_explanation.apply_theme()
 
     def _backup_operation(self, action, details, paths):
-        entry_dir, payload_dir, meta = _create_backup_entry(
+        entry_dir, manifest, meta = _create_backup_entry(
             self.base_path,
             action,
             self.section_path.name,
@@ -1212,9 +2056,10 @@ class AdvancedChapterEditor:
         )
         copied = []
         for path in paths:
-            rel = _backup_copy_path(path, self.base_path, payload_dir)
+            rel = _backup_copy_path(path, self.base_path, manifest)
             if rel:
                 copied.append(rel)
+        _write_backup_manifest(entry_dir, manifest)
         with open(Path(entry_dir) / "metadata.json", "w", encoding="utf-8") as f:
             meta["files"] = copied
             json.dump(meta, f, indent=2, ensure_ascii=False)
@@ -1232,6 +2077,7 @@ class AdvancedChapterEditor:
 
     def open_backup_folder(self):
         """Open the backup folder in file explorer."""
+        import webbrowser
         backup_root = _backup_root_for(self.base_path)
         try:
             if hasattr(os, "startfile"):
@@ -1250,10 +2096,28 @@ class AdvancedChapterEditor:
         latest = entries[0]
         if not messagebox.askyesno("Restore Backup", f"Restore latest backup '{latest.get('id', '')}'?"):
             return
-        restored = _restore_backup_entry(self.base_path, latest["entry_dir"])
-        self.load_chapter_data()
-        self.refresh_questions_list()
-        self.update_status(f"Restored backup ({restored} file(s))", "blue")
+        self._restore_backup_in_background(latest, "Restored backup ({restored} file(s))")
+
+    def _restore_backup_in_background(self, entry, status_template):
+        """Restore a backup snapshot on a worker and reload the chapter afterwards."""
+        def done(restored):
+            if not self.window.winfo_exists():
+                return
+            self.load_chapter_data()
+            self.refresh_questions_list()
+            self.update_status(status_template.format(restored=restored), "blue")
+
+        def failed(exc):
+            messagebox.showerror("Restore Backup", f"Unable to restore backup: {exc}")
+
+        self.update_status("Restoring backup...", "orange")
+        get_task_runner(self.window).submit(
+            f"Restore backup {entry.get('id', '')}",
+            lambda task: _restore_backup_entry(self.base_path, entry["entry_dir"]),
+            on_done=done,
+            on_error=failed,
+            key=f"restore_backup:{self.base_path}",
+        )
 
     def clear_backup_history(self):
         """Clear all backup snapshots and logs."""
@@ -1323,10 +2187,9 @@ class AdvancedChapterEditor:
                 return
             if not messagebox.askyesno("Restore Backup", f"Restore '{entry.get('id', '')}'?"):
                 return
-            restored = _restore_backup_entry(self.base_path, entry["entry_dir"])
-            self.load_chapter_data()
-            self.refresh_questions_list()
-            self.update_status(f"Restored backup {entry.get('id', '')} ({restored} file(s))", "blue")
+            self._restore_backup_in_background(
+                entry, f"Restored backup {entry.get('id', '')} ({{restored}} file(s))"
+            )
 
         def delete_selected():
             entry = selected_entry()
@@ -1407,7 +2270,7 @@ class AdvancedChapterEditor:
         self.image_preview_frame.pack(fill=tk.BOTH, padx=10, pady=(0, 10), ipady=20, expand=False)
 
         self.image_preview_label = ttk.Label(self.image_preview_frame, text="No image selected",
-                                              style="Muted.TLabel")
+                                              style="Muted.TLabel", compound=tk.TOP)
         self.image_preview_label.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
         # Input Type
@@ -1463,20 +2326,35 @@ class AdvancedChapterEditor:
     
     def refresh_questions_list(self):
         """Refresh questions list"""
+        # Edits and reordering can change any cached search result.
+        self._search_results_cache.clear()
+        self._last_search_key = None
+        self._render_questions_list()
+
+    def _render_questions_list(self, filtered_indices=None):
+        """Rebuild listbox rows for the given (or freshly filtered) question indexes."""
         selected_actual_indices = self.get_selected_question_indices()
         if not selected_actual_indices and self.current_question_idx is not None:
             selected_actual_indices = [self.current_question_idx]
 
-        self.filtered_question_indices = self.get_filtered_question_indices()
-        self.questions_listbox.delete(0, tk.END)
-        for display_idx, question_idx in enumerate(self.filtered_question_indices):
-            q = self.questions[question_idx]
-            display = f"{question_idx + 1}. {q.get('number', '')} - {q.get('text', '')[:60]}"
-            self.questions_listbox.insert(tk.END, display)
+        if filtered_indices is None:
+            filtered_indices = self.get_filtered_question_indices()
+        self.filtered_question_indices = filtered_indices
+        self._filtered_row_lookup = {question_idx: row for row, question_idx in enumerate(filtered_indices)}
+        # Only the rows scrolled into view are formatted (see _question_row_text).
+        self.questions_listbox.set_row_count(len(filtered_indices))
 
         self.restore_question_selection(selected_actual_indices)
         self._update_editor_status_strip()
 
+    def _question_row_text(self, row):
+        """Format one visible question list row."""
+        if not (0 <= row < len(self.filtered_question_indices)):
+            return ""
+        question_idx = self.filtered_question_indices[row]
+        q = self.questions[question_idx]
+        return f"{question_idx + 1}. {q.get('number', '')} - {str(q.get('text', ''))[:60]}"
+
     def _update_editor_status_strip(self):
         """Update the bottom status strip for question counts and selection."""
         if not hasattr(self, "editor_status_label"):
@@ -1484,59 +2362,145 @@ class AdvancedChapterEditor:
         total = len(self.questions)
         visible = len(self.filtered_question_indices)
         selected = len(self.questions_listbox.curselection()) if hasattr(self, "questions_listbox") else 0
+        fuzzy_note = " (fuzzy)" if self.question_search_is_fuzzy and self.question_search_var.get().strip() else ""
         self.editor_status_label.config(
-            text=f"Questions: {total} | Visible: {visible} | Selected: {selected}"
+            text=f"Questions: {total} | Visible: {visible}{fuzzy_note} | Selected: {selected}"
         )
 
+    def _cancel_question_search_job(self):
+        if self._question_search_job is not None:
+            try:
+                self.window.after_cancel(self._question_search_job)
+            except tk.TclError:
+                pass
+            self._question_search_job = None
+
+    def _schedule_question_search(self, delay_ms=150):
+        """Debounce search-box typing so only the final keystroke filters."""
+        self._cancel_question_search_job()
+        self._question_search_job = self.window.after(delay_ms, self._run_question_search)
+
+    def _run_question_search(self, event=None):
+        """Apply the current search query, skipping the rebuild when results are unchanged."""
+        self._cancel_question_search_job()
+        try:
+            if not self.window.winfo_exists():
+                return
+        except tk.TclError:
+            return
+
+        filtered_indices = self.get_filtered_question_indices()
+        if filtered_indices == self.filtered_question_indices:
+            self._update_editor_status_strip()
+            return
+        self._render_questions_list(filtered_indices)
+
     def get_filtered_question_indices(self):
-        """Return question indexes that match the current search filter."""
-        term = self._normalize_for_compare(self.question_search_var.get())
-        if not term:
+        """Return question indexes that match the current search query.
+
+        The query is compiled once (see question_search.SearchQuery for the
+        field:value syntax) and evaluated against cached per-field values.
+        """
+        query = compile_query(self.question_search_var.get())
+        if not query:
             return list(range(len(self.questions)))
 
+        field_names = tuple(self._active_search_fields())
+        search_key = (field_names, query)
+        cached = self._search_results_cache.get(search_key)
+        if cached is not None:
+            self._last_search_key = search_key
+            self.question_search_is_fuzzy = cached[1]
+            return list(cached[0])
+
+        # A stricter query can only narrow the previous matches,
+        # so only the previous result set needs to be re-filtered.
+        candidates = range(len(self.questions))
+        if self._last_search_key is not None:
+            last_fields, last_query = self._last_search_key
+            last_results = self._search_results_cache.get(self._last_search_key)
+            if last_fields == field_names and last_results is not None and query.refines(last_query):
+                candidates = last_results[0]
+
         matches = []
-        for idx, question in enumerate(self.questions):
-            haystack = self._question_search_blob(question)
-            if term in haystack:
+        for idx in candidates:
+            if query.matches(self._question_search_fields(self.questions[idx]), field_names):
                 matches.append(idx)
+
+        # No exact hit for a plain phrase (usually a typo): fall back to ranked trigram matches.
+        fuzzy = False
+        if not matches and query.is_plain:
+            matches = self._fuzzy_question_indices(query.plain_text, field_names)
+            fuzzy = bool(matches)
+
+        if len(self._search_results_cache) >= 64:
+            self._search_results_cache.pop(next(iter(self._search_results_cache)))
+        self._search_results_cache[search_key] = (tuple(matches), fuzzy)
+        self._last_search_key = search_key
+        self.question_search_is_fuzzy = fuzzy
         return matches
 
-    def _question_search_blob(self, question):
-        """Build searchable text for a question."""
-        parts = []
+    def _fuzzy_question_indices(self, term, field_names):
+        """Return question indexes ranked by trigram similarity to the search term."""
+        if self._question_trigram_index is None or self._question_trigram_fields != field_names:
+            self._question_trigram_index = TrigramIndex()
+            self._question_trigram_fields = field_names
+            self._question_trigram_members = {}
+
+        # Questions are keyed by identity so edits and reordering only
+        # re-index the questions that actually changed.
+        index = self._question_trigram_index
+        members = self._question_trigram_members
+        positions = {}
+        for idx, question in enumerate(self.questions):
+            key = id(question)
+            positions[key] = idx
+            if members.get(key) is not question:
+                fields = self._question_search_fields(question)
+                index.add(key, " ".join(fields[name] for name in field_names))
+                members[key] = question
+
+        return [positions[key] for key, _ in index.search(term) if key in positions]
+
+    def _active_search_fields(self):
+        """Return the searchable field names enabled by the search toggles."""
+        field_names = []
+        if self.search_in_text_var.get():
+            field_names.append("text")
+        if self.search_in_explanation_var.get():
+            field_names.append("explanation")
+        if self.search_in_choices_var.get():
+            field_names.append("choices")
+        if self.search_in_meta_var.get():
+            field_names.append("meta")
 
         # Keep text searchable by default even if all options are unchecked.
-        search_text = self.search_in_text_var.get()
-        search_explanation = self.search_in_explanation_var.get()
-        search_choices = self.search_in_choices_var.get()
-        search_meta = self.search_in_meta_var.get()
-        if not any([search_text, search_explanation, search_choices, search_meta]):
-            search_text = True
-
-        if search_text:
-            parts.append(question.get("text", ""))
-
-        if search_explanation:
-            parts.append(question.get("explanation", ""))
-
-        if search_choices:
-            for choice in question.get("choices", []) or []:
-                parts.extend([
-                    choice.get("value", ""),
-                    choice.get("label", ""),
-                    choice.get("text", ""),
-                ])
-
-        if search_meta:
-            parts.extend([
-                question.get("id", ""),
-                question.get("number", ""),
-                question.get("correctAnswer", ""),
-                question.get("inputType", ""),
-                question.get("image", ""),
-            ])
-
-        return self._normalize_for_compare(" ".join(str(part) for part in parts if part is not None))
+        return field_names or ["text"]
+
+    def _question_search_fields(self, question):
+        """Return cached normalized search values per field for a question."""
+        cached = self._search_field_cache.get(id(question))
+        if cached is not None and cached[0] is question:
+            return cached[1]
+
+        fields = question_fields(question)
+        # Keep a reference to the question so its id() cannot be reused while cached.
+        self._search_field_cache[id(question)] = (question, fields)
+        return fields
+
+    def _invalidate_question_search(self, questions=None):
+        """Drop cached search fields for edited questions, or all when none are given."""
+        self._search_results_cache.clear()
+        self._last_search_key = None
+        if questions is None:
+            self._search_field_cache.clear()
+            self._question_trigram_index = None
+            self._question_trigram_members = {}
+            return
+        for question in questions:
+            self._search_field_cache.pop(id(question), None)
+            if self._question_trigram_members.pop(id(question), None) is not None:
+                self._question_trigram_index.remove(id(question))
 
     def get_selected_question_indices(self):
         """Map selected listbox rows to actual question indexes."""
@@ -1560,19 +2524,51 @@ class AdvancedChapterEditor:
 
         selected_rows = []
         for actual_idx in selected_actual_indices:
-            if actual_idx in self.filtered_question_indices:
-                selected_rows.append(self.filtered_question_indices.index(actual_idx))
+            row_idx = self._filtered_row_lookup.get(actual_idx)
+            if row_idx is not None:
+                selected_rows.append(row_idx)
 
         for row_idx in selected_rows:
             self.questions_listbox.selection_set(row_idx)
         if selected_rows:
             self.questions_listbox.activate(selected_rows[0])
+            self.questions_listbox.see(selected_rows[0])
 
     def clear_question_search(self):
         """Clear the question search filter."""
         self.question_search_var.set("")
-        self.refresh_questions_list()
-    
+        self._run_question_search()
+
+    def show_search_syntax_help(self):
+        """Explain the field-qualified search syntax."""
+        messagebox.showinfo(
+            "Search Syntax",
+            "Plain text searches the checked fields.\n\n"
+            "text:word    exp:word    choice:word    meta:word\n"
+            "id:q12    num:5    image:diagram.png\n"
+            "answer:B    answer:AC    type:checkbox\n"
+            "has:image | explanation | choices | code | math | diagram\n"
+            "lang:mermaid    lang:graphviz    lang:java\n\n"
+            "\"quoted phrase\"  matches words together\n"
+            "-clause  excludes matches, e.g. -has:explanation\n\n"
+            "Example: text:thread answer:B has:image -has:explanation",
+            parent=self.window,
+        )
+
+    def focus_question(self, question_idx):
+        """Select and display one question, clearing the filter if it hides it."""
+        if question_idx is None or not (0 <= question_idx < len(self.questions)):
+            return
+        if question_idx not in self._filtered_row_lookup:
+            self.clear_question_search()
+        self.current_question_idx = question_idx
+        self.restore_question_selection([question_idx])
+        self.display_question()
+        self._update_editor_status_strip()
+        self.window.deiconify()
+        self.window.lift()
+        self.window.focus_force()
+
     def on_question_select(self, event):
         """Handle question selection"""
         selected_indices = self.get_selected_question_indices()
@@ -1592,11 +2588,12 @@ class AdvancedChapterEditor:
             return
         
         # Ensure the clicked item is selected
-        if idx not in self.questions_listbox.curselection():
+        if not self.questions_listbox.selection_includes(idx):
             self.questions_listbox.selection_clear(0, tk.END)
             self.questions_listbox.selection_set(idx)
             self.questions_listbox.activate(idx)
-            self.current_question_idx = idx
+            # Rows are positions in the filtered view, not question indexes.
+            self.current_question_idx = self.filtered_question_indices[idx]
             self.display_question()
         
         # Create context menu
@@ -1644,32 +2641,14 @@ class AdvancedChapterEditor:
             self.q_image.insert(0, str(image_path))  # Ensure it's a string
         self.q_image.config(state="readonly")
         
-        # Update image preview - with better path handling
+        # Update image preview (thumbnail comes from the cache or a worker)
         if image_path and str(image_path).strip():
             image_path_str = str(image_path).strip()
-            # Convert forward slashes to backslashes for Windows
-            normalized_path = image_path_str.replace('/', '\\')
-            full_path = self.base_path / normalized_path
-            
-            print(f"DEBUG: Checking image path")
-            print(f"  Stored path: {image_path_str}")
-            print(f"  Normalized: {normalized_path}")
-            print(f"  Full path: {full_path}")
-            print(f"  Exists: {full_path.exists()}")
-            
-            if full_path.exists():
-                try:
-                    img_size = full_path.stat().st_size / 1024
-                    img_name = Path(image_path_str).name
-                    preview_text = f"✓ Image: {img_name}\nSize: {img_size:.1f} KB"
-                    self.image_preview_label.config(text=preview_text)
-                except Exception as e:
-                    self.image_preview_label.config(text=f"Error: {str(e)}")
-            else:
-                # File not found - show diagnostic info
-                self.image_preview_label.config(text=f"⚠️ Image not found\n\nPath: {image_path_str}\n\n(Checked: {full_path})")
+            full_path = self.base_path / image_path_str.replace('\\', '/')
+            self._show_image_preview(full_path, f"✓ Image: {Path(image_path_str).name}", image_path_str)
         else:
-            self.image_preview_label.config(text="No image selected")
+            self._set_preview_text("No image selected")
+        self._prefetch_thumbnails(self.current_question_idx)
         
         self.q_input_type.set(q.get('inputType', 'radio'))
         
@@ -1681,6 +2660,7 @@ class AdvancedChapterEditor:
         
         # Load choices
         self.refresh_choices_list()
+        self._form_snapshot = self._form_state()
     
     def refresh_choices_list(self):
         """Refresh choices list"""
@@ -1745,6 +2725,7 @@ class AdvancedChapterEditor:
                 q["choices"] = []
 
             q["choices"].append(new_choice)
+            self._invalidate_question_search([q])
             self.refresh_choices_list()
             dialog.destroy()
 
@@ -1812,6 +2793,7 @@ class AdvancedChapterEditor:
             choice["value"] = value
             choice["label"] = value
             choice["text"] = text
+            self._invalidate_question_search([q])
             self.refresh_choices_list()
             dialog.destroy()
 
@@ -1840,10 +2822,12 @@ class AdvancedChapterEditor:
         choice_idx = selection[0]
         q = self.questions[self.current_question_idx]
         del q.get('choices', [])[choice_idx]
+        self._invalidate_question_search([q])
         self.refresh_choices_list()
     
     def select_image(self):
         """Select image for current question"""
+        import uuid
         if self.current_question_idx is None:
             messagebox.showwarning("Warning", "Select a question first")
             return
@@ -1864,14 +2848,19 @@ class AdvancedChapterEditor:
             q_number = q.get('number', str(self.current_question_idx + 1))
             file_ext = src.suffix.lower()  # Get extension like .jpg, .png
             
-            # Rename image to imageN_UUID.ext format (unique to prevent overwrites)
-            safe_q_number = q_number.replace('.', '_')
-            unique_id = uuid.uuid4().hex[:8]
-            image_name = f"image{safe_q_number}_{unique_id}{file_ext}"
-            dest = self.images_folder / image_name
-            
-            # Copy image to images folder
-            shutil.copy2(src, dest)
+            # Reuse a byte-identical image already in the section instead of copying it again
+            dest = find_identical_file(self.images_folder, src)
+            if dest is not None:
+                image_name = dest.name
+            else:
+                # Rename image to imageN_UUID.ext format (unique to prevent overwrites)
+                safe_q_number = q_number.replace('.', '_')
+                unique_id = uuid.uuid4().hex[:8]
+                image_name = f"image{safe_q_number}_{unique_id}{file_ext}"
+                dest = self.images_folder / image_name
+
+                # Copy image to images folder
+                shutil.copy2(src, dest)
             
             # Get the section name from section_path
             section_name = Path(self.section_path).name
@@ -1894,7 +2883,7 @@ class AdvancedChapterEditor:
             messagebox.showinfo("Success", f"Image saved as:\n{image_name}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to copy image: {e}")
-            self.image_preview_label.config(text=f"Error: {str(e)}")
+            self._set_preview_text(f"Error: {str(e)}")
     
     def clear_image(self):
         """Clear image for current question"""
@@ -1902,35 +2891,112 @@ class AdvancedChapterEditor:
         self.q_image.delete(0, tk.END)
         self.q_image.config(state="readonly")
         self.current_image_path = None
-        self.image_preview_label.config(text="No image selected")
+        self._set_preview_text("No image selected")
     
     def update_image_preview(self, image_path, image_name):
         """Update image preview in UI"""
+        self._show_image_preview(Path(image_path), f"✓ Image loaded: {image_name}")
+
+    def _set_preview_text(self, text):
+        """Show a text-only preview and drop any pending thumbnail request."""
+        self._thumbnail_target = None
+        self.image_preview_label.config(text=text, image="")
+        self.image_preview_label._preview_image = None
+
+    def _set_preview_thumbnail(self, thumbnail, caption):
+        _, ImageTk = _load_pil()
+        tk_img = ImageTk.PhotoImage(thumbnail)
+        self.image_preview_label.config(image=tk_img, text=caption)
+        self.image_preview_label._preview_image = tk_img
+
+    def _show_image_preview(self, full_path, caption, display_path=None):
+        """Show the cached thumbnail of ``full_path`` now, or decode it on a worker."""
         try:
-            if not Path(image_path).exists():
-                self.image_preview_label.config(text="Image file not found ❌")
-                return
-            
-            # Show file info as text (file size and name)
-            img_size = Path(image_path).stat().st_size / 1024  # Size in KB
-            preview_text = f"✓ Image loaded: {image_name}\nSize: {img_size:.1f} KB"
-            self.image_preview_label.config(text=preview_text)
-        except Exception as e:
-            self.image_preview_label.config(text=f"Error: {str(e)}")
-    
-    def update_current_question(self):
-        """Update current question with edited values"""
-        if self.current_question_idx is None:
-            messagebox.showwarning("Warning", "No question selected")
+            stat = full_path.stat()
+        except OSError:
+            self._set_preview_text(
+                f"⚠️ Image not found\n\nPath: {display_path or full_path.name}\n\n(Checked: {full_path})"
+            )
             return
-        
-        q = self.questions[self.current_question_idx]
-        
-        q['id'] = self.q_id.get()
-        q['number'] = self.q_number.get()
-        q['text'] = self.q_text.get(1.0, tk.END).strip()
-        
-        # Get image path from entry field and save it properly
+        caption = f"{caption}\nSize: {stat.st_size / 1024:.1f} KB"
+        if _load_pil()[1] is None:
+            self._set_preview_text(caption)
+            return
+
+        thumbnail = self.thumbnail_cache.peek(full_path, stat)
+        if thumbnail is not None:
+            self._thumbnail_target = None
+            self._set_preview_thumbnail(thumbnail, caption)
+            return
+
+        self._set_preview_text(caption + "\n\nLoading preview...")
+        self._thumbnail_target = full_path
+        runner = get_preview_runner(self.window)
+        if self._thumbnail_task is not None and self._thumbnail_task.active:
+            runner.cancel(self._thumbnail_task.task_id)
+
+        def load(task):
+            task.check()
+            return self.thumbnail_cache.get(full_path, stat)
+
+        def done(thumbnail):
+            if self._thumbnail_target != full_path or not self.window.winfo_exists():
+                return
+            self._thumbnail_target = None
+            if thumbnail is None:
+                self._set_preview_text(caption)
+            else:
+                self._set_preview_thumbnail(thumbnail, caption)
+
+        def failed(exc):
+            if self._thumbnail_target == full_path and self.window.winfo_exists():
+                self._set_preview_text(f"{caption}\n\nPreview unavailable: {exc}")
+
+        self._thumbnail_task = runner.submit(
+            f"Preview {full_path.name}", load, on_done=done, on_error=failed
+        )
+
+    def _prefetch_thumbnails(self, idx, radius=3):
+        """Warm the thumbnail cache for the questions around ``idx``."""
+        if idx is None or _load_pil()[0] is None:
+            return
+        paths = []
+        for offset in range(1, radius + 1):
+            for neighbour in (idx + offset, idx - offset):
+                if 0 <= neighbour < len(self.questions):
+                    image_path = str(self.questions[neighbour].get('image') or '').strip()
+                    if image_path:
+                        paths.append(self.base_path / image_path.replace('\\', '/'))
+        if not paths:
+            return
+
+        def warm(task):
+            for pos, path in enumerate(paths):
+                task.report(pos, len(paths), path.name)
+                try:
+                    self.thumbnail_cache.get(path)
+                except Exception:
+                    pass
+
+        # Only the newest neighbourhood matters; replace an older prefetch still running.
+        runner = get_preview_runner(self.window)
+        if self._prefetch_task is not None and self._prefetch_task.active:
+            runner.cancel(self._prefetch_task.task_id)
+        self._prefetch_task = runner.submit("Prefetch image previews", warm)
+    
+    def update_current_question(self):
+        """Update current question with edited values"""
+        if self.current_question_idx is None:
+            messagebox.showwarning("Warning", "No question selected")
+            return
+        
+        q = self.questions[self.current_question_idx]
+        
+        q['id'] = self.q_id.get()
+        q['number'] = self.q_number.get()
+        q['text'] = self.q_text.get(1.0, tk.END).strip()
+        
+        # Get image path from entry field and save it properly
         image_path = self.q_image.get().strip()
         if image_path:
             q['image'] = image_path
@@ -1942,6 +3008,7 @@ class AdvancedChapterEditor:
         q['correctAnswer'] = self.q_correct.get()
         self._normalize_question_answer_fields(q, force_input_type=True)
         q['explanation'] = self.q_explanation.get(1.0, tk.END).strip()
+        self._invalidate_question_search([q])
         self.sync_question_count()
         
         self.refresh_questions_list()
@@ -1959,15 +3026,13 @@ class AdvancedChapterEditor:
         subject_id = self.section_path.name if self.section_path else ""
         issues = []
 
-        for i, q in enumerate(self.questions):
-            q_num = str(q.get("number") or i + 1)
-            text_warnings = validate_diagram_blocks(q.get("text", ""), subject_id=subject_id)
-            for warning in text_warnings:
-                issues.append(f"Q{q_num} text L{warning['line']}: {warning['message']}")
-
-            exp_warnings = validate_diagram_blocks(q.get("explanation", ""), subject_id=subject_id)
-            for warning in exp_warnings:
-                issues.append(f"Q{q_num} explanation L{warning['line']}: {warning['message']}")
+        items = (
+            ((str(q.get("number") or i + 1), field), str(q.get(field) or ""))
+            for i, q in enumerate(self.questions)
+            for field in ("text", "explanation")
+        )
+        for (q_num, field), warning in iter_diagram_warnings(items, subject_id=subject_id):
+            issues.append(f"Q{q_num} {field} L{warning['line']}: {warning['message']}")
 
         if not issues:
             messagebox.showinfo("Validate Diagrams", "No diagram warnings found.")
@@ -2088,6 +3153,8 @@ class AdvancedChapterEditor:
                 answer_changes += 1
             if type_changed:
                 type_changes += 1
+            if answer_changed or type_changed:
+                self._invalidate_question_search([question])
 
         self.refresh_questions_list()
         if self.current_question_idx is not None and self.questions:
@@ -2126,6 +3193,8 @@ class AdvancedChapterEditor:
                 choice_changes += 1
             if answer_changed:
                 answer_changes += 1
+            if choices_changed or answer_changed:
+                self._invalidate_question_search([question])
 
         self.refresh_questions_list()
         if self.current_question_idx is not None and self.questions:
@@ -2177,6 +3246,7 @@ class AdvancedChapterEditor:
 
     def duplicate_question(self):
         """Duplicate the currently selected question"""
+        import uuid
         if self.current_question_idx is None or self.current_question_idx >= len(self.questions):
             messagebox.showwarning("Warning", "Select a question first")
             return
@@ -2438,6 +3508,7 @@ class AdvancedChapterEditor:
 
     def _question_text_similarity(self, left, right):
         """Compute fuzzy similarity between two question titles."""
+        from difflib import SequenceMatcher
         if not left or not right:
             return 0.0
         seq = SequenceMatcher(None, left, right).ratio()
@@ -2449,6 +3520,7 @@ class AdvancedChapterEditor:
 
     def _question_choices_similarity(self, q1, q2):
         """Compute fuzzy similarity between two questions' choices."""
+        from difflib import SequenceMatcher
         c1 = [self._normalize_for_compare(c.get("text", "")) for c in q1.get("choices", []) or []]
         c2 = [self._normalize_for_compare(c.get("text", "")) for c in q2.get("choices", []) or []]
         c1 = [c for c in c1 if c]
@@ -2507,6 +3579,7 @@ class AdvancedChapterEditor:
             return
 
         previous_idx = self.current_question_idx
+        self._invalidate_question_search([self.questions[idx] for idx in selected_indexes])
         for idx in reversed(selected_indexes):
             del self.questions[idx]
 
@@ -2548,6 +3621,7 @@ class AdvancedChapterEditor:
             old_number = str(question.get("number", ""))
             if old_number != new_number:
                 question["number"] = new_number
+                self._invalidate_question_search([question])
                 changed += 1
 
         self.refresh_questions_list()
@@ -2586,6 +3660,7 @@ class AdvancedChapterEditor:
         for question in self.questions:
             fixed_count = _fix_escaped_newlines_in_question(question)
             if fixed_count:
+                self._invalidate_question_search([question])
                 touched_questions += 1
                 replacements += fixed_count
 
@@ -2624,6 +3699,7 @@ class AdvancedChapterEditor:
         for question in self.questions:
             fixed_count = _fix_double_backslashes_in_question(question)
             if fixed_count:
+                self._invalidate_question_search([question])
                 touched_questions += 1
                 replacements += fixed_count
 
@@ -2685,6 +3761,7 @@ class AdvancedChapterEditor:
             return
 
         previous_idx = self.current_question_idx
+        self._invalidate_question_search([self.questions[idx] for idx in duplicate_indexes])
 
         for idx in reversed(duplicate_indexes):
             del self.questions[idx]
@@ -2796,10 +3873,24 @@ class AdvancedChapterEditor:
             )
 
             if del_image_var.get():
+                deleted = set(selected_question_indices)
+                kept_images = {
+                    normalize_image_ref(q.get('image', ''), "")
+                    for idx, q in enumerate(self.questions) if idx not in deleted and q.get('image')
+                }
+                kept_images |= _images_used_elsewhere(
+                    self.base_path,
+                    [self.questions[idx].get('image', '') for idx in selected_question_indices],
+                    exclude=[self.chapter_file],
+                    editors=self.list_editors() if self.list_editors else (),
+                )
                 for idx in selected_question_indices:
                     image_path = self.questions[idx].get('image', '')
                     if not image_path:
                         continue
+                    if normalize_image_ref(image_path, "") in kept_images:
+                        print(f"Kept shared image: {image_path}")
+                        continue
                     try:
                         img_path = self.base_path / image_path
                         if img_path.exists():
@@ -2809,6 +3900,7 @@ class AdvancedChapterEditor:
                         print(f"Warning: Failed to delete image {image_path}: {e}")
 
             previous_idx = self.current_question_idx
+            self._invalidate_question_search(selected_questions)
             for idx in reversed(selected_question_indices):
                 del self.questions[idx]
 
@@ -2901,6 +3993,7 @@ class AdvancedChapterEditor:
                 self._normalize_question_answer_fields(q, force_input_type=True)
                 self._normalize_question_choice_ids(q)
                 q['explanation'] = self.q_explanation.get(1.0, tk.END).strip()
+                self._invalidate_question_search([q])
 
             # Ensure every question follows website-compatible answer format.
             self.fix_escaped_newlines(show_message=False)
@@ -2915,6 +4008,7 @@ class AdvancedChapterEditor:
             # Save to file
             with open(self.chapter_file, 'w', encoding='utf-8') as f:
                 json.dump(self.chapter_data, f, indent=2, ensure_ascii=False)
+            self._mark_saved()
             
             # Count questions with images
             questions_with_images = sum(1 for q in self.questions if q.get('image'))
@@ -2933,6 +4027,10 @@ class AdvancedChapterEditor:
             print(f"DEBUG: Error saving chapter: {e}")
             messagebox.showerror("Error", f"Failed to save chapter: {e}")
 
+# Closed chapter editors kept hidden for reuse instead of rebuilding their UI.
+CHAPTER_EDITOR_POOL_SIZE = 2
+
+
 class ExamEditor:
     def __init__(self, root):
         self.root = root
@@ -2948,6 +4046,9 @@ class ExamEditor:
         _ensure_backup_paths(self.base_path)
         
         self.sections = []
+        # False while sections.json is still being read; saving before then
+        # would overwrite it with the empty placeholder list.
+        self.sections_loaded = False
         self.current_section = None
         self.current_section_idx = None
         self.chapters = []
@@ -2956,13 +4057,24 @@ class ExamEditor:
         self.chapter_filter_var = tk.StringVar(value="")
         self.status_reset_job = None
         self.chapter_editor_windows = []
+        self.chapter_editor_pool = []
+        self.section_iids = []
+        self.chapter_iids = []
+        self.search_index = ProjectSearchIndex()
+        self.diagram_validator = None
+        self.image_index = None
+        self.global_search_window = None
+        self.task_panel_window = None
+        self.task_runner = get_task_runner(self.root)
         
         self.setup_ui()
+        self.task_runner.add_listener(self._on_tasks_changed)
         self._bind_shortcuts()
         default_project = Path(__file__).resolve().parents[1].name
         if default_project not in self.available_projects and self.available_projects:
             default_project = self.available_projects[0]
-        self.set_active_project(default_project, show_status=False)
+        # Sections load in the background so the window shows immediately.
+        self.set_active_project(default_project, show_status=False, background=True)
 
     def _detect_projects(self):
         """Detect available builder projects (prefers it/math)."""
@@ -2990,8 +4102,12 @@ class ExamEditor:
         if selected:
             self.set_active_project(selected)
 
-    def set_active_project(self, project_name, show_status=True):
-        """Switch the editor context to one project (it/math)."""
+    def set_active_project(self, project_name, show_status=True, background=False):
+        """Switch the editor context to one project (it/math).
+
+        With ``background`` the section list is read on a worker thread and
+        filled in once it arrives.
+        """
         if not project_name:
             return
         if project_name not in self.available_projects:
@@ -3008,7 +4124,12 @@ class ExamEditor:
         self.current_chapter_idx = None
         self.chapters = []
 
-        self.load_sections()
+        if background:
+            self.sections = []
+            self.refresh_sections_tree()
+            self.load_sections_async()
+        else:
+            self.load_sections()
         self.refresh_chapters_tree()
         self.root.title(f"Exam Engine Editor [{project_name.upper()}]")
         if show_status:
@@ -3026,6 +4147,11 @@ class ExamEditor:
                   width=15, bootstyle="primary").pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Refresh", command=self.refresh_all,
                   width=12, bootstyle="info-outline").pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Search All", command=self.show_global_search,
+                  width=12, bootstyle="info-outline").pack(side=tk.LEFT, padx=5)
+        self.tasks_btn = ttk.Button(toolbar, text="Tasks", command=self.show_task_panel,
+                                    width=12, bootstyle="secondary-outline")
+        self.tasks_btn.pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Shortcuts", command=self.show_shortcuts_help,
                   width=12, bootstyle="secondary-outline").pack(side=tk.LEFT, padx=5)
 
@@ -3256,6 +4382,22 @@ class ExamEditor:
             label="Image Normalizing",
             command=self.image_normalizing,
         )
+        self.chapter_tools_menu.add_command(
+            label="Optimize Question Images",
+            command=self.optimize_question_images,
+        )
+        self.chapter_tools_menu.add_command(
+            label="Deduplicate Question Images",
+            command=self.deduplicate_question_images,
+        )
+        self.chapter_tools_menu.add_command(
+            label="Clean Up Orphaned Images",
+            command=self.clean_orphan_images,
+        )
+        self.chapter_tools_menu.add_command(
+            label="Validate Diagrams (All Sections)",
+            command=self.validate_project_diagrams,
+        )
 
         self.chapter_tools_btn = ttk.Button(
             chapters_header,
@@ -3323,6 +4465,8 @@ class ExamEditor:
 
         self.chapters_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         chapters_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.sections_tree_sync = TreeRowReconciler(self.sections_tree)
+        self.chapters_tree_sync = TreeRowReconciler(self.chapters_tree)
 
         self.chapters_tree.bind("<<TreeviewSelect>>", self.on_chapter_select)
         self.chapters_tree.bind("<Double-1>", self.on_chapter_double_click)
@@ -3435,19 +4579,72 @@ class ExamEditor:
 
     def _prune_chapter_editor_windows(self):
         """Drop references to chapter editor windows that are already closed."""
-        alive = []
-        for editor in self.chapter_editor_windows:
-            try:
-                if editor.window.winfo_exists():
-                    alive.append(editor)
-            except Exception:
+        def alive(editors):
+            kept = []
+            for editor in editors:
+                try:
+                    if editor.window.winfo_exists():
+                        kept.append(editor)
+                except Exception:
+                    continue
+            return kept
+
+        self.chapter_editor_windows = alive(self.chapter_editor_windows)
+        self.chapter_editor_pool = alive(self.chapter_editor_pool)
+
+    def _park_chapter_editor(self, editor):
+        """Hide a closed chapter editor so the next chapter can reuse its widgets."""
+        if editor in self.chapter_editor_windows:
+            self.chapter_editor_windows.remove(editor)
+        self._prune_chapter_editor_windows()
+        if len(self.chapter_editor_pool) >= CHAPTER_EDITOR_POOL_SIZE:
+            editor.window.destroy()
+            return
+        editor.window.withdraw()
+        self.chapter_editor_pool.append(editor)
+
+    def _live_chapter_editors(self):
+        """Return open and pooled AdvancedChapterEditor instances."""
+        self._prune_chapter_editor_windows()
+        return self.chapter_editor_windows + self.chapter_editor_pool
+
+    def _open_chapter_editors(self):
+        """Return visible chapter editors; pooled ones were closed and their edits discarded."""
+        self._prune_chapter_editor_windows()
+        return list(self.chapter_editor_windows)
+
+    def _warn_unsaved_chapter_editors(self, title, action):
+        """Ask to save open chapter editors first; return True when any has unsaved edits.
+
+        Pooled editors are not checked: closing an editor discards its edits
+        and reusing it reloads the chapter from disk.
+        """
+        unsaved = [editor for editor in self._open_chapter_editors() if editor.has_unsaved_changes()]
+        if not unsaved:
+            return False
+        names = "\n".join(f"  {editor.chapter_file.name}" for editor in unsaved)
+        messagebox.showwarning(title, f"Save or close these chapter editors before {action}:\n{names}")
+        return True
+
+    def _reload_chapter_editors(self, chapter_files):
+        """Reload open and pooled editors showing ``chapter_files`` from disk.
+
+        Returns the editors that were skipped because they have unsaved edits.
+        """
+        targets = {Path(path).resolve() for path in chapter_files}
+        skipped = []
+        for editor in self._live_chapter_editors():
+            if editor.chapter_file.resolve() not in targets:
                 continue
-        self.chapter_editor_windows = alive
+            if editor.has_unsaved_changes() and editor in self.chapter_editor_windows:
+                skipped.append(editor)
+                continue
+            editor.load_chapter(editor.chapter_file, editor.section_path)
+        return skipped
 
     def _apply_theme_to_open_chapter_editors(self):
-        """Re-theme any open AdvancedChapterEditor windows."""
-        self._prune_chapter_editor_windows()
-        for editor in self.chapter_editor_windows:
+        """Re-theme open and pooled AdvancedChapterEditor windows."""
+        for editor in self._live_chapter_editors():
             try:
                 editor.apply_theme()
             except Exception:
@@ -3467,6 +4664,7 @@ class ExamEditor:
 
     def open_backup_folder(self):
         """Open the backup folder in the OS file explorer."""
+        import webbrowser
         backup_root = _backup_root_for(self.base_path)
         _ensure_backup_paths(self.base_path)
         try:
@@ -3480,12 +4678,13 @@ class ExamEditor:
     def _backup_operation(self, action, details, paths):
         """Create one backup snapshot for an operation touching files/folders."""
         project = self.current_project or self.base_path.name
-        entry_dir, payload_dir, meta = _create_backup_entry(self.base_path, action, project, details)
+        entry_dir, manifest, meta = _create_backup_entry(self.base_path, action, project, details)
         copied = []
         for path in paths:
-            rel = _backup_copy_path(path, self.base_path, payload_dir)
+            rel = _backup_copy_path(path, self.base_path, manifest)
             if rel:
                 copied.append(rel)
+        _write_backup_manifest(entry_dir, manifest)
 
         with open(Path(entry_dir) / "metadata.json", "w", encoding="utf-8") as f:
             meta["files"] = copied
@@ -3507,11 +4706,32 @@ class ExamEditor:
         if not messagebox.askyesno("Restore Backup", f"Restore latest backup '{latest.get('id', '')}'?"):
             return
 
-        restored = _restore_backup_entry(self.base_path, latest["entry_dir"])
-        self.load_sections()
-        if self.current_section:
-            self.load_chapters()
-        self.update_status(f"Restored backup: {latest.get('action', 'snapshot')} ({restored} file(s))", "blue")
+        self._restore_backup_in_background(
+            latest, f"Restored backup: {latest.get('action', 'snapshot')} ({{restored}} file(s))"
+        )
+
+    def _restore_backup_in_background(self, entry, status_template):
+        """Restore a backup snapshot on a worker and reload the project afterwards."""
+        base_path = self.base_path
+
+        def done(restored):
+            if self.base_path != base_path:
+                return
+            self.load_sections()
+            if self.current_section:
+                self.load_chapters()
+            self.update_status(status_template.format(restored=restored), "blue")
+
+        def failed(exc):
+            messagebox.showerror("Restore Backup", f"Unable to restore backup: {exc}")
+
+        self._run_task(
+            f"Restore backup {entry.get('id', '')}",
+            lambda task: _restore_backup_entry(base_path, entry["entry_dir"]),
+            on_done=done,
+            on_error=failed,
+            key=f"restore_backup:{base_path}",
+        )
 
     def clear_backup_history(self):
         """Delete all backup snapshots and reset backup logs."""
@@ -3588,11 +4808,9 @@ class ExamEditor:
                 return
             if not messagebox.askyesno("Restore Backup", f"Restore '{entry.get('id', '')}'?"):
                 return
-            restored = _restore_backup_entry(self.base_path, entry["entry_dir"])
-            self.load_sections()
-            if self.current_section:
-                self.load_chapters()
-            self.update_status(f"Restored backup {entry.get('id', '')} ({restored} file(s))", "blue")
+            self._restore_backup_in_background(
+                entry, f"Restored backup {entry.get('id', '')} ({{restored}} file(s))"
+            )
 
         def delete_selected():
             entry = selected_entry()
@@ -3628,6 +4846,266 @@ class ExamEditor:
         history_list.bind("<<ListboxSelect>>", on_select)
         refresh_entries()
 
+    def show_global_search(self, event=None):
+        """Search questions across every chapter of every section."""
+        if self.global_search_window is not None:
+            try:
+                if self.global_search_window.winfo_exists():
+                    self.global_search_window.deiconify()
+                    self.global_search_window.lift()
+                    self.global_search_window.focus_force()
+                    self.global_search_window.search_entry.focus_set()
+                    return "break" if event is not None else None
+            except tk.TclError:
+                pass
+
+        dlg = tk.Toplevel(self.root)
+        _style_dialog(dlg, "Search All Questions", "1040x600")
+        dlg.transient(self.root)
+        self.global_search_window = dlg
+
+        frame = ttk.Frame(dlg, padding=14, bootstyle="dark")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(frame, text="Search All Questions", style="Header.TLabel").pack(anchor=tk.W, pady=(0, 8))
+
+        query_var = tk.StringVar(value="")
+        search_entry = ttk.Entry(frame, textvariable=query_var, bootstyle="info")
+        search_entry.pack(fill=tk.X, pady=(0, 6))
+        dlg.search_entry = search_entry
+
+        status_var = tk.StringVar(value="Type to search question text, choices and explanations.")
+        ttk.Label(frame, textvariable=status_var, style="Muted.TLabel").pack(anchor=tk.W, pady=(0, 6))
+
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+
+        scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        results_tree = ttk.Treeview(list_frame,
+                                    columns=("Subject", "Chapter", "Question", "Text"),
+                                    show="headings",
+                                    yscrollcommand=scroll.set,
+                                    selectmode="browse")
+        scroll.config(command=results_tree.yview)
+        results_tree.heading("Subject", text="Subject")
+        results_tree.heading("Chapter", text="Chapter")
+        results_tree.heading("Question", text="Q#")
+        results_tree.heading("Text", text="Question")
+        results_tree.column("Subject", width=150, minwidth=100, stretch=False)
+        results_tree.column("Chapter", width=220, minwidth=120, stretch=False)
+        results_tree.column("Question", width=60, minwidth=50, stretch=False)
+        results_tree.column("Text", width=560, minwidth=200, stretch=True)
+        palette = _get_theme_palette()
+        results_tree.tag_configure("oddrow", background=palette["row_odd"], foreground=palette["fg"])
+        results_tree.tag_configure("evenrow", background=palette["row_even"], foreground=palette["fg"])
+        results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        hits = []
+        search_job = [None]
+
+        def run_search(event=None):
+            if search_job[0] is not None:
+                try:
+                    dlg.after_cancel(search_job[0])
+                except tk.TclError:
+                    pass
+                search_job[0] = None
+            query = query_var.get().strip()
+            started = time.perf_counter()
+            # Only chapter files whose mtime/size changed are re-read.
+            self.search_index.refresh(self.base_path, self.sections)
+            results = self.search_index.search(query) if query else []
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            results_tree.delete(*results_tree.get_children())
+            hits[:] = results
+            for idx, hit in enumerate(results):
+                tag = "evenrow" if idx % 2 == 0 else "oddrow"
+                results_tree.insert("", tk.END, iid=str(idx), values=(
+                    hit["section_name"],
+                    hit["chapter_name"],
+                    hit["number"],
+                    hit["preview"],
+                ), tags=(tag,))
+
+            if query:
+                status_var.set(
+                    f"{len(results)} result(s) in {elapsed_ms:.1f} ms | "
+                    f"{len(self.search_index)} questions indexed"
+                )
+            else:
+                status_var.set(f"{len(self.search_index)} questions indexed. Type to search.")
+
+        def schedule_search(*_):
+            if search_job[0] is not None:
+                try:
+                    dlg.after_cancel(search_job[0])
+                except tk.TclError:
+                    pass
+            search_job[0] = dlg.after(150, run_search)
+
+        def open_selected(event=None):
+            sel = results_tree.selection()
+            if not sel:
+                return "break"
+            idx = int(sel[0])
+            if 0 <= idx < len(hits):
+                self.open_search_hit(hits[idx])
+            return "break"
+
+        def focus_results(event=None):
+            children = results_tree.get_children()
+            if children:
+                results_tree.focus_set()
+                results_tree.selection_set(children[0])
+                results_tree.focus(children[0])
+            return "break"
+
+        def on_return(event=None):
+            run_search()
+            if hits:
+                focus_results()
+                return open_selected()
+            return "break"
+
+        query_var.trace_add("write", schedule_search)
+        search_entry.bind("<Return>", on_return)
+        search_entry.bind("<Down>", focus_results)
+        results_tree.bind("<Double-1>", open_selected)
+        results_tree.bind("<Return>", open_selected)
+        dlg.bind("<Escape>", lambda e: dlg.destroy())
+
+        run_search()
+        search_entry.focus_set()
+        return "break" if event is not None else None
+
+    def open_search_hit(self, hit):
+        """Open a global search hit in the chapter editor with its question selected."""
+        chapter_file_path = Path(hit["chapter_file"])
+        if not chapter_file_path.exists():
+            messagebox.showerror("Error", f"Chapter file not found: {chapter_file_path}")
+            return None
+
+        editor = self._open_chapter_editor(chapter_file_path, hit["section_path"])
+        try:
+            editor.focus_question(hit["question_index"])
+        except tk.TclError:
+            return None
+        self.update_status(
+            f"Opened {hit['section_name']} / {hit['chapter_name']} question {hit['number']}", "blue"
+        )
+        return editor
+
+    def _run_task(self, title, func, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Run a heavy operation on the background task runner."""
+        task = self.task_runner.submit(
+            title, func, *args, on_done=on_done, on_error=on_error, key=key, **kwargs
+        )
+        if task.status == "queued":
+            self.update_status(f"Started: {title}", "blue")
+        else:
+            self.update_status(f"Already running: {task.title}", "orange")
+        return task
+
+    def _on_tasks_changed(self, runner):
+        """Keep the toolbar task counter in sync with the task runner."""
+        if not hasattr(self, "tasks_btn"):
+            return
+        active = runner.active_tasks()
+        try:
+            self.tasks_btn.config(text=f"Tasks ({len(active)})" if active else "Tasks")
+        except tk.TclError:
+            pass
+
+    def show_task_panel(self, event=None):
+        """Show running and recent background tasks with progress and cancel controls."""
+        if self.task_panel_window is not None:
+            try:
+                if self.task_panel_window.winfo_exists():
+                    self.task_panel_window.deiconify()
+                    self.task_panel_window.lift()
+                    return "break" if event is not None else None
+            except tk.TclError:
+                pass
+
+        dlg = tk.Toplevel(self.root)
+        _style_dialog(dlg, "Background Tasks", "820x360")
+        dlg.transient(self.root)
+        self.task_panel_window = dlg
+
+        frame = ttk.Frame(dlg, padding=14, bootstyle="dark")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(frame, text="Background Tasks", style="Header.TLabel").pack(anchor=tk.W, pady=(0, 8))
+
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+
+        scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
+        tasks_tree = ttk.Treeview(list_frame,
+                                  columns=("Task", "Status", "Progress", "Details"),
+                                  show="headings",
+                                  yscrollcommand=scroll.set,
+                                  selectmode="extended")
+        scroll.config(command=tasks_tree.yview)
+        tasks_tree.heading("Task", text="Task")
+        tasks_tree.heading("Status", text="Status")
+        tasks_tree.heading("Progress", text="Progress")
+        tasks_tree.heading("Details", text="Details")
+        tasks_tree.column("Task", width=220, minwidth=140, stretch=False)
+        tasks_tree.column("Status", width=90, minwidth=80, stretch=False)
+        tasks_tree.column("Progress", width=120, minwidth=90, stretch=False)
+        tasks_tree.column("Details", width=340, minwidth=160, stretch=True)
+        palette = _get_theme_palette()
+        tasks_tree.tag_configure("oddrow", background=palette["row_odd"], foreground=palette["fg"])
+        tasks_tree.tag_configure("evenrow", background=palette["row_even"], foreground=palette["fg"])
+        tasks_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        tasks_sync = TreeRowReconciler(tasks_tree)
+
+        def refresh_rows(runner=None):
+            try:
+                if not dlg.winfo_exists():
+                    return
+            except tk.TclError:
+                return
+            tasks = sorted(self.task_runner.tasks(), key=lambda task: task.task_id, reverse=True)
+            tasks_sync.sync([
+                (f"task:{task.task_id}", (task.title, task.status, task.progress_text(), task.message))
+                for task in tasks
+            ])
+
+        def selected_task_ids():
+            ids = []
+            for iid in tasks_tree.selection():
+                try:
+                    ids.append(int(iid.split(":", 1)[1]))
+                except (IndexError, ValueError):
+                    continue
+            return ids
+
+        def cancel_selected():
+            for task_id in selected_task_ids():
+                self.task_runner.cancel(task_id)
+
+        def close_panel():
+            self.task_runner.remove_listener(refresh_rows)
+            dlg.destroy()
+
+        controls = ttk.Frame(frame)
+        controls.pack(fill=tk.X, pady=(8, 0))
+        ttk.Button(controls, text="Cancel Selected", command=cancel_selected, bootstyle="danger-outline").pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Button(controls, text="Cancel All", command=self.task_runner.cancel_all, bootstyle="warning-outline").pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Button(controls, text="Clear Finished", command=self.task_runner.clear_finished, bootstyle="secondary-outline").pack(side=tk.LEFT, padx=(0, 6))
+        ttk.Button(controls, text="Close", command=close_panel, bootstyle="secondary-outline").pack(side=tk.RIGHT)
+
+        self.task_runner.add_listener(refresh_rows)
+        dlg.protocol("WM_DELETE_WINDOW", close_panel)
+        dlg.bind("<Escape>", lambda e: close_panel())
+        refresh_rows()
+        return "break" if event is not None else None
+
     def on_theme_change(self, event=None):
         """Apply selected ttkbootstrap theme instantly."""
         chosen = self.theme_var.get().strip()
@@ -3652,6 +5130,7 @@ class ExamEditor:
         self.root.bind("<F5>", lambda e: self.refresh_all())
         self.root.bind("<Control-f>", self.focus_chapter_filter)
         self.root.bind("<Control-Shift-F>", self.focus_section_filter)
+        self.root.bind("<Control-g>", self.show_global_search)
         self.root.bind("<F1>", lambda e: self.show_shortcuts_help())
 
     def show_shortcuts_help(self):
@@ -3663,6 +5142,7 @@ class ExamEditor:
             "F5      Refresh all\n"
             "Ctrl+F  Focus chapter filter\n"
             "Ctrl+Shift+F  Focus section filter\n"
+            "Ctrl+G  Search questions in all sections\n"
             "Esc     Clear filters\n"
             "F2      Edit selected item\n"
             "Delete  Remove selected item\n"
@@ -3719,6 +5199,17 @@ class ExamEditor:
                 return True
         return False
 
+    def _filter_rows(self, query, rows):
+        """Return row indexes matching the filter, ranked fuzzily when nothing matches exactly."""
+        exact = [idx for idx, values in rows if self._matches_filter(query, values)]
+        if exact or not str(query or "").strip():
+            return exact
+
+        index = TrigramIndex()
+        for idx, values in rows:
+            index.add(idx, " ".join(str(value or "") for value in values))
+        return [idx for idx, _ in index.search(query)]
+
     def _update_metrics(self):
         """Update top-level counters for quick overview."""
         section_count = len(self.sections)
@@ -3774,6 +5265,7 @@ class ExamEditor:
 
     def _store_section_icon(self, source_path, section_path_rel, resize_if_large=True, max_size=128):
         """Store uploaded section icon in the section folder and return relative icon path."""
+        Image = _load_pil()[0]
         src = Path(source_path)
         if not src.exists():
             raise FileNotFoundError(f"Icon source not found: {src}")
@@ -3804,6 +5296,8 @@ class ExamEditor:
 
     def _download_icon_url_to_temp(self, icon_url):
         """Download icon URL to a temporary file and return its path."""
+        import tempfile
+        import urllib.request
         raw = str(icon_url or "").strip()
         if not raw:
             raise ValueError("Icon URL is empty")
@@ -3853,8 +5347,28 @@ class ExamEditor:
             except Exception:
                 pass
 
+    def _store_section_icon_from_url_async(self, icon_url, section_path_rel, on_stored,
+                                           resize_if_large=True, max_size=128):
+        """Download and store a section icon on a worker, then call ``on_stored(icon_rel)``."""
+        def failed(exc):
+            messagebox.showerror("Error", f"Failed to download icon URL: {exc}")
+
+        return self._run_task(
+            f"Download icon for {section_path_rel}",
+            lambda task: self._store_section_icon_from_url(
+                icon_url,
+                section_path_rel,
+                resize_if_large=resize_if_large,
+                max_size=max_size,
+            ),
+            on_done=lambda result: on_stored(result[0]),
+            on_error=failed,
+            key=f"section_icon_url:{section_path_rel}",
+        )
+
     def _open_icon_search(self, query_text):
         """Open a browser image search for icons."""
+        import webbrowser
         query = urllib.parse.quote_plus(str(query_text or "section icon"))
         webbrowser.open(f"https://www.google.com/search?tbm=isch&q={query}")
 
@@ -3888,17 +5402,18 @@ class ExamEditor:
 
     def _set_icon_preview(self, preview_label, icon_rel=None, source_path=None, icon_url=None, max_preview=140):
         """Render icon preview from local file, icon path, or URL."""
+        Image, ImageTk = _load_pil()
         preview_label.configure(text="No icon preview", image="")
         preview_label._preview_image = None
+        preview_label._preview_url = None
 
         candidate_path = None
-        temp_path = None
         try:
             if source_path:
                 candidate_path = Path(source_path)
             elif icon_url:
-                temp_path = self._download_icon_url_to_temp(icon_url)
-                candidate_path = Path(temp_path)
+                self._preview_icon_url_async(preview_label, icon_url, max_preview)
+                return
             elif icon_rel:
                 if not self._looks_like_icon_path(icon_rel):
                     preview_label.configure(text=str(icon_rel), image="", font=("Segoe UI Emoji", 34))
@@ -3926,13 +5441,33 @@ class ExamEditor:
             preview_label._preview_image = tk_img
         except Exception as e:
             preview_label.configure(text=f"Preview unavailable\n{Path(str(candidate_path or '')).name}")
-        finally:
-            if temp_path:
+
+    def _preview_icon_url_async(self, preview_label, icon_url, max_preview=140):
+        """Download a URL icon on a worker and render it once it arrives."""
+        preview_label.configure(text="Downloading icon...")
+        preview_label._preview_url = icon_url
+
+        def done(temp_path):
+            try:
+                if preview_label.winfo_exists() and getattr(preview_label, "_preview_url", None) == icon_url:
+                    self._set_icon_preview(preview_label, source_path=temp_path, max_preview=max_preview)
+            finally:
                 try:
                     Path(temp_path).unlink(missing_ok=True)
                 except Exception:
                     pass
 
+        def failed(exc):
+            if preview_label.winfo_exists() and getattr(preview_label, "_preview_url", None) == icon_url:
+                preview_label.configure(text="Preview unavailable\nDownload failed")
+
+        self._run_task(
+            "Download icon preview",
+            lambda task: self._download_icon_url_to_temp(icon_url),
+            on_done=done,
+            on_error=failed,
+        )
+
     def _ensure_section_icon_defaults(self):
         """Ensure every section has an icon path, defaulting to data/<section>/icon.png."""
         changed = False
@@ -3953,70 +5488,11 @@ class ExamEditor:
 
     def _optimize_icon_file(self, icon_file):
         """Optimize one icon file for smaller size without changing pixel dimensions."""
-        path = Path(icon_file)
-        if not path.exists() or not path.is_file():
-            return False, 0, 0, "File not found"
-
-        suffix = path.suffix.lower()
-        if suffix not in {".png", ".jpg", ".jpeg", ".webp", ".gif"}:
-            return False, path.stat().st_size, path.stat().st_size, "Unsupported format"
-
-        before_size = path.stat().st_size
-        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        tmp_file.close()
-        tmp_path = Path(tmp_file.name)
-
-        try:
-            with Image.open(path) as img:
-                fmt = (img.format or "").upper()
-                save_img = img
-                save_fmt = fmt
-                save_kwargs = {"optimize": True}
-
-                if suffix in {".jpg", ".jpeg"} or fmt == "JPEG":
-                    if img.mode not in {"RGB", "L"}:
-                        save_img = img.convert("RGB")
-                    save_fmt = "JPEG"
-                    save_kwargs.update({"quality": 82, "progressive": True})
-                elif suffix == ".webp" or fmt == "WEBP":
-                    if img.mode not in {"RGB", "RGBA"}:
-                        save_img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
-                    save_fmt = "WEBP"
-                    save_kwargs.update({"quality": 80, "method": 6})
-                elif suffix == ".gif" or fmt == "GIF":
-                    save_fmt = "GIF"
-                    save_img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
-                else:
-                    save_fmt = "PNG"
-                    save_kwargs.update({"compress_level": 9})
-                    # Keep dimensions unchanged; only reduce color table when file is already heavy.
-                    if before_size > 70 * 1024:
-                        if "A" in img.getbands():
-                            save_img = img.convert("RGBA").quantize(colors=256)
-                        else:
-                            save_img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
-
-                save_img.save(tmp_path, format=save_fmt, **save_kwargs)
-
-            after_size = tmp_path.stat().st_size
-            if after_size < before_size:
-                shutil.move(str(tmp_path), str(path))
-                return True, before_size, after_size, ""
-
-            try:
-                tmp_path.unlink(missing_ok=True)
-            except Exception:
-                pass
-            return False, before_size, before_size, ""
-        except Exception as e:
-            try:
-                tmp_path.unlink(missing_ok=True)
-            except Exception:
-                pass
-            return False, before_size, before_size, str(e)
+        return optimize_image_file(icon_file)
 
     def image_normalizing(self):
         """Normalize section icon files to reduce transfer size while keeping resolution."""
+        Image = _load_pil()[0]
         if Image is None:
             messagebox.showerror("Image Normalizing", "Pillow is required. Install with: pip install pillow")
             return
@@ -4053,111 +5529,454 @@ class ExamEditor:
         ):
             return
 
-        self._backup_operation(
-            "image_normalizing",
-            {"count": len(icon_files), "scope": "section_icons"},
+        def done(stats):
+            saved_kb = stats["saved"] / 1024
+            self.update_status(
+                f"Image normalizing done: {stats['optimized']} optimized, {stats['unchanged']} unchanged, {stats['errors']} errors",
+                "green" if stats["errors"] == 0 else "orange"
+            )
+            messagebox.showinfo(
+                "Image Normalizing",
+                f"Scanned: {len(icon_files)} icon(s)\n"
+                f"Skipped (already optimized): {stats['skipped']}\n"
+                f"Optimized: {stats['optimized']}\n"
+                f"Unchanged: {stats['unchanged']}\n"
+                f"Errors: {stats['errors']}\n"
+                f"Saved: {saved_kb:.1f} KB"
+            )
+
+        def failed(exc):
+            messagebox.showerror("Image Normalizing", f"Image normalizing failed: {exc}")
+
+        self._run_task(
+            "Normalize section icons",
+            self._normalize_icon_files,
             icon_files,
+            on_done=done,
+            on_error=failed,
+            key="image_normalizing",
         )
 
-        optimized_count = 0
-        skipped_count = 0
-        error_count = 0
-        saved_total = 0
+    def _normalize_icon_files(self, task, icon_files):
+        """Back up and optimize icon files changed since the last run (runs off the Tk thread)."""
+        ledger = OptimizationLedger(self.base_path)
+        pending = ledger.pending(icon_files)
+        stats = {"optimized": 0, "unchanged": 0, "errors": 0, "saved": 0, "skipped": len(icon_files) - len(pending)}
+        if not pending:
+            # Touched-but-identical files refreshed their ledger entries.
+            if ledger.changed:
+                ledger.save()
+            return stats
+
+        task.report(0, len(pending), "Creating backup")
+        self._backup_operation(
+            "image_normalizing",
+            {"count": len(pending), "scope": "section_icons"},
+            pending,
+        )
 
-        for icon_file in icon_files:
+        for pos, icon_file in enumerate(pending):
+            task.report(pos, len(pending), Path(icon_file).name)
             optimized, before_size, after_size, error = self._optimize_icon_file(icon_file)
             if error:
-                error_count += 1
-            elif optimized:
-                optimized_count += 1
-                saved_total += max(0, before_size - after_size)
+                stats["errors"] += 1
+                continue
+            ledger.record(icon_file)
+            if optimized:
+                stats["optimized"] += 1
+                stats["saved"] += max(0, before_size - after_size)
             else:
-                skipped_count += 1
+                stats["unchanged"] += 1
+        ledger.save()
+        return stats
+    
+    def optimize_question_images(self):
+        """Optimize every image under each section's images folder in a process pool."""
+        Image = _load_pil()[0]
+        if Image is None:
+            messagebox.showerror("Optimize Images", "Pillow is required. Install with: pip install pillow")
+            return
 
-        saved_kb = saved_total / 1024
-        self.update_status(
-            f"Image normalizing done: {optimized_count} optimized, {skipped_count} unchanged, {error_count} errors",
-            "green" if error_count == 0 else "orange"
+        groups = find_section_images(self.base_path, self.sections)
+        image_files = [path for files in groups.values() for path in files]
+        if not image_files:
+            messagebox.showinfo("Optimize Images", "No question images were found.")
+            return
+
+        total_kb = sum(path.stat().st_size for path in image_files) / 1024
+        if not messagebox.askyesno(
+            "Optimize Images",
+            f"Optimize {len(image_files)} question image(s) in {len(groups)} section(s) "
+            f"({total_kb:.0f} KB)?\n"
+            "Images unchanged since the last run are skipped. "
+            "Originals are backed up first. Resolution is unchanged."
+        ):
+            return
+
+        section_names = {str(s.get("id") or s.get("path")): s.get("name", s.get("id", "")) for s in self.sections}
+
+        def done(summary):
+            saved = sum(stats["saved"] for stats in summary.values())
+            errors = sum(stats["errors"] for stats in summary.values())
+            optimized = sum(stats["optimized"] for stats in summary.values())
+            skipped = sum(stats["skipped"] for stats in summary.values())
+            self.update_status(
+                f"Image optimizing done: {optimized} optimized, {errors} errors, {saved / 1024:.1f} KB saved",
+                "green" if errors == 0 else "orange"
+            )
+            lines = [
+                f"{section_names.get(section_id, section_id)}: {stats['optimized']}/{stats['files']} optimized, "
+                f"{stats['saved'] / 1024:.1f} KB saved"
+                + (f", {stats['errors']} error(s)" if stats["errors"] else "")
+                for section_id, stats in sorted(summary.items(), key=lambda item: -item[1]["saved"])
+                if stats["files"]
+            ]
+            messagebox.showinfo(
+                "Optimize Images",
+                f"Scanned: {len(image_files)} image(s)\n"
+                f"Skipped (already optimized): {skipped}\n"
+                f"Optimized: {optimized}\n"
+                f"Errors: {errors}\n"
+                f"Saved: {saved / 1024:.1f} KB\n\n" + "\n".join(lines)
+            )
+
+        def failed(exc):
+            messagebox.showerror("Optimize Images", f"Image optimizing failed: {exc}")
+
+        self._run_task(
+            "Optimize question images",
+            self._optimize_question_image_files,
+            groups,
+            on_done=done,
+            on_error=failed,
+            key="image_normalizing",
         )
-        messagebox.showinfo(
-            "Image Normalizing",
-            f"Scanned: {len(icon_files)} icon(s)\n"
-            f"Optimized: {optimized_count}\n"
-            f"Unchanged: {skipped_count}\n"
-            f"Errors: {error_count}\n"
-            f"Saved: {saved_kb:.1f} KB"
+
+    def _optimize_question_image_files(self, task, groups):
+        """Back up and optimize question images changed since the last run (runs off the Tk thread)."""
+        ledger = OptimizationLedger(self.base_path)
+        pending = ledger.pending(path for files in groups.values() for path in files)
+        results = {}
+        if pending:
+            task.report(0, len(pending), "Creating backup")
+            self._backup_operation(
+                "question_image_optimizing",
+                {"count": len(pending), "scope": "question_images", "sections": sorted(groups)},
+                pending,
+            )
+            results = optimize_images(pending, context=task)
+            for path, result in results.items():
+                if not result[3]:
+                    ledger.record(path)
+        if ledger.changed:
+            ledger.save()
+        return summarize_by_section(groups, results)
+
+    def deduplicate_question_images(self):
+        """Collapse identical question images to one file and rewrite chapter references."""
+        if self._warn_unsaved_chapter_editors("Deduplicate Images", "deduplicating images"):
+            return
+        perceptual = False
+        if _load_pil()[0] is not None:
+            perceptual = messagebox.askyesno(
+                "Deduplicate Images",
+                "Also merge images that look identical but are encoded differently?\n"
+                "No = only byte-identical files."
+            )
+
+        def scanned(plan):
+            if not plan["replace"]:
+                messagebox.showinfo("Deduplicate Images", "No duplicate question images were found.")
+                return
+            pairs = [f"  {Path(dup).name} -> {canonical}" for dup, canonical in sorted(plan["replace"].items())]
+            if len(pairs) > 15:
+                pairs = pairs[:15] + [f"  ... and {len(pairs) - 15} more"]
+            if not messagebox.askyesno(
+                "Deduplicate Images",
+                f"Found {len(plan['replace'])} duplicate image(s) "
+                f"({plan['bytes'] / 1024:.1f} KB) referenced from {len(plan['chapters'])} chapter file(s):\n"
+                + "\n".join(pairs) + "\n\n"
+                "Point questions at one copy and delete the rest?\n"
+                "Duplicates and chapter files are backed up first."
+            ):
+                return
+            # Edits may have started while the scan ran.
+            if self._warn_unsaved_chapter_editors("Deduplicate Images", "deduplicating images"):
+                return
+            self._run_task(
+                "Deduplicate question images",
+                self._apply_image_dedup,
+                plan,
+                on_done=lambda stats: done(stats, plan),
+                on_error=failed,
+                key="image_normalizing",
+            )
+
+        def done(stats, plan):
+            self.update_status(
+                f"Image dedup done: {stats['removed']} removed, {stats['saved'] / 1024:.1f} KB saved",
+                "green"
+            )
+            if self.current_section:
+                self.load_chapters()
+            # Open editors still hold the old paths and would write them back on save.
+            stale = self._reload_chapter_editors(plan["chapters"])
+            stale_note = ""
+            if stale:
+                stale_note = (
+                    "\n\nThese editors were edited during deduplication and still show old image paths; "
+                    "close them without saving and reopen:\n"
+                    + "\n".join(f"  {editor.chapter_file.name}" for editor in stale)
+                )
+            messagebox.showinfo(
+                "Deduplicate Images",
+                f"References rewritten: {stats['references']} in {stats['chapters']} chapter(s)\n"
+                f"Duplicates removed: {stats['removed']}\n"
+                f"Kept (still linked from text): {stats['kept']}\n"
+                f"Saved: {stats['saved'] / 1024:.1f} KB"
+                + stale_note
+            )
+
+        def failed(exc):
+            messagebox.showerror("Deduplicate Images", f"Image deduplication failed: {exc}")
+
+        self._run_task(
+            "Scan question images for duplicates",
+            lambda task: plan_image_dedup(self.base_path, self.sections, perceptual=perceptual, context=task),
+            on_done=scanned,
+            on_error=failed,
+            key="image_normalizing",
         )
-    
+
+    def _apply_image_dedup(self, task, plan):
+        """Back up duplicates and affected chapters, then deduplicate (runs off the Tk thread)."""
+        task.report(0, len(plan["chapters"]), "Creating backup")
+        duplicates = [self.base_path / rel for rel in plan["replace"]]
+        self._backup_operation(
+            "image_dedup",
+            {"count": len(duplicates), "chapters": len(plan["chapters"]), "perceptual": plan.get("perceptual", False)},
+            duplicates + list(plan["chapters"]),
+        )
+        return apply_image_dedup(self.base_path, plan, self.sections, context=task)
+
+    def clean_orphan_images(self):
+        """List unreferenced and missing question images per section and delete the orphans.
+
+        Uses an image reference index cached in .editor_cache, so only
+        chapters changed since the last scan are re-read.
+        """
+        if not self.sections:
+            messagebox.showinfo("Orphaned Images", "No sections available.")
+            return
+
+        if self.image_index is None or self.image_index.base_path != self.base_path:
+            self.image_index = ImageReferenceIndex(self.base_path)
+        index = self.image_index
+        sections = [dict(section) for section in self.sections]
+        section_names = {str(s.get("id") or s.get("path")): s.get("name", s.get("id", "")) for s in sections}
+
+        def scanned(report):
+            orphans = [rel for entry in report.values() for rel in entry["orphans"]]
+            orphan_bytes = sum(entry["orphan_bytes"] for entry in report.values())
+            missing = [(rel, users) for entry in report.values() for rel, users in entry["missing"].items()]
+            lines = [
+                f"{section_names.get(section_id, section_id)}: {len(entry['orphans'])} orphaned "
+                f"({entry['orphan_bytes'] / 1024:.1f} KB), {len(entry['missing'])} missing"
+                for section_id, entry in sorted(report.items(), key=lambda item: -item[1]["orphan_bytes"])
+                if entry["orphans"] or entry["missing"]
+            ]
+            missing_lines = [
+                f"  {rel} (Q{users[0]['question']} in {Path(users[0]['chapter_file']).name})"
+                for rel, users in missing[:10]
+            ]
+            if len(missing) > 10:
+                missing_lines.append(f"  ... and {len(missing) - 10} more")
+            summary = "\n".join(lines) + ("\n\nMissing images:\n" + "\n".join(missing_lines) if missing else "")
+            self.update_status(
+                f"Images: {len(orphans)} orphaned ({orphan_bytes / 1024:.1f} KB), {len(missing)} missing",
+                "green" if not orphans and not missing else "orange",
+            )
+            if not orphans:
+                messagebox.showinfo(
+                    "Orphaned Images",
+                    "No orphaned images found." + ("\n\n" + summary if missing else "")
+                )
+                return
+            if not messagebox.askyesno(
+                "Orphaned Images",
+                f"{summary}\n\nDelete {len(orphans)} orphaned image(s) ({orphan_bytes / 1024:.1f} KB)?\n"
+                "They are backed up first."
+            ):
+                return
+            # An editor may have picked up one of them while the dialog was open.
+            in_use = _editor_image_refs(self._open_chapter_editors())
+            orphans = [rel for rel in orphans if rel not in in_use]
+            self._run_task(
+                "Delete orphaned images",
+                self._delete_orphan_images,
+                orphans,
+                on_done=deleted,
+                on_error=failed,
+                key="image_normalizing",
+            )
+
+        def deleted(stats):
+            self.update_status(
+                f"Deleted {stats['removed']} orphaned image(s), {stats['saved'] / 1024:.1f} KB freed",
+                "green" if not stats["errors"] else "orange",
+            )
+            messagebox.showinfo(
+                "Orphaned Images",
+                f"Deleted: {stats['removed']}\n"
+                f"Errors: {stats['errors']}\n"
+                f"Freed: {stats['saved'] / 1024:.1f} KB"
+            )
+
+        def failed(exc):
+            messagebox.showerror("Orphaned Images", f"Orphaned image scan failed: {exc}")
+
+        # select_image copies files right away, but chapters only record them on save.
+        editor_refs = _editor_image_refs(self._open_chapter_editors())
+        self._run_task(
+            "Scan for orphaned images",
+            lambda task: index.find_orphans(sections, context=task, extra_refs=editor_refs),
+            on_done=scanned,
+            on_error=failed,
+            key="image_normalizing",
+        )
+
+    def _delete_orphan_images(self, task, orphans):
+        """Back up and delete orphaned images (runs off the Tk thread)."""
+        paths = [self.base_path / rel for rel in orphans]
+        task.report(0, len(paths), "Creating backup")
+        self._backup_operation("orphan_image_cleanup", {"count": len(paths)}, paths)
+        stats = {"removed": 0, "errors": 0, "saved": 0}
+        for pos, path in enumerate(paths):
+            task.report(pos, len(paths), path.name)
+            size = remove_image_file(path)
+            if size is None:
+                stats["errors"] += 1
+            else:
+                stats["removed"] += 1
+                stats["saved"] += size
+        return stats
+
     def refresh_all(self):
         """Refresh all data and auto-configure engine"""
         self.load_sections()
         if self.current_section:
             self.load_chapters()
         
-        # Auto-configure engine on refresh
+        # Auto-configure engine on refresh (runs in the background)
         try:
-            self.generate_js_config()
-            self.update_status("✓ Refreshed & Configured", "green")
+            self.generate_js_config(
+                on_complete=lambda: self.update_status("✓ Refreshed & Configured", "green")
+            )
         except Exception as e:
             self.update_status("Refreshed (config failed)", "orange")
             print(f"Auto-config error: {e}")
     
     def load_sections(self):
         """Load sections from config"""
+        self._apply_loaded_sections(self._read_sections_file(self.config_path))
+
+    def load_sections_async(self):
+        """Read sections.json on a worker so the window can paint before data arrives."""
+        config_path = self.config_path
+        self.sections_loaded = False
+
+        def done(sections):
+            if self.config_path != config_path:
+                return
+            self._apply_loaded_sections(sections)
+            self.update_status(f"Loaded {len(self.sections)} section(s)", "blue")
+
+        self.update_status("Loading sections...", "blue")
+        self.task_runner.submit(
+            "Load sections",
+            lambda task: self._read_sections_file(config_path),
+            on_done=done,
+            key=f"load_sections:{config_path}",
+        )
+
+    @staticmethod
+    def _read_sections_file(config_path):
+        """Read sections.json without touching widgets; an unreadable file yields no sections."""
         try:
-                config_file = self.config_path / "sections.json"
-                self.sections = _load_json_file(config_file)
-        except:
-            self.sections = []
+            return _load_json_file(config_path / "sections.json")
+        except Exception:
+            return []
 
+    def _apply_loaded_sections(self, sections):
+        """Install a freshly read section list and refresh the dependent views."""
+        self.sections = sections
+        self.sections_loaded = True
         if self._ensure_section_icon_defaults():
             self.save_sections()
-        
+
         self.refresh_sections_tree()
         self._update_metrics()
     
     def refresh_sections_tree(self):
-        """Refresh sections tree"""
-        for item in self.sections_tree.get_children():
-            self.sections_tree.delete(item)
-
+        """Refresh sections tree, touching only rows that changed."""
+        # Rows are keyed by section id so iids survive reordering and filtering.
+        self.section_iids = _keyed_iids("section", [
+            section.get('id') or section.get('path', '') for section in self.sections
+        ])
         filter_text = self.section_filter_var.get().strip()
-        for idx, section in enumerate(self.sections):
-            if not self._matches_filter(filter_text, [
+        visible = self._filter_rows(filter_text, [
+            (idx, [
                 section.get('name', ''),
                 section.get('id', ''),
                 section.get('path', ''),
                 section.get('description', ''),
-            ]):
-                continue
-            tag = "evenrow" if idx % 2 == 0 else "oddrow"
-            self.sections_tree.insert("", tk.END, iid=str(idx), values=(
-                section['name'],
-                section['id'],
-                section.get('path', '')
-            ), tags=(tag,))
+            ])
+            for idx, section in enumerate(self.sections)
+        ])
+        self.sections_tree_sync.sync([
+            (self.section_iids[idx], (
+                self.sections[idx]['name'],
+                self.sections[idx]['id'],
+                self.sections[idx].get('path', '')
+            ))
+            for idx in visible
+        ])
     
     def on_section_select(self, event):
         """Handle section selection"""
-        selection = self.sections_tree.selection()
-        if selection:
-            self.current_section_idx = int(selection[0])
+        selected_indices = self.get_selected_section_indices()
+        if selected_indices:
+            self.current_section_idx = selected_indices[0]
             self.current_section = self.sections[self.current_section_idx]['id']
             self.load_chapters()
             self.update_status(f"Selected: {self.sections[self.current_section_idx]['name']}", "blue")
 
     def get_selected_section_indices(self):
         """Return selected section indices from the tree."""
-        indices = []
-        for iid in self.sections_tree.selection():
-            try:
-                idx = int(iid)
-            except (TypeError, ValueError):
-                continue
-            if 0 <= idx < len(self.sections):
-                indices.append(idx)
+        return self._tree_selection_indices(self.sections_tree, self.section_iids)
+
+    def _tree_selection_indices(self, tree, iids):
+        """Map selected tree iids back to list indexes."""
+        lookup = {iid: idx for idx, iid in enumerate(iids)}
+        indices = [lookup[iid] for iid in tree.selection() if iid in lookup]
         return sorted(set(indices))
 
+    def _select_tree_row(self, tree, iids, idx):
+        """Select, focus and reveal one list index if its row is visible."""
+        if idx is None or not (0 <= idx < len(iids)) or not tree.exists(iids[idx]):
+            return False
+        iid = iids[idx]
+        tree.selection_set(iid)
+        tree.focus(iid)
+        tree.see(iid)
+        return True
+
+    def select_section_row(self, idx):
+        return self._select_tree_row(self.sections_tree, self.section_iids, idx)
+
+    def select_chapter_row(self, idx):
+        return self._select_tree_row(self.chapters_tree, self.chapter_iids, idx)
+
     def _prepare_tree_context_selection(self, tree, event):
         """Select the row under the pointer before showing a context menu."""
         row_id = tree.identify_row(event.y)
@@ -4229,39 +6048,34 @@ class ExamEditor:
         self._update_metrics()
     
     def refresh_chapters_tree(self):
-        """Refresh chapters tree"""
-        for item in self.chapters_tree.get_children():
-            self.chapters_tree.delete(item)
-
+        """Refresh chapters tree, touching only rows that changed."""
+        self.chapter_iids = _keyed_iids("chapter", [
+            chapter.get('file') or chapter.get('id', '') for chapter in self.chapters
+        ])
         filter_text = self.chapter_filter_var.get().strip()
-        for idx, chapter in enumerate(self.chapters):
-            if not self._matches_filter(filter_text, [
+        visible = self._filter_rows(filter_text, [
+            (idx, [
                 chapter.get('id', ''),
                 chapter.get('name', ''),
                 chapter.get('file', ''),
                 chapter.get('q', ''),
-            ]):
-                continue
-            tag = "evenrow" if idx % 2 == 0 else "oddrow"
-            self.chapters_tree.insert("", tk.END, iid=str(idx), values=(
-                chapter.get('id', ''),
-                chapter.get('name', ''),
-                chapter.get('q', 0),
-                chapter.get('file', '')
-            ), tags=(tag,))
+            ])
+            for idx, chapter in enumerate(self.chapters)
+        ])
+        self.chapters_tree_sync.sync([
+            (self.chapter_iids[idx], (
+                self.chapters[idx].get('id', ''),
+                self.chapters[idx].get('name', ''),
+                self.chapters[idx].get('q', 0),
+                self.chapters[idx].get('file', '')
+            ))
+            for idx in visible
+        ])
         self._update_metrics()
 
     def get_selected_chapter_indices(self):
         """Return selected chapter indices from the chapters tree."""
-        indices = []
-        for iid in self.chapters_tree.selection():
-            try:
-                idx = int(iid)
-            except (TypeError, ValueError):
-                continue
-            if 0 <= idx < len(self.chapters):
-                indices.append(idx)
-        return sorted(set(indices))
+        return self._tree_selection_indices(self.chapters_tree, self.chapter_iids)
 
     def show_chapter_tools_menu(self, event=None):
         """Show chapter batch-tools menu below the tools button."""
@@ -4325,10 +6139,31 @@ class ExamEditor:
             messagebox.showerror("Error", f"Chapter file not found: {chapter_file_path}")
             return "break" if event is not None else None
 
-        editor = AdvancedChapterEditor(self.root, chapter_file_path, section['path'], self.base_path)
-        self.chapter_editor_windows.append(editor)
+        self._open_chapter_editor(chapter_file_path, section['path'])
         return "break" if event is not None else None
 
+    def _open_chapter_editor(self, chapter_file_path, section_path):
+        """Show an advanced chapter editor, reusing an open or pooled window when possible."""
+        self._prune_chapter_editor_windows()
+        target = Path(chapter_file_path).resolve()
+        for editor in self.chapter_editor_windows:
+            if editor.chapter_file.resolve() == target:
+                editor.show()
+                return editor
+
+        while self.chapter_editor_pool:
+            editor = self.chapter_editor_pool.pop()
+            if editor.load_chapter(chapter_file_path, section_path, self.base_path):
+                editor.show()
+                self.chapter_editor_windows.append(editor)
+                return editor
+
+        editor = AdvancedChapterEditor(self.root, chapter_file_path, section_path, self.base_path)
+        editor.on_close = self._park_chapter_editor
+        editor.list_editors = self._open_chapter_editors
+        self.chapter_editor_windows.append(editor)
+        return editor
+
     def _normalize_for_compare(self, value):
         """Normalize text for duplicate comparisons."""
         return re.sub(r"\s+", " ", str(value or "")).strip().lower()
@@ -4346,6 +6181,7 @@ class ExamEditor:
 
     def _question_text_similarity(self, left, right):
         """Compute fuzzy similarity between two question titles."""
+        from difflib import SequenceMatcher
         if not left or not right:
             return 0.0
         seq = SequenceMatcher(None, left, right).ratio()
@@ -4357,6 +6193,7 @@ class ExamEditor:
 
     def _question_choices_similarity(self, q1, q2):
         """Compute fuzzy similarity between two questions' choices."""
+        from difflib import SequenceMatcher
         c1 = [self._normalize_for_compare(c.get("text", "")) for c in q1.get("choices", []) or []]
         c2 = [self._normalize_for_compare(c.get("text", "")) for c in q2.get("choices", []) or []]
         c1 = [c for c in c1 if c]
@@ -4446,6 +6283,59 @@ class ExamEditor:
         with open(fpath, 'w', encoding='utf-8') as f:
             json.dump(payload, f, indent=2, ensure_ascii=False)
 
+    def validate_project_diagrams(self):
+        """Validate diagram blocks in every chapter of the project on a worker.
+
+        Results are cached per text in .editor_cache, so after editing one
+        chapter only that file is re-read and only its changed texts are
+        validated. The full list of warnings is written to a JSON report.
+        """
+        if not self.sections:
+            messagebox.showinfo("Validate Diagrams", "No sections available.")
+            return
+
+        if self.diagram_validator is None or self.diagram_validator.base_path != self.base_path:
+            self.diagram_validator = ProjectDiagramValidator(self.base_path)
+        validator = self.diagram_validator
+        sections = [dict(section) for section in self.sections]
+
+        def done(report):
+            stats = report["stats"]
+            issues = report["issues"]
+            self.update_status(
+                f"Diagram validation: {stats['issues']} warning(s) in {stats['files']} chapter(s), "
+                f"{stats['validated']} text(s) checked in {stats['elapsed_ms']:.0f} ms",
+                "green" if not issues else "orange",
+            )
+            summary = (
+                f"Chapters: {stats['files']} ({stats['reread']} re-read)\n"
+                f"Texts with code blocks: {stats['texts']} ({stats['cached']} cached)\n"
+                f"Warnings: {stats['issues']}\n"
+                f"Report: {validator.report_path}"
+            )
+            if not issues:
+                messagebox.showinfo("Validate Diagrams", "No diagram warnings found.\n\n" + summary)
+                return
+            lines = [
+                f"{issue['section']} / {issue['chapter']} Q{issue['question']} "
+                f"{issue['field']} L{issue['line']}: {issue['message']}"
+                for issue in issues[:20]
+            ]
+            if len(issues) > 20:
+                lines.append(f"... and {len(issues) - 20} more")
+            messagebox.showwarning("Diagram Warnings", summary + "\n\n" + "\n".join(lines))
+
+        def failed(exc):
+            messagebox.showerror("Validate Diagrams", f"Diagram validation failed: {exc}")
+
+        self._run_task(
+            "Validate diagrams (all sections)",
+            lambda task: validator.validate(sections, context=task),
+            on_done=done,
+            on_error=failed,
+            key=f"validate_diagrams:{self.base_path}",
+        )
+
     def apply_tools_to_selected_chapters(self, tool_name):
         """Apply a chapter tool to all selected chapters."""
         if not self.current_section:
@@ -4468,6 +6358,77 @@ class ExamEditor:
             self.delete_chapter()
             return
 
+        import copy
+        chapters_ref = self.chapters
+        targets = [(idx, copy.deepcopy(self.chapters[idx])) for idx in selected_indices]
+
+        def done(result):
+            stats, errors, counts = result
+            if self.chapters is chapters_ref:
+                for idx, count in counts.items():
+                    if 0 <= idx < len(self.chapters):
+                        self.chapters[idx]["q"] = count
+                self.refresh_chapters_tree()
+                self.save_chapter()
+
+            if errors:
+                messagebox.showwarning(
+                    "Completed With Errors",
+                    "Some chapters failed:\n\n" + "\n".join(errors[:10])
+                )
+
+            if tool_name == "fix_numbering":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Renumbered {stats['numbering_fixed']} question(s)."
+                )
+            elif tool_name == "fix_escaped_newlines":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Replaced {stats['newline_fixed']} escaped newline sequence(s)."
+                )
+            elif tool_name == "fix_double_backslashes":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Replaced {stats['backslash_fixed']} doubled backslash sequence(s)."
+                )
+            elif tool_name == "fix_input_typing":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Normalized answers in {stats['typing_fixed']} question(s).\n"
+                    f"Adjusted input type in {stats['type_fixed']} question(s)."
+                )
+            elif tool_name == "delete_duplicates":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Removed {stats['questions_removed']} duplicate question(s)."
+                )
+            elif tool_name == "smart_duplicates":
+                message = (
+                    f"Processed {stats['chapters']} chapter(s).\n"
+                    f"Removed {stats['questions_removed']} likely-duplicate question(s)."
+                )
+            else:
+                message = f"Processed {stats['chapters']} chapter(s)."
+
+            messagebox.showinfo("Batch Tools Complete", message)
+
+        def failed(exc):
+            messagebox.showerror("Batch Tools", f"Batch tool failed: {exc}")
+
+        self._run_task(
+            f"Batch tool: {tool_name}",
+            self._run_chapter_tool,
+            tool_name,
+            section,
+            targets,
+            on_done=done,
+            on_error=failed,
+            key=f"chapter_tool:{section.get('id', '')}",
+        )
+
+    def _run_chapter_tool(self, task, tool_name, section, targets):
+        """Apply one batch tool to (index, chapter) targets (runs off the Tk thread)."""
         stats = {
             "chapters": 0,
             "questions_removed": 0,
@@ -4479,8 +6440,9 @@ class ExamEditor:
         }
 
         errors = []
-        for idx in selected_indices:
-            chapter = self.chapters[idx]
+        counts = {}
+        for pos, (idx, chapter) in enumerate(targets):
+            task.report(pos, len(targets), chapter.get('name', chapter.get('file', '')))
             try:
                 fpath, payload, chapter_data, questions = self._load_chapter_payload(section, chapter)
                 changed = False
@@ -4546,6 +6508,7 @@ class ExamEditor:
                 elif tool_name == "smart_duplicates":
                     similar_delete_indexes = set()
                     for i in range(len(questions)):
+                        task.check()
                         for j in range(i + 1, len(questions)):
                             if j in similar_delete_indexes:
                                 continue
@@ -4578,58 +6541,14 @@ class ExamEditor:
                     stats["questions_removed"] += len(similar_delete_indexes)
 
                 chapter_data["questions"] = questions
-                chapter["q"] = len(questions)
+                counts[idx] = len(questions)
                 if changed:
                     self._save_chapter_payload(fpath, payload)
                 stats["chapters"] += 1
             except Exception as e:
                 errors.append(f"{chapter.get('name', chapter.get('id', 'Unknown'))}: {e}")
+        return stats, errors, counts
 
-        self.refresh_chapters_tree()
-        self.save_chapter()
-
-        if errors:
-            messagebox.showwarning(
-                "Completed With Errors",
-                "Some chapters failed:\n\n" + "\n".join(errors[:10])
-            )
-
-        if tool_name == "fix_numbering":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Renumbered {stats['numbering_fixed']} question(s)."
-            )
-        elif tool_name == "fix_escaped_newlines":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Replaced {stats['newline_fixed']} escaped newline sequence(s)."
-            )
-        elif tool_name == "fix_double_backslashes":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Replaced {stats['backslash_fixed']} doubled backslash sequence(s)."
-            )
-        elif tool_name == "fix_input_typing":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Normalized answers in {stats['typing_fixed']} question(s).\n"
-                f"Adjusted input type in {stats['type_fixed']} question(s)."
-            )
-        elif tool_name == "delete_duplicates":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Removed {stats['questions_removed']} duplicate question(s)."
-            )
-        elif tool_name == "smart_duplicates":
-            message = (
-                f"Processed {stats['chapters']} chapter(s).\n"
-                f"Removed {stats['questions_removed']} likely-duplicate question(s)."
-            )
-        else:
-            message = f"Processed {stats['chapters']} chapter(s)."
-
-        messagebox.showinfo("Batch Tools Complete", message)
-    
     def on_chapter_double_click(self, event):
         """Open advanced chapter editor when double-clicking a chapter"""
         return self.open_selected_chapter_editor(event)
@@ -4649,7 +6568,7 @@ class ExamEditor:
             chapter['q'] = 0
         
         self.refresh_chapters_tree()
-        self.chapters_tree.selection_set(str(self.current_chapter_idx))
+        self.select_chapter_row(self.current_chapter_idx)
         
         # Sync changes to the actual file
         try:
@@ -4708,7 +6627,7 @@ class ExamEditor:
         if self.current_chapter_idx is not None and self.chapters:
             keep_idx = max(0, min(self.current_chapter_idx, len(self.chapters) - 1))
             self.current_chapter_idx = keep_idx
-            self.chapters_tree.selection_set(str(keep_idx))
+            self.select_chapter_row(keep_idx)
 
         self.save_chapter()
 
@@ -4950,6 +6869,7 @@ class ExamEditor:
                 "icon": icon_rel,
             }
 
+            icon_url_max_px = None
             # Create directory and init chapters.json
             try:
                 full_path = self.base_path / new_section['path']
@@ -4968,32 +6888,40 @@ class ExamEditor:
                         max_size=max_px,
                     )
                     new_section["icon"] = saved_icon_rel
-                    if Image is None and resize_icon_var.get():
+                    if _load_pil()[0] is None and resize_icon_var.get():
                         messagebox.showwarning(
                             "Resize Unavailable",
                             "Pillow is not installed, so icon resize was skipped.\n"
                             "Install with: pip install pillow"
                         )
                 elif icon_url_var.get().strip():
-                    max_px = int(str(resize_max_var.get() or "768").strip() or "768")
-                    saved_icon_rel, resized = self._store_section_icon_from_url(
-                        icon_url_var.get().strip(),
-                        new_section["path"],
-                        resize_if_large=resize_icon_var.get(),
-                        max_size=max_px,
-                    )
-                    new_section["icon"] = saved_icon_rel
+                    icon_url_max_px = int(str(resize_max_var.get() or "768").strip() or "768")
                 elif icon_emoji_var.get().strip():
                     new_section["icon"] = icon_emoji_var.get().strip()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to create directory: {e}")
                 return
 
-            self.sections.append(new_section)
-            self.save_sections()
-            self.load_sections()
-            self.update_status(f"Added section: {sec_id.get()}", "green")
-            dialog.destroy()
+            def finish(icon_rel=None):
+                if icon_rel:
+                    new_section["icon"] = icon_rel
+                self.sections.append(new_section)
+                self.save_sections()
+                self.load_sections()
+                self.update_status(f"Added section: {new_section['id']}", "green")
+                if dialog.winfo_exists():
+                    dialog.destroy()
+
+            if icon_url_max_px is not None:
+                self._store_section_icon_from_url_async(
+                    icon_url_var.get().strip(),
+                    new_section["path"],
+                    finish,
+                    resize_if_large=resize_icon_var.get(),
+                    max_size=icon_url_max_px,
+                )
+                return
+            finish()
 
         ttk.Button(frame, text="Create Section", command=save,
                   width=20, bootstyle="success").grid(row=9, column=0, columnspan=2, pady=20)
@@ -5034,6 +6962,21 @@ class ExamEditor:
         btn_frame.pack(fill=tk.X, pady=(14,0))
 
         def do_delete():
+            if del_var.get():
+                # Dedup can point other sections' questions at images in these folders.
+                shared = self._section_images_used_elsewhere(selected_sections)
+                if shared:
+                    lines = "\n".join(f"  {rel}" for rel in shared[:10])
+                    if len(shared) > 10:
+                        lines += f"\n  ... and {len(shared) - 10} more"
+                    messagebox.showwarning(
+                        "Delete Section",
+                        f"{len(shared)} image(s) in these section folders are used by other sections:\n"
+                        f"{lines}\n\n"
+                        "Point those questions at other images or delete the section without its files."
+                    )
+                    return
+
             backup_paths = [self.config_path / "sections.json"]
             for section in selected_sections:
                 sec_path = self.base_path / section.get('path', '')
@@ -5075,6 +7018,28 @@ class ExamEditor:
         ttk.Button(btn_frame, text="Delete", command=do_delete, width=12, bootstyle="danger").pack(side=tk.RIGHT, padx=6)
         ttk.Button(btn_frame, text="Cancel", command=cancel, width=12, bootstyle="secondary-outline").pack(side=tk.RIGHT)
     
+    def _section_images_used_elsewhere(self, sections):
+        """Project-relative images in ``sections``' folders referenced from other sections, sorted."""
+        chapter_files = []
+        for section in sections:
+            sec_path = self.base_path / section.get('path', '')
+            try:
+                chapters = _load_json_file(sec_path / "chapters.json")
+            except Exception:
+                chapters = []
+            for ch in chapters if isinstance(chapters, list) else []:
+                if isinstance(ch, dict) and ch.get('file'):
+                    chapter_files.append(sec_path / ch['file'])
+        images = [
+            path.relative_to(self.base_path).as_posix()
+            for paths in find_section_images(self.base_path, sections).values() for path in paths
+        ]
+        if not images:
+            return []
+        return sorted(_images_used_elsewhere(
+            self.base_path, images, exclude=chapter_files, editors=self._open_chapter_editors()
+        ))
+
     def edit_section(self):
         """Edit the selected section"""
         if self.current_section_idx is None:
@@ -5246,7 +7211,7 @@ class ExamEditor:
                         max_size=max_px,
                     )
                     section['icon'] = saved_icon_rel
-                    if Image is None and resize_icon_var.get():
+                    if _load_pil()[0] is None and resize_icon_var.get():
                         messagebox.showwarning(
                             "Resize Unavailable",
                             "Pillow is not installed, so icon resize was skipped.\n"
@@ -5258,24 +7223,34 @@ class ExamEditor:
             elif icon_url_var.get().strip():
                 try:
                     max_px = int(str(resize_max_var.get() or "768").strip() or "768")
-                    saved_icon_rel, resized = self._store_section_icon_from_url(
-                        icon_url_var.get().strip(),
-                        section['path'],
-                        resize_if_large=resize_icon_var.get(),
-                        max_size=max_px,
-                    )
-                    section['icon'] = saved_icon_rel
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to download icon URL: {e}")
                     return
+
+                def stored(icon_rel):
+                    section['icon'] = icon_rel
+                    finish()
+
+                self._store_section_icon_from_url_async(
+                    icon_url_var.get().strip(),
+                    section['path'],
+                    stored,
+                    resize_if_large=resize_icon_var.get(),
+                    max_size=max_px,
+                )
+                return
             elif icon_emoji_var.get().strip():
                 section['icon'] = icon_emoji_var.get().strip()
 
+            finish()
+
+        def finish():
             self.current_section = section['id']
             self.refresh_sections_tree()
-            self.sections_tree.selection_set(str(self.current_section_idx))
+            self.select_section_row(self.current_section_idx)
             self.update_status(f"Section updated: {section['name']}", "orange")
-            dialog.destroy()
+            if dialog.winfo_exists():
+                dialog.destroy()
 
         button_bar = ttk.Frame(frame)
         button_bar.grid(row=10, column=0, columnspan=2, sticky=tk.E, pady=(10, 0))
@@ -5299,9 +7274,7 @@ class ExamEditor:
         self.current_section = self.sections[self.current_section_idx].get('id')
 
         self.refresh_sections_tree()
-        self.sections_tree.selection_set(str(self.current_section_idx))
-        self.sections_tree.focus(str(self.current_section_idx))
-        self.sections_tree.see(str(self.current_section_idx))
+        self.select_section_row(self.current_section_idx)
         self.load_chapters()
         self.update_status("Section moved up (click Save All)", "orange")
 
@@ -5320,9 +7293,7 @@ class ExamEditor:
         self.current_section = self.sections[self.current_section_idx].get('id')
 
         self.refresh_sections_tree()
-        self.sections_tree.selection_set(str(self.current_section_idx))
-        self.sections_tree.focus(str(self.current_section_idx))
-        self.sections_tree.see(str(self.current_section_idx))
+        self.select_section_row(self.current_section_idx)
         self.load_chapters()
         self.update_status("Section moved down (click Save All)", "orange")
 
@@ -5343,7 +7314,7 @@ class ExamEditor:
         self.chapters[idx], self.chapters[idx - 1] = self.chapters[idx - 1], self.chapters[idx]
         self.current_chapter_idx = idx - 1
         self.refresh_chapters_tree()
-        self.chapters_tree.selection_set(str(self.current_chapter_idx))
+        self.select_chapter_row(self.current_chapter_idx)
         self.update_status("Chapter moved up (click Save All)", "orange")
 
     def move_chapter_down(self):
@@ -5363,7 +7334,7 @@ class ExamEditor:
         self.chapters[idx], self.chapters[idx + 1] = self.chapters[idx + 1], self.chapters[idx]
         self.current_chapter_idx = idx + 1
         self.refresh_chapters_tree()
-        self.chapters_tree.selection_set(str(self.current_chapter_idx))
+        self.select_chapter_row(self.current_chapter_idx)
         self.update_status("Chapter moved down (click Save All)", "orange")
 
     def add_chapter(self):
@@ -5385,6 +7356,7 @@ class ExamEditor:
     def _copy_source_to_dest(self, src_path, dest_path):
         """Copy or extract src_path (dir or zip) into dest_path.
         Handles copying 'theme' or 'themes' directories correctly."""
+        import zipfile
         src = Path(src_path)
         dest = Path(dest_path)
         try:
@@ -5439,11 +7411,26 @@ class ExamEditor:
         dest_rel = f"data/{sec_id}"
         dest = self.base_path / dest_rel
 
-        ok, err = self._copy_source_to_dest(src, dest)
-        if not ok:
-            messagebox.showerror("Import Failed", f"Failed to import section: {err}")
-            return
+        def done(result):
+            ok, err = result
+            if not ok:
+                messagebox.showerror("Import Failed", f"Failed to import section: {err}")
+                return
+            self._register_imported_section(sec_id, dest_rel)
 
+        def failed(exc):
+            messagebox.showerror("Import Failed", f"Failed to import section: {exc}")
+
+        self._run_task(
+            f"Import section {sec_id}",
+            lambda task: self._copy_source_to_dest(src, dest),
+            on_done=done,
+            on_error=failed,
+            key=f"import_section:{sec_id}",
+        )
+
+    def _register_imported_section(self, sec_id, dest_rel):
+        """Add or replace the section entry for freshly imported files."""
         # Add or update section entry
         new_section = {
             "id": sec_id,
@@ -5471,6 +7458,7 @@ class ExamEditor:
 
     def import_chapters(self):
         """Import chapter files (JSON or ZIP) into the currently selected section."""
+        import zipfile
         if not self.current_section:
             messagebox.showwarning("Warning", "Select a section first")
             return
@@ -5554,6 +7542,11 @@ class ExamEditor:
                     chapter = self.chapters[idx]
                     backup_paths.append(self.base_path / section.get('path', '') / chapter.get('file', ''))
 
+            deleted_files = [
+                self.base_path / section.get('path', '') / self.chapters[idx].get('file', '')
+                for idx in selected_indices
+            ] if section else []
+
             self._backup_operation(
                 "delete_chapter",
                 f"Deleting {len(selected_indices)} chapter(s) in section {self.current_section}",
@@ -5580,7 +7573,13 @@ class ExamEditor:
                         print(f"Warning: Could not read chapter images: {e}")
 
                 if del_images_var.get() and image_paths:
+                    shared = _images_used_elsewhere(
+                        self.base_path, image_paths, exclude=deleted_files, editors=self._open_chapter_editors()
+                    )
                     for img_rel in image_paths:
+                        if normalize_image_ref(img_rel, "") in shared:
+                            print(f"Kept shared image: {img_rel}")
+                            continue
                         try:
                             img_path = self.base_path / img_rel
                             if img_path.exists():
@@ -5629,15 +7628,16 @@ class ExamEditor:
         
         try:
             ch_file = self.base_path / f"{section['path']}" / "chapters.json"
-            ch_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(ch_file, 'w', encoding='utf-8') as f:
-                json.dump(self.chapters, f, indent=2)
+            with _CHAPTERS_JSON_LOCK:
+                _write_chapters_json(ch_file, self.chapters)
             self.update_status("Chapters saved", "green")
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
     def save_sections(self):
         """Save sections to config"""
+        if not self.sections_loaded:
+            return
         try:
             self.config_path.mkdir(parents=True, exist_ok=True)
             config_file = self.config_path / "sections.json"
@@ -5648,165 +7648,245 @@ class ExamEditor:
     
     def save_all(self):
         """Save everything"""
+        if not self.sections_loaded:
+            self.update_status("Sections are still loading; nothing saved", "orange")
+            return
         self.save_sections()
         self.save_chapter()
         try:
-            self.generate_js_config()
+            self.generate_js_config(
+                on_complete=lambda: self.update_status("✓ All saved & configured", "green")
+            )
         except Exception as e:
             print(f"Auto-config error: {e}")
-        self.update_status("✓ All saved & configured", "green")
         
-    def generate_js_config(self):
-        """Generate js/exam-config.js from current sections and chapters"""
-        try:
-            if not self.sections:
+    def generate_js_config(self, show_message=True, on_complete=None):
+        """Generate js/exam-config.js from current sections and chapters.
+
+        Files are scanned and written on the background task runner; tables
+        are refreshed and the result reported once the task finishes.
+        """
+        if not self.sections:
+            messagebox.showwarning(
+                "No Sections",
+                "No sections loaded for this builder. Existing js/exam-config.js was left unchanged."
+            )
+            self.update_status("Skipped config generation (no sections)", "orange")
+            return None
+
+        import copy
+        sections = copy.deepcopy(self.sections)
+        base_path = self.base_path
+
+        def done(js_path):
+            if js_path is None:
                 messagebox.showwarning(
-                    "No Sections",
-                    "No sections loaded for this builder. Existing js/exam-config.js was left unchanged."
+                    "No Config Data",
+                    "Config generation produced no data. Existing js/exam-config.js was left unchanged."
                 )
-                self.update_status("Skipped config generation (no sections)", "orange")
+                self.update_status("Skipped config generation (empty data)", "orange")
+                return
+            if base_path != self.base_path:
                 return
 
-            full_config = []
+            # Refresh tables after configuration
+            self.load_sections()
+            if self.current_section:
+                self.load_chapters()
+
+            if show_message:
+                messagebox.showinfo("Success",
+                                  f"Engine Configured Successfully!\n\nGenerated: {js_path.relative_to(base_path)}\nTables refreshed with latest data.")
+            self.update_status("✓ Engine configured", "green")
+            if on_complete is not None:
+                on_complete()
+
+        def failed(exc):
+            messagebox.showerror("Error", f"Failed to generate config: {exc}")
+
+        return self._run_task(
+            "Generate exam config",
+            self._build_js_config,
+            sections,
+            base_path,
+            on_done=done,
+            on_error=failed,
+            key=f"generate_js_config:{base_path}",
+        )
+
+    def _build_js_config(self, task, sections, base_path):
+        """Sync chapters.json files and write js/exam-config.js (runs off the Tk thread)."""
+        full_config = []
+        
+        for section_pos, section in enumerate(sections):
+            task.report(section_pos, len(sections), section.get('name', section.get('id', '')))
+            sec_data = {
+                "id": section['id'],
+                "name": section['name'],
+                "description": section.get('description', ''),
+                "path": section['path'],
+                "icon": section.get('icon', self._default_section_icon_rel(section.get('id', ''), section.get('path', ''))),
+                "chapters": []
+            }
             
-            for section in self.sections:
-                sec_data = {
-                    "id": section['id'],
-                    "name": section['name'],
-                    "description": section.get('description', ''),
-                    "path": section['path'],
-                    "icon": section.get('icon', self._default_section_icon_rel(section.get('id', ''), section.get('path', ''))),
-                    "chapters": []
-                }
-                
-                # AUTO-SYNC: Respect existing chapters.json order, only append new files
-                sec_path = self.base_path / section['path']
-                if sec_path.exists():
-                    # Load existing chapters.json to preserve manual ordering
-                    ch_json_path = sec_path / "chapters.json"
-                    existing_chapters = []
-                    if ch_json_path.exists():
-                        try:
-                            existing_chapters = _load_json_file(ch_json_path)
-                        except Exception:
-                            existing_chapters = []
+            # AUTO-SYNC: Respect existing chapters.json order, only append new files
+            sec_path = base_path / section['path']
+            if sec_path.exists():
+                # Load existing chapters.json to preserve manual ordering
+                ch_json_path = sec_path / "chapters.json"
+                existing_chapters = []
+                if ch_json_path.exists():
+                    try:
+                        existing_chapters = _load_json_file(ch_json_path)
+                    except Exception:
+                        existing_chapters = []
 
-                    # Track which files are already in chapters.json
-                    known_files = {ch.get('file', '') for ch in existing_chapters}
+                # Track which files are already in chapters.json
+                known_files = {ch.get('file', '') for ch in existing_chapters}
 
-                    # Scan for new chapter files not yet in chapters.json
-                    chapter_files = [p for p in sec_path.glob("*.json") if p.name != "chapters.json"]
+                # Scan for new chapter files not yet in chapters.json
+                chapter_files = [p for p in sec_path.glob("*.json") if p.name != "chapters.json"]
 
-                    def get_chapter_num(path):
-                        match = re.search(r'chapter(\d+)', path.name)
-                        return int(match.group(1)) if match else 999
+                def get_chapter_num(path):
+                    match = re.search(r'chapter(\d+)', path.name)
+                    return int(match.group(1)) if match else 999
 
-                    chapter_files.sort(key=get_chapter_num)
+                chapter_files.sort(key=get_chapter_num)
 
-                    new_chapters = []
-                    for ch_file in chapter_files:
-                        if ch_file.name in known_files:
-                            continue
+                new_chapters = []
+                for ch_file in chapter_files:
+                    if ch_file.name in known_files:
+                        continue
 
-                        try:
-                            content = _load_json_file(ch_file)
+                    try:
+                        content = _load_json_file(ch_file)
 
-                            data_obj = content[0] if isinstance(content, list) and content else content
-                            if isinstance(content, list) and not content:
-                                data_obj = {}
+                        data_obj = content[0] if isinstance(content, list) and content else content
+                        if isinstance(content, list) and not content:
+                            data_obj = {}
 
-                            f_match = re.search(r'chapter(\d+)', ch_file.name)
-                            if f_match:
-                                c_id = f_match.group(1)
-                            else:
-                                c_id = str(data_obj.get("params", {}).get("chapter", ch_file.stem))
+                        f_match = re.search(r'chapter(\d+)', ch_file.name)
+                        if f_match:
+                            c_id = f_match.group(1)
+                        else:
+                            c_id = str(data_obj.get("params", {}).get("chapter", ch_file.stem))
+
+                        c_title = data_obj.get("title", ch_file.stem)
+                        c_title = c_title.replace(f"Chapter {c_id} ", "").strip()
 
-                            c_title = data_obj.get("title", ch_file.stem)
-                            c_title = c_title.replace(f"Chapter {c_id} ", "").strip()
+                        c_q = len(data_obj.get("questions", []))
+                        if not c_q and 'totalQuestions' in data_obj:
+                            c_q = data_obj['totalQuestions']
+
+                        new_chapters.append({
+                            "id": str(c_id),
+                            "name": c_title,
+                            "q": c_q,
+                            "file": ch_file.name
+                        })
+                    except Exception as e:
+                        print(f"Skipping {ch_file}: {e}")
 
+                # Question counts of existing chapters
+                counts = {}
+                for ch in existing_chapters:
+                    ch_path = sec_path / ch.get('file', '')
+                    if ch_path.exists():
+                        try:
+                            content = _load_json_file(ch_path)
+                            data_obj = content[0] if isinstance(content, list) and content else content
+                            if isinstance(content, list) and not content:
+                                data_obj = {}
                             c_q = len(data_obj.get("questions", []))
-                            if not c_q and 'totalQuestions' in data_obj:
-                                c_q = data_obj['totalQuestions']
-
-                            new_chapters.append({
-                                "id": str(c_id),
-                                "name": c_title,
-                                "q": c_q,
-                                "file": ch_file.name
-                            })
-                        except Exception as e:
-                            print(f"Skipping {ch_file}: {e}")
+                            if c_q:
+                                counts[ch.get('file', '')] = c_q
+                        except Exception:
+                            pass
+
+                # Merge into the file as it is now: the user may have saved
+                # chapters.json from the Tk thread while the files were read.
+                try:
+                    with _CHAPTERS_JSON_LOCK:
+                        try:
+                            current = _load_json_file(ch_json_path) if ch_json_path.exists() else []
+                        except Exception:
+                            current = existing_chapters
+                        before = json.dumps(current)
+                        for ch in current:
+                            if ch.get('file', '') in counts:
+                                ch['q'] = counts[ch.get('file', '')]
+                        current_files = {ch.get('file', '') for ch in current}
+                        # Preserve existing order, append new files at end
+                        synced_chapters = current + [ch for ch in new_chapters if ch['file'] not in current_files]
+                        if json.dumps(synced_chapters) != before:
+                            _write_chapters_json(ch_json_path, synced_chapters)
+                except Exception as e:
+                    print(f"Failed to save chapters.json: {e}")
 
-                    # Update question counts for existing chapters
-                    for ch in existing_chapters:
-                        ch_path = sec_path / ch.get('file', '')
-                        if ch_path.exists():
+            ch_file = base_path / section['path'] / "chapters.json"
+            if ch_file.exists():
+                try:
+                    chapters = _load_json_file(ch_file)
+                    for ch in chapters:
+                        ch['file'] = f"{section['path']}/{ch.get('file', '')}"
+                        if 'q' not in ch or ch['q'] == 0:
                             try:
-                                content = _load_json_file(ch_path)
-                                data_obj = content[0] if isinstance(content, list) and content else content
-                                if isinstance(content, list) and not content:
-                                    data_obj = {}
-                                c_q = len(data_obj.get("questions", []))
-                                if c_q:
-                                    ch['q'] = c_q
-                            except Exception:
+                                q_path = base_path / section['path'] / ch.get('file', '')
+                                q_data = _load_json_file(q_path)
+                                if isinstance(q_data, list):
+                                    q_data = q_data[0]
+                                ch['q'] = len(q_data.get('questions', []))
+                            except:
                                 pass
+                    sec_data["chapters"] = chapters
+                except:
+                    sec_data["chapters"] = []
+            
+            full_config.append(sec_data)
 
-                    # Preserve existing order, append new files at end
-                    synced_chapters = existing_chapters + new_chapters
-
-                    try:
-                        with open(ch_json_path, 'w', encoding='utf-8') as f:
-                            json.dump(synced_chapters, f, indent=2)
-                    except Exception as e:
-                        print(f"Failed to save chapters.json: {e}")
+        if not full_config:
+            return None
 
-                ch_file = self.base_path / section['path'] / "chapters.json"
-                if ch_file.exists():
-                    try:
-                        chapters = _load_json_file(ch_file)
-                        for ch in chapters:
-                            ch['file'] = f"{section['path']}/{ch.get('file', '')}"
-                            if 'q' not in ch or ch['q'] == 0:
-                                try:
-                                    q_path = self.base_path / section['path'] / ch.get('file', '')
-                                    q_data = _load_json_file(q_path)
-                                    if isinstance(q_data, list):
-                                        q_data = q_data[0]
-                                    ch['q'] = len(q_data.get('questions', []))
-                                except:
-                                    pass
-                        sec_data["chapters"] = chapters
-                    except:
-                        sec_data["chapters"] = []
-                
-                full_config.append(sec_data)
+        # One sprite sheet of all section icons replaces a request per subject card.
+        sprite = None
+        try:
+            sprite = build_icon_sprite(base_path, full_config)
+        except (OSError, ValueError) as e:
+            print(f"Icon sprite skipped: {e}")
+        if sprite:
+            for sec_data in full_config:
+                position = sprite["icons"].get(str(sec_data["id"]))
+                if position:
+                    sec_data["iconSprite"] = position
+            sprite = {key: value for key, value in sprite.items() if key != "icons"}
+
+        js_path = base_path / "js" / "exam-config.js"
+        js_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(js_path, 'w', encoding='utf-8') as f:
+            json_str = json.dumps(full_config, indent=2)
+            f.write(f"const EXAM_CONFIG = {json_str};\n")
+            f.write(f"const EXAM_ICON_SPRITE = {json.dumps(sprite)};\n")
+        task.report(len(sections), len(sections), "Wrote exam-config.js")
+
+        # Pre-render Graphviz blocks so clients skip loading Viz.js for them.
+        try:
+            stats = prerender_graphviz(base_path, sections, context=task)
+            if stats["rendered"] or stats["failed"]:
+                print(f"Graphviz pre-render: {stats['rendered']} rendered, "
+                      f"{stats['cached']} cached, {stats['failed']} failed")
+        except OSError as e:
+            print(f"Graphviz pre-render skipped: {e}")
 
-            if not full_config:
-                messagebox.showwarning(
-                    "No Config Data",
-                    "Config generation produced no data. Existing js/exam-config.js was left unchanged."
-                )
-                self.update_status("Skipped config generation (empty data)", "orange")
-                return
-            
-            js_path = self.base_path / "js" / "exam-config.js"
-            js_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(js_path, 'w', encoding='utf-8') as f:
-                json_str = json.dumps(full_config, indent=2)
-                f.write(f"const EXAM_CONFIG = {json_str};\n")
-            
-            # Refresh tables after configuration
-            self.load_sections()
-            if self.current_section:
-                self.load_chapters()
-                
-            messagebox.showinfo("Success", 
-                              f"Engine Configured Successfully!\n\nGenerated: {js_path.relative_to(self.base_path)}\nTables refreshed with latest data.")
-            self.update_status("✓ Engine configured", "green")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate config: {e}")
+        # Responsive WebP variants let phones download a smaller image; the
+        # dimensions and placeholders let the page reserve space before it loads.
+        try:
+            stats = publish_image_variants(base_path, sections, context=task)
+            if stats["manifests_updated"] or stats["errors"]:
+                print(f"Image variants: {stats['images']} image(s), "
+                      f"{stats['manifests_updated']} manifest(s) updated, {stats['errors']} error(s)")
+        except OSError as e:
+            print(f"Image variants skipped: {e}")
+        return js_path
 
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+"""Location of the editor's per-project cache directory.
+
+Indexes, validation results, image metadata, the optimization ledger and
+preview thumbnails all live under ``.editor_cache`` in the project root.
+Everything in it can be rebuilt, so the directory is git-ignored.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+CACHE_DIR_NAME = ".editor_cache"
+
+
+def cache_dir_for(base_path) -> Path:
+    return Path(base_path) / CACHE_DIR_NAME
@@ -0,0 +1,206 @@
+"""Index of question image references for orphan and missing-image reports.
+
+:class:`ImageReferenceIndex` records, per chapter file, every image a
+question points at: the ``image`` field plus image paths written inline in
+question text, choices and explanations. Chapter files are re-read only when
+their size or modification time changed, so refreshing the index after an
+edit only touches the edited chapter. Comparing the index with the files in
+each section's ``images`` folder gives the orphaned images (on disk, never
+referenced) and the missing ones (referenced, not on disk).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from editor_cache import cache_dir_for
+from image_tools import IMAGES_DIR_NAME, find_section_images
+
+CACHE_FILE_NAME = "image_references.json"
+CACHE_VERSION = 1
+
+# Question fields searched for inline image paths besides ``image`` itself.
+TEXT_FIELDS = ("text", "explanation")
+
+INLINE_IMAGE_RE = re.compile(
+    r"(?:data/[^\s\"'()<>\\]+/)?" + IMAGES_DIR_NAME + r"/[^\s\"'()<>\\]+?\.(?:png|jpe?g|gif|webp)\b",
+    re.IGNORECASE,
+)
+
+
+def _load_json(path: Path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def normalize_image_ref(ref: str, section_rel: str) -> str:
+    """Project-relative POSIX path of an image reference found in ``section_rel``."""
+    ref = str(ref).strip().replace("\\", "/")
+    while ref.startswith(("./", "/")):
+        ref = ref[1:] if ref.startswith("/") else ref[2:]
+    if ref.startswith(IMAGES_DIR_NAME + "/"):
+        ref = f"{section_rel.strip('/')}/{ref}"
+    return ref
+
+
+def question_image_refs(question: Dict, section_rel: str) -> List[str]:
+    """Every image path ``question`` refers to, normalized and without duplicates."""
+    refs = []
+    image = str(question.get("image") or "").strip()
+    if image:
+        refs.append(normalize_image_ref(image, section_rel))
+    texts = [question.get(field) for field in TEXT_FIELDS]
+    choices = question.get("choices")
+    if isinstance(choices, list):
+        texts.extend(choice.get("text") if isinstance(choice, dict) else choice for choice in choices)
+    for text in texts:
+        if isinstance(text, str) and IMAGES_DIR_NAME + "/" in text:
+            refs.extend(normalize_image_ref(match.group(0), section_rel) for match in INLINE_IMAGE_RE.finditer(text))
+    return list(dict.fromkeys(refs))
+
+
+class ImageReferenceIndex:
+    """Maps image paths to the questions that use them, reusing cached chapter scans.
+
+    Not thread-safe; refresh it from one background task at a time.
+    """
+
+    def __init__(self, base_path) -> None:
+        self.base_path = Path(base_path)
+        self.cache_path = cache_dir_for(self.base_path) / CACHE_FILE_NAME
+        self._files: Dict[str, Dict] = {}
+        self._loaded = False
+
+    # -- Cache ---------------------------------------------------------
+
+    def load_cache(self) -> None:
+        self._loaded = True
+        try:
+            payload = _load_json(self.cache_path)
+        except (OSError, ValueError):
+            return
+        if isinstance(payload, dict) and payload.get("version") == CACHE_VERSION:
+            self._files = payload.get("files") or {}
+
+    def save_cache(self) -> None:
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": self._files}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, self.cache_path)
+
+    # -- Index ---------------------------------------------------------
+
+    def refresh(self, sections: Iterable[Dict], context=None) -> Dict[str, int]:
+        """Re-scan changed chapter files and drop chapters that no longer exist."""
+        if not self._loaded:
+            self.load_cache()
+        chapters = list(self._iter_chapters(sections))
+        stats = {"files": len(chapters), "reread": 0}
+        seen = set()
+        for pos, (path, section_rel) in enumerate(chapters):
+            if context is not None:
+                context.report(pos, len(chapters), f"Indexing {path.name}")
+            key = str(path)
+            seen.add(key)
+            signature = _file_signature(path)
+            entry = self._files.get(key)
+            if entry and entry["signature"] == signature and entry["section"] == section_rel:
+                continue
+            self._files[key] = {"signature": signature, "section": section_rel, "refs": self._scan_file(path, section_rel)}
+            stats["reread"] += 1
+        for key in [key for key in self._files if key not in seen]:
+            del self._files[key]
+        if stats["reread"] or len(seen) != len(self._files):
+            self.save_cache()
+        return stats
+
+    def _iter_chapters(self, sections: Iterable[Dict]):
+        for section in sections or []:
+            section_rel = str(section.get("path", "")).strip()
+            if not section_rel:
+                continue
+            try:
+                chapters = _load_json(self.base_path / section_rel / "chapters.json")
+            except (OSError, ValueError):
+                continue
+            for chapter in chapters if isinstance(chapters, list) else []:
+                if isinstance(chapter, dict) and chapter.get("file"):
+                    yield self.base_path / section_rel / chapter["file"], section_rel
+
+    @staticmethod
+    def _scan_file(path: Path, section_rel: str) -> List[list]:
+        """Return ``[image_rel, question_number]`` rows for one chapter file."""
+        try:
+            payload = _load_json(path)
+        except (OSError, ValueError):
+            return []
+        data = payload[0] if isinstance(payload, list) and payload else payload
+        questions = data.get("questions", []) if isinstance(data, dict) else []
+        rows = []
+        for q_idx, question in enumerate(questions if isinstance(questions, list) else []):
+            if not isinstance(question, dict):
+                continue
+            number = str(question.get("number") or q_idx + 1)
+            rows.extend([ref, number] for ref in question_image_refs(question, section_rel))
+        return rows
+
+    def references(self, exclude: Iterable = ()) -> Dict[str, List[Dict[str, str]]]:
+        """Return ``{image_rel: [{"chapter_file", "question"}]}`` from the last refresh.
+
+        Chapter files in ``exclude`` are left out, e.g. one whose questions are
+        being edited in memory.
+        """
+        excluded = {str(path) for path in exclude}
+        index: Dict[str, List[Dict[str, str]]] = {}
+        for chapter_file, entry in self._files.items():
+            if chapter_file in excluded:
+                continue
+            for image_rel, number in entry["refs"]:
+                index.setdefault(image_rel, []).append({"chapter_file": chapter_file, "question": number})
+        return index
+
+    def find_orphans(self, sections: Iterable[Dict], context=None, extra_refs: Iterable[str] = ()) -> Dict[str, Dict]:
+        """Refresh and compare with disk: ``{section_id: {"orphans", "orphan_bytes", "missing"}}``.
+
+        ``orphans`` are project-relative paths of unreferenced images and
+        ``missing`` maps referenced paths that do not exist to their users.
+        ``extra_refs`` are normalized paths used by unsaved edits, which are
+        never reported as orphans.
+        """
+        sections = list(sections or [])
+        self.refresh(sections, context)
+        index = self.references()
+        in_use = index.keys() | set(extra_refs)
+        report: Dict[str, Dict] = {}
+        for section_id, files in find_section_images(self.base_path, sections).items():
+            orphans = [path for path in files if path.relative_to(self.base_path).as_posix() not in in_use]
+            report[section_id] = {
+                "orphans": [path.relative_to(self.base_path).as_posix() for path in orphans],
+                "orphan_bytes": sum(path.stat().st_size for path in orphans),
+                "missing": {},
+            }
+
+        section_ids = {}
+        for section in sections:
+            section_rel = str(section.get("path", "")).strip()
+            section_ids[section_rel] = str(section.get("id") or section_rel)
+        for image_rel, users in index.items():
+            if (self.base_path / image_rel).is_file():
+                continue
+            section_id = section_ids.get(self._files[users[0]["chapter_file"]]["section"], "")
+            entry = report.setdefault(section_id, {"orphans": [], "orphan_bytes": 0, "missing": {}})
+            entry["missing"][image_rel] = users
+        return report
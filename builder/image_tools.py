@@ -0,0 +1,866 @@
+"""Image optimization helpers for section icons and question images.
+
+Nothing here touches Tk, so the functions can run on the background task
+runner or in worker processes. Pillow is imported on first use.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from editor_cache import cache_dir_for
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+# Folder inside each section directory that holds question images.
+IMAGES_DIR_NAME = "images"
+
+# Generated responsive variants live in this subfolder of the image's folder.
+VARIANTS_DIR_NAME = "variants"
+
+# Per-section file inside the images folder listing each image's variants
+# and metadata for the engine; written by publish_image_variants().
+IMAGE_MANIFEST_NAME = "manifest.json"
+IMAGE_MANIFEST_VERSION = 1
+
+# Target widths of the responsive WebP variants; wider images keep their own width too.
+VARIANT_WIDTHS = (480, 960, 1440)
+WEBP_QUALITY = 80
+
+# Longest side and WebP quality of the blurred placeholder inlined for each image.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+# Metadata of published images, reused while the file's size and mtime are unchanged.
+IMAGE_META_FILE_NAME = "image_meta.json"
+IMAGE_META_VERSION = 1
+
+# Section icons are packed into one sprite sheet of square cells this large
+# (the widest a subject card shows its icon).
+ICON_SPRITE_DIR = "assets/icons"
+ICON_SPRITE_PREFIX = "sections-"
+ICON_SPRITE_CELL = 320
+ICON_SPRITE_QUALITY = 85
+
+# PNGs above this size get their color table reduced to 256 colors.
+PNG_QUANTIZE_MIN_BYTES = 70 * 1024
+JPEG_QUALITY = 82
+
+# Files optimized with these settings are recorded in the ledger and skipped
+# until they change; editing any encoder setting re-optimizes everything.
+LEDGER_FILE_NAME = "image_ledger.json"
+LEDGER_VERSION = 1
+ENCODER_SETTINGS = f"jpeg:q{JPEG_QUALITY};webp:q{WEBP_QUALITY}m6;png:z9,quantize>{PNG_QUANTIZE_MIN_BYTES};gif:p256"
+
+# Perceptual hashes compare a grayscale thumbnail this many pixels high.
+PERCEPTUAL_HASH_SIZE = 8
+# Largest per-channel pixel difference allowed when a perceptual hash match
+# is confirmed at full resolution.
+PERCEPTUAL_MAX_DELTA = 8
+
+# Below this many files a process pool costs more than it saves.
+PARALLEL_MIN_FILES = 8
+
+OptimizeResult = Tuple[bool, int, int, str]
+
+
+def _load_image_module():
+    try:
+        from PIL import Image
+    except Exception:
+        return None
+    return Image
+
+
+def optimize_image_file(image_file) -> OptimizeResult:
+    """Re-encode one image smaller without changing its pixel dimensions.
+
+    Returns ``(optimized, before_size, after_size, error)``. The file is only
+    replaced when the new encoding is smaller.
+    """
+    Image = _load_image_module()
+    path = Path(image_file)
+    if not path.exists() or not path.is_file():
+        return False, 0, 0, "File not found"
+
+    suffix = path.suffix.lower()
+    if suffix not in IMAGE_SUFFIXES:
+        return False, path.stat().st_size, path.stat().st_size, "Unsupported format"
+
+    before_size = path.stat().st_size
+    if Image is None:
+        return False, before_size, before_size, "Pillow is not installed"
+
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    tmp_file.close()
+    tmp_path = Path(tmp_file.name)
+
+    try:
+        with Image.open(path) as img:
+            fmt = (img.format or "").upper()
+            save_img = img
+            save_fmt = fmt
+            save_kwargs = {"optimize": True}
+
+            if suffix in {".jpg", ".jpeg"} or fmt == "JPEG":
+                if img.mode not in {"RGB", "L"}:
+                    save_img = img.convert("RGB")
+                save_fmt = "JPEG"
+                save_kwargs.update({"quality": JPEG_QUALITY, "progressive": True})
+            elif suffix == ".webp" or fmt == "WEBP":
+                if img.mode not in {"RGB", "RGBA"}:
+                    save_img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+                save_fmt = "WEBP"
+                save_kwargs.update({"quality": WEBP_QUALITY, "method": 6})
+            elif suffix == ".gif" or fmt == "GIF":
+                save_fmt = "GIF"
+                save_img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
+            else:
+                save_fmt = "PNG"
+                save_kwargs.update({"compress_level": 9})
+                # Keep dimensions unchanged; only reduce color table when file is already heavy.
+                if before_size > PNG_QUANTIZE_MIN_BYTES:
+                    if "A" in img.getbands():
+                        save_img = img.convert("RGBA").quantize(colors=256)
+                    else:
+                        save_img = img.convert("P", palette=Image.ADAPTIVE, colors=256)
+
+            save_img.save(tmp_path, format=save_fmt, **save_kwargs)
+
+        after_size = tmp_path.stat().st_size
+        if after_size < before_size:
+            shutil.move(str(tmp_path), str(path))
+            return True, before_size, after_size, ""
+
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except Exception:
+            pass
+        return False, before_size, before_size, ""
+    except Exception as e:
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except Exception:
+            pass
+        return False, before_size, before_size, str(e)
+
+
+def find_section_images(base_path, sections: Iterable[Dict]) -> Dict[str, List[Path]]:
+    """Return ``{section_id: [image paths]}`` for every section's images folder."""
+    base = Path(base_path)
+    groups: Dict[str, List[Path]] = {}
+    seen = set()
+    for section in sections or []:
+        section_rel = str(section.get("path", "")).strip()
+        if not section_rel:
+            continue
+        images_dir = base / section_rel / IMAGES_DIR_NAME
+        if not images_dir.is_dir():
+            continue
+        files = []
+        for path in sorted(images_dir.rglob("*")):
+            if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+                continue
+            if VARIANTS_DIR_NAME in path.relative_to(images_dir).parts[:-1]:
+                continue
+            resolved = path.resolve()
+            if resolved in seen:
+                continue
+            seen.add(resolved)
+            files.append(path)
+        if files:
+            groups[str(section.get("id") or section_rel)] = files
+    return groups
+
+
+class OptimizationLedger:
+    """Records images already optimized with :data:`ENCODER_SETTINGS`.
+
+    Each entry is ``[size, mtime_ns, sha256]`` of the file as it was left by
+    the optimizer. A file whose size and mtime still match is skipped
+    without reading it; one that was only touched (same bytes, new mtime)
+    is skipped after hashing.
+    """
+
+    def __init__(self, base_path) -> None:
+        self.base_path = Path(base_path)
+        self.path = cache_dir_for(self.base_path) / LEDGER_FILE_NAME
+        self._files: Dict[str, list] = {}
+        # Set whenever an entry is added or refreshed so callers know to save().
+        self.changed = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (isinstance(payload, dict) and payload.get("version") == LEDGER_VERSION
+                and payload.get("settings") == ENCODER_SETTINGS):
+            self._files = payload.get("files") or {}
+
+    def _key(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(self.base_path.resolve()).as_posix()
+        except ValueError:
+            return str(path.resolve())
+
+    def is_current(self, image_path) -> bool:
+        """True when ``image_path`` is unchanged since it was last recorded."""
+        path = Path(image_path)
+        key = self._key(path)
+        entry = self._files.get(key)
+        if not entry:
+            return False
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        if st.st_size != entry[0]:
+            return False
+        if st.st_mtime_ns == entry[1]:
+            return True
+        if file_digest(path) != entry[2]:
+            return False
+        entry[1] = st.st_mtime_ns
+        self.changed = True
+        return True
+
+    def pending(self, paths: Iterable) -> List:
+        """Return the paths that are new or changed since they were recorded."""
+        return [path for path in paths if not self.is_current(path)]
+
+    def record(self, image_path) -> None:
+        path = Path(image_path)
+        try:
+            st = path.stat()
+            self._files[self._key(path)] = [st.st_size, st.st_mtime_ns, file_digest(path)]
+            self.changed = True
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        # Files that no longer exist are forgotten.
+        self._files = {key: entry for key, entry in self._files.items()
+                       if (self.base_path / key).exists() or Path(key).exists()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": LEDGER_VERSION, "settings": ENCODER_SETTINGS, "files": self._files},
+                      f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+
+def _optimize_one(path: str) -> Tuple[str, OptimizeResult]:
+    return path, optimize_image_file(path)
+
+
+def optimize_images(paths: Iterable, context=None, max_workers: Optional[int] = None) -> Dict[str, OptimizeResult]:
+    """Optimize many images, in a process pool when there are enough of them.
+
+    ``context`` is an optional background-task context for progress and
+    cancellation. Returns results keyed by ``str(path)``.
+    """
+    paths = [str(path) for path in paths]
+    results: Dict[str, OptimizeResult] = {}
+
+    def collect(item):
+        path, result = item
+        results[path] = result
+        if context is not None:
+            context.report(len(results), len(paths), Path(path).name)
+
+    if len(paths) >= PARALLEL_MIN_FILES:
+        try:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_optimize_one, path) for path in paths]
+                try:
+                    for future in as_completed(futures):
+                        collect(future.result())
+                except BaseException:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+            return results
+        except (OSError, ImportError, RuntimeError):
+            # No usable process pool (frozen build, sandbox); optimize here.
+            pass
+
+    for path in paths:
+        if path not in results:
+            collect(_optimize_one(path))
+    return results
+
+
+def summarize_by_section(groups: Dict[str, List[Path]], results: Dict[str, OptimizeResult]) -> Dict[str, Dict[str, int]]:
+    """Aggregate per-file results into per-section counts and byte totals.
+
+    Files without a result (skipped by the ledger) are counted as ``skipped``.
+    """
+    summary: Dict[str, Dict[str, int]] = {}
+    for section_id, files in groups.items():
+        stats = {"files": 0, "optimized": 0, "unchanged": 0, "errors": 0, "skipped": 0,
+                 "before": 0, "after": 0, "saved": 0}
+        for path in files:
+            result = results.get(str(path))
+            if result is None:
+                stats["skipped"] += 1
+                continue
+            optimized, before_size, after_size, error = result
+            stats["files"] += 1
+            stats["before"] += before_size
+            stats["after"] += after_size
+            if error:
+                stats["errors"] += 1
+            elif optimized:
+                stats["optimized"] += 1
+                stats["saved"] += max(0, before_size - after_size)
+            else:
+                stats["unchanged"] += 1
+        summary[section_id] = stats
+    return summary
+
+
+# -- Responsive variants -------------------------------------------------
+
+
+def remove_image_file(image_path) -> Optional[int]:
+    """Delete an image and its responsive variants; return the freed bytes or None on failure."""
+    path = Path(image_path)
+    try:
+        size = path.stat().st_size
+        path.unlink()
+    except OSError:
+        return None
+    for variant in path.parent.joinpath(VARIANTS_DIR_NAME).glob(f"{path.stem}-*w.webp"):
+        try:
+            size += variant.stat().st_size
+            variant.unlink()
+        except OSError:
+            pass
+    return size
+
+
+def variant_path(image_path, width: int) -> Path:
+    path = Path(image_path)
+    return path.parent / VARIANTS_DIR_NAME / f"{path.stem}-{width}w.webp"
+
+
+def build_image_variants(image_path, widths: Iterable[int] = VARIANT_WIDTHS) -> Tuple[int, List[Tuple[Path, int]]]:
+    """Write WebP variants of one image; return its width and ``(path, width)`` pairs.
+
+    Variants are made for every target width below the image's own width,
+    plus a full-width WebP that is only listed when it is smaller than the
+    original file. Variants newer than the source image are reused.
+    Animated images get no variants.
+    """
+    Image = _load_image_module()
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    path = Path(image_path)
+    source_mtime = path.stat().st_mtime_ns
+    source_size = path.stat().st_size
+
+    with Image.open(path) as img:
+        width, height = img.size
+        if getattr(img, "is_animated", False):
+            return width, []
+        targets = sorted({target for target in widths if target < width} | {width})
+        variants: List[Tuple[Path, int]] = []
+        converted = None
+        for target in targets:
+            out = variant_path(path, target)
+            if not (out.exists() and out.stat().st_mtime_ns >= source_mtime):
+                if converted is None:
+                    converted = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+                frame = converted
+                if target < width:
+                    lanczos = getattr(getattr(Image, "Resampling", Image), "LANCZOS", None)
+                    frame = converted.resize((target, max(1, round(height * target / width))), lanczos)
+                out.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = out.with_suffix(".tmp")
+                frame.save(temp_path, format="WEBP", quality=WEBP_QUALITY, method=6)
+                os.replace(temp_path, out)
+            if target == width and out.stat().st_size >= source_size:
+                # The original is already smaller; the srcset uses it instead.
+                continue
+            variants.append((out, target))
+    return width, variants
+
+
+def _image_srcset(base: Path, image_rel: str, cache: Dict[str, Optional[List[Dict]]]) -> Optional[List[Dict]]:
+    """Return the ``srcset`` entries of one referenced image, building variants as needed."""
+    if image_rel in cache:
+        return cache[image_rel]
+    srcset = None
+    path = base / image_rel
+    if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file():
+        width, variants = build_image_variants(path)
+        if variants:
+            srcset = [{"src": out.relative_to(base).as_posix(), "width": target} for out, target in variants]
+            if srcset[-1]["width"] < width:
+                srcset.append({"src": image_rel, "width": width})
+    cache[image_rel] = srcset
+    return srcset
+
+
+def image_metadata(image_path) -> Dict:
+    """Return ``{"width", "height", "color", "placeholder"}`` of one image.
+
+    ``color`` is the average color as ``#rrggbb`` and ``placeholder`` a data
+    URI of a WebP at most :data:`PLACEHOLDER_SIZE` pixels wide, small enough
+    to inline in the image manifest.
+    """
+    Image = _load_image_module()
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    box = getattr(getattr(Image, "Resampling", Image), "BOX", None)
+    with Image.open(image_path) as img:
+        width, height = img.size
+        small = img.convert("RGBA")
+    small.thumbnail((PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4), box)
+    # Transparent areas show the page background, so flatten onto white.
+    flat = Image.new("RGB", small.size, (255, 255, 255))
+    flat.paste(small, mask=small.getchannel("A"))
+    red, green, blue = flat.resize((1, 1), box).getpixel((0, 0))
+    flat.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), box)
+    buffer = io.BytesIO()
+    flat.save(buffer, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    return {
+        "width": width,
+        "height": height,
+        "color": f"#{red:02x}{green:02x}{blue:02x}",
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+    }
+
+
+def _cached_image_metadata(base: Path, image_rel: str, cache: Dict[str, Dict]) -> Optional[Dict]:
+    """:func:`image_metadata` of one referenced image, reusing ``cache`` while the file is unchanged."""
+    path = base / image_rel
+    if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+        return None
+    st = path.stat()
+    signature = [st.st_mtime_ns, st.st_size]
+    cached = cache.get(image_rel)
+    if not cached or cached.get("signature") != signature:
+        cached = {"signature": signature, "meta": image_metadata(path)}
+        cache[image_rel] = cached
+    return dict(cached["meta"])
+
+
+def _load_meta_cache(base: Path) -> Dict[str, Dict]:
+    try:
+        with open(cache_dir_for(base) / IMAGE_META_FILE_NAME, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != IMAGE_META_VERSION:
+        return {}
+    return payload.get("images") or {}
+
+
+def _save_meta_cache(base: Path, images: Dict[str, Dict]) -> None:
+    path = cache_dir_for(base) / IMAGE_META_FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": IMAGE_META_VERSION, "images": images}, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def image_manifest_path(base_path, section_rel: str) -> Path:
+    return Path(base_path) / section_rel / IMAGES_DIR_NAME / IMAGE_MANIFEST_NAME
+
+
+def publish_image_variants(base_path, sections: Iterable[Dict], context=None) -> Dict[str, int]:
+    """Generate responsive variants and metadata for every question image and write image manifests.
+
+    Each section gets ``<section>/images/manifest.json`` mapping every local
+    image its questions use to ``{"srcset": [{"src", "width"}, ...],
+    "width", "height", "color", "placeholder"}``. The engine loads it with
+    the section's chapters to pick a variant, reserve the image's box and
+    paint a placeholder before the image loads. Chapter files are only read,
+    so publishing never races with an editor saving them; a manifest is
+    rewritten only when it changed.
+    """
+    stats = {"available": 0 if _load_image_module() is None else 1,
+             "images": 0, "manifests_updated": 0, "errors": 0}
+    if not stats["available"]:
+        return stats
+
+    base = Path(base_path)
+    sections = [section for section in sections or [] if str(section.get("path", "")).strip()]
+    cache: Dict[str, Optional[List[Dict]]] = {}
+    meta_cache = _load_meta_cache(base)
+    for pos, section in enumerate(sections):
+        section_rel = str(section.get("path", "")).strip()
+        if context is not None:
+            context.report(pos, len(sections), f"Image variants: {section_rel}")
+        images: Dict[str, Dict] = {}
+        for chapter_path in _chapter_files(base, [section]):
+            try:
+                with open(chapter_path, "r", encoding="utf-8-sig") as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            data = payload[0] if isinstance(payload, list) and payload else payload
+            questions = data.get("questions", []) if isinstance(data, dict) else []
+            for question in questions if isinstance(questions, list) else []:
+                if not isinstance(question, dict):
+                    continue
+                image_rel = str(question.get("image") or "").strip().replace("\\", "/")
+                if (not image_rel or image_rel in images or "://" in image_rel
+                        or image_rel.startswith("data:")):
+                    continue
+                try:
+                    srcset = _image_srcset(base, image_rel, cache)
+                    meta = _cached_image_metadata(base, image_rel, meta_cache)
+                except Exception as e:
+                    cache[image_rel] = None
+                    stats["errors"] += 1
+                    print(f"Image variants failed for {image_rel}: {e}")
+                    continue
+                entry = dict(meta or {})
+                if srcset:
+                    entry["srcset"] = srcset
+                if entry:
+                    images[image_rel] = entry
+        if _write_image_manifest(image_manifest_path(base, section_rel), images):
+            stats["manifests_updated"] += 1
+
+    stats["images"] = sum(1 for entry in cache.values() if entry)
+    _save_meta_cache(base, {rel: value for rel, value in meta_cache.items() if rel in cache})
+    return stats
+
+
+def _write_image_manifest(path: Path, images: Dict[str, Dict]) -> bool:
+    """Write (or remove, when empty) one section's image manifest; True when it changed."""
+    payload = {"version": IMAGE_MANIFEST_VERSION, "images": images}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if json.load(f) == payload:
+                return False
+    except (OSError, ValueError):
+        if not images:
+            return False
+    if not images:
+        path.unlink()
+        return True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temp_path, path)
+    return True
+
+
+# -- Section icon sprite -------------------------------------------------
+
+
+def _local_icon_path(base: Path, icon) -> Optional[Path]:
+    icon = str(icon or "").strip().replace("\\", "/")
+    if not icon or "://" in icon or icon.startswith("data:"):
+        return None
+    while icon.startswith("./"):
+        icon = icon[2:]
+    path = base / icon.lstrip("/")
+    if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+        return None
+    return path
+
+
+def build_icon_sprite(base_path, sections: Iterable[Dict], cell: int = ICON_SPRITE_CELL) -> Optional[Dict]:
+    """Pack every local section icon into one WebP sprite sheet.
+
+    Icons are scaled to fit a square ``cell`` and centered in it, in section
+    order, on a near-square grid. The sheet is named after a hash of the
+    icons so browsers cache it forever and an unchanged set is not rebuilt.
+    Returns ``{"src", "width", "height", "cell", "icons": {section_id:
+    {"x", "y"}}}``, or None without Pillow or when fewer than two icons are
+    local files.
+    """
+    Image = _load_image_module()
+    if Image is None:
+        return None
+    base = Path(base_path)
+    icons = []
+    for section in sections or []:
+        path = _local_icon_path(base, section.get("icon"))
+        if path is not None:
+            icons.append((str(section.get("id", "")), path))
+    if len(icons) < 2:
+        return None
+
+    digest = hashlib.sha256(f"{cell}|{ICON_SPRITE_QUALITY}".encode("utf-8"))
+    for section_id, path in icons:
+        digest.update(f"|{section_id}|{file_digest(path)}".encode("utf-8"))
+    sprite_dir = base / ICON_SPRITE_DIR
+    sprite_path = sprite_dir / f"{ICON_SPRITE_PREFIX}{digest.hexdigest()[:12]}.webp"
+
+    columns = math.ceil(math.sqrt(len(icons)))
+    rows = math.ceil(len(icons) / columns)
+    positions = {section_id: {"x": (pos % columns) * cell, "y": (pos // columns) * cell}
+                 for pos, (section_id, _) in enumerate(icons)}
+
+    if not sprite_path.exists():
+        lanczos = getattr(getattr(Image, "Resampling", Image), "LANCZOS", None)
+        sheet = Image.new("RGBA", (columns * cell, rows * cell), (0, 0, 0, 0))
+        for section_id, path in icons:
+            with Image.open(path) as img:
+                icon = img.convert("RGBA")
+            scale = cell / max(icon.size)
+            icon = icon.resize((max(1, round(icon.width * scale)), max(1, round(icon.height * scale))), lanczos)
+            origin = positions[section_id]
+            sheet.paste(icon, (origin["x"] + (cell - icon.width) // 2, origin["y"] + (cell - icon.height) // 2))
+        sprite_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = sprite_path.with_suffix(".tmp")
+        sheet.save(temp_path, format="WEBP", quality=ICON_SPRITE_QUALITY, method=6)
+        os.replace(temp_path, sprite_path)
+
+    for old_sprite in sprite_dir.glob(f"{ICON_SPRITE_PREFIX}*.webp"):
+        if old_sprite != sprite_path:
+            old_sprite.unlink()
+    return {
+        "src": sprite_path.relative_to(base).as_posix(),
+        "width": columns * cell,
+        "height": rows * cell,
+        "cell": cell,
+        "icons": positions,
+    }
+
+
+# -- Deduplication -------------------------------------------------------
+
+
+def file_digest(path) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_identical_file(directory, source) -> Optional[Path]:
+    """Return a file in ``directory`` with the same bytes as ``source``, if any."""
+    source = Path(source)
+    size = source.stat().st_size
+    digest = None
+    try:
+        candidates = sorted(Path(directory).iterdir())
+    except OSError:
+        return None
+    for candidate in candidates:
+        if not candidate.is_file() or candidate.stat().st_size != size:
+            continue
+        if digest is None:
+            digest = file_digest(source)
+        if file_digest(candidate) == digest:
+            return candidate
+    return None
+
+
+def perceptual_hash(path) -> Optional[str]:
+    """Difference hash of an image, or None when it cannot be decoded.
+
+    Equal hashes and pixel sizes only make two images candidates; confirm
+    them with :func:`images_match` before treating them as the same.
+    """
+    Image = _load_image_module()
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            size = img.size
+            small = img.convert("L").resize((PERCEPTUAL_HASH_SIZE + 1, PERCEPTUAL_HASH_SIZE))
+    except Exception:
+        return None
+    pixels = list(small.getdata())
+    bits = 0
+    row = PERCEPTUAL_HASH_SIZE + 1
+    for y in range(PERCEPTUAL_HASH_SIZE):
+        for x in range(PERCEPTUAL_HASH_SIZE):
+            bits = (bits << 1) | (pixels[y * row + x] > pixels[y * row + x + 1])
+    return f"{size[0]}x{size[1]}:{bits:016x}"
+
+
+def images_match(first, second, max_delta: int = PERCEPTUAL_MAX_DELTA) -> bool:
+    """True when two images have the same size and no pixel differs by more than ``max_delta``."""
+    Image = _load_image_module()
+    if Image is None:
+        return False
+    from PIL import ImageChops
+    try:
+        with Image.open(first) as a, Image.open(second) as b:
+            if a.size != b.size:
+                return False
+            diff = ImageChops.difference(a.convert("RGBA"), b.convert("RGBA"))
+    except Exception:
+        return False
+    return max(high for _, high in diff.getextrema()) <= max_delta
+
+
+def find_duplicate_images(paths: Iterable, perceptual: bool = False, context=None) -> Dict[Path, List[Path]]:
+    """Group duplicate images and return ``{canonical: [duplicates]}``.
+
+    Files are compared by size, then SHA-256; with ``perceptual`` the byte
+    groups with equal :func:`perceptual_hash` are merged when
+    :func:`images_match` confirms them at full resolution. The first path in
+    sorted order is kept as the canonical file.
+    """
+    by_size: Dict[int, List[Path]] = {}
+    for path in sorted(Path(path) for path in paths):
+        try:
+            by_size.setdefault(path.stat().st_size, []).append(path)
+        except OSError:
+            continue
+
+    by_digest: Dict[str, List[Path]] = {}
+    total = sum(len(group) for group in by_size.values() if len(group) > 1)
+    done = 0
+    for group in by_size.values():
+        if len(group) == 1:
+            by_digest[str(group[0])] = group
+            continue
+        for path in group:
+            if context is not None:
+                context.report(done, total, f"Hashing {path.name}")
+            done += 1
+            by_digest.setdefault(file_digest(path), []).append(path)
+    groups = list(by_digest.values())
+
+    if perceptual:
+        by_look: Dict[str, List[List[Path]]] = {}
+        merged = []
+        for pos, group in enumerate(groups):
+            if context is not None:
+                context.report(pos, len(groups), f"Comparing {group[0].name}")
+            key = perceptual_hash(group[0])
+            if key is None:
+                merged.append(group)
+                continue
+            # Same hash is only a candidate; merge with the first cluster whose pixels match.
+            clusters = by_look.setdefault(key, [])
+            for cluster in clusters:
+                if images_match(cluster[0], group[0]):
+                    cluster.extend(group)
+                    break
+            else:
+                clusters.append(list(group))
+        groups = merged + [cluster for clusters in by_look.values() for cluster in clusters]
+
+    duplicates: Dict[Path, List[Path]] = {}
+    for group in groups:
+        members = sorted(group)
+        if len(members) > 1:
+            duplicates[members[0]] = members[1:]
+    return duplicates
+
+
+def _chapter_files(base: Path, sections: Iterable[Dict]) -> List[Path]:
+    files = []
+    for section in sections or []:
+        section_rel = str(section.get("path", "")).strip()
+        if not section_rel:
+            continue
+        try:
+            with open(base / section_rel / "chapters.json", "r", encoding="utf-8-sig") as f:
+                chapters = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for chapter in chapters if isinstance(chapters, list) else []:
+            if isinstance(chapter, dict) and chapter.get("file"):
+                files.append(base / section_rel / chapter["file"])
+    return files
+
+
+def plan_image_dedup(base_path, sections: Iterable[Dict], perceptual: bool = False, context=None) -> Dict:
+    """Find duplicate question images and the chapter files that reference them.
+
+    Returns ``{"replace": {duplicate_rel: canonical_rel}, "chapters": [paths],
+    "bytes": reclaimable bytes, "perceptual": flag}``; nothing is changed on disk.
+    """
+    base = Path(base_path)
+    groups = find_section_images(base, sections)
+    duplicates = find_duplicate_images(
+        [path for files in groups.values() for path in files], perceptual=perceptual, context=context
+    )
+    replace = {}
+    reclaimable = 0
+    for canonical, members in duplicates.items():
+        for path in members:
+            replace[path.relative_to(base).as_posix()] = canonical.relative_to(base).as_posix()
+            reclaimable += path.stat().st_size
+
+    chapters = []
+    if replace:
+        for chapter_path in _chapter_files(base, sections):
+            try:
+                raw = chapter_path.read_text(encoding="utf-8-sig")
+            except OSError:
+                continue
+            if any(Path(rel).name in raw for rel in replace):
+                chapters.append(chapter_path)
+    return {"replace": replace, "chapters": chapters, "bytes": reclaimable, "perceptual": perceptual}
+
+
+def apply_image_dedup(base_path, plan: Dict, sections: Iterable[Dict], context=None) -> Dict[str, int]:
+    """Point ``question.image`` at canonical files and delete unreferenced duplicates.
+
+    A duplicate is only deleted when no chapter file mentions its file name
+    any more, so images also linked from question text are kept.
+    """
+    base = Path(base_path)
+    replace = plan["replace"]
+    stats = {"references": 0, "chapters": 0, "removed": 0, "kept": 0, "saved": 0}
+
+    for pos, chapter_path in enumerate(plan["chapters"]):
+        if context is not None:
+            context.report(pos, len(plan["chapters"]), f"Rewriting {chapter_path.name}")
+        try:
+            with open(chapter_path, "r", encoding="utf-8-sig") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        data = payload[0] if isinstance(payload, list) and payload else payload
+        questions = data.get("questions", []) if isinstance(data, dict) else []
+        changed = 0
+        for question in questions if isinstance(questions, list) else []:
+            if not isinstance(question, dict):
+                continue
+            image_rel = str(question.get("image") or "").strip().replace("\\", "/")
+            if image_rel in replace:
+                question["image"] = replace[image_rel]
+                changed += 1
+        if changed:
+            with open(chapter_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+            stats["references"] += changed
+            stats["chapters"] += 1
+
+    texts = []
+    for chapter_path in _chapter_files(base, sections):
+        try:
+            texts.append(chapter_path.read_text(encoding="utf-8-sig"))
+        except OSError:
+            continue
+    remaining = "\n".join(texts)
+    for duplicate_rel in replace:
+        path = base / duplicate_rel
+        if path.name in remaining:
+            stats["kept"] += 1
+            continue
+        size = remove_image_file(path)
+        if size is not None:
+            stats["removed"] += 1
+            stats["saved"] += size
+    return stats
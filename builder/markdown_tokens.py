@@ -0,0 +1,137 @@
+"""Single-pass tokenizer for the lightweight markdown used in question text.
+
+Question text, choices and explanations use a small markdown dialect: fenced
+code blocks, inline code, bold, italic, ``\\(..\\)`` / ``\\[..\\]`` math, raw HTML
+tags and HTML entities. :func:`tokenize` finds all of them with one combined
+regular expression so the highlighter, preview, text fixers and diagram scanner
+share a single scan and a single definition of each construct.
+
+Fenced blocks win over everything else, and inline spans never contain a
+fence opener or a blank line, so tokens inside one paragraph depend only on
+that paragraph's text.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+# Inline bodies: no paragraph break and no fence opener.
+_LINE_CHAR = r"(?:[^`\n]|`(?!``))"
+_SPAN_BREAK = r"\n(?![ \t]*\n)"
+
+
+def _math_body(close: str) -> str:
+    """Body of a ``\\(..\\)``-style span, ending before the first closing marker."""
+    return (
+        r"(?:[^`\n]|`(?!``)|" + _SPAN_BREAK + r")"
+        r"(?:[^\\`\n]|\\(?!" + re.escape(close) + r")|`(?!``)|" + _SPAN_BREAK + r")*"
+    )
+
+
+# Every alternative starts with a literal outside its named group so the regex
+# engine can skip straight to candidate characters; the named group (the
+# token kind) closes last, which makes ``match.lastgroup`` the kind.
+TOKEN_RE = re.compile(
+    r"`(?P<fence>``(?P<lang>[\w\-]*)\n?(?P<fence_body>[\s\S]*?)```)"
+    r"|`(?<!``)(?P<code>(?!`)(?P<code_body>(?:[^`\n]|" + _SPAN_BREAK + r")+)`(?!`))"
+    r"|\*(?P<bold>\*(?P<bold_body>" + _LINE_CHAR + r"+?)\*\*)"
+    r"|\*(?<!\*\*)(?P<italic>(?!\*)(?P<italic_body>" + _LINE_CHAR + r"+?)(?<!\*)\*(?!\*))"
+    r"|\\(?P<math>\((?P<math_body>" + _math_body(")") + r")\\\))"
+    r"|\\(?P<display_math>\[(?P<display_math_body>" + _math_body("]") + r")\\\])"
+    r"|<(?P<html>(?P<html_body>[^<>\n]+)>)"
+    r"|&(?P<entity>(?P<entity_body>\w+);)"
+)
+
+TOKEN_KINDS = ("fence", "code", "bold", "italic", "math", "display_math", "html", "entity")
+
+# Kinds whose body is itself markdown and may contain nested tokens.
+NESTING_KINDS = {"bold", "italic"}
+
+# Kinds whose content is literal code that text fixers must leave alone.
+CODE_KINDS = {"fence", "code"}
+
+BR_TAG_RE = re.compile(r"br\s*/?", re.IGNORECASE)
+
+
+class Token(NamedTuple):
+    """One markdown construct; ``inner_*`` delimit its content without markers."""
+
+    kind: str
+    start: int
+    end: int
+    inner_start: int
+    inner_end: int
+    lang: str = ""
+
+    def inner(self, text: str) -> str:
+        return text[self.inner_start:self.inner_end]
+
+
+def tokenize(text: str, pos: int = 0, endpos: Optional[int] = None, nested: bool = False) -> List[Token]:
+    """Return markdown tokens of ``text[pos:endpos]`` in document order.
+
+    Top-level tokens never overlap. With ``nested`` the bodies of bold and
+    italic spans are tokenized too and their tokens follow the parent token.
+    """
+    if endpos is None:
+        endpos = len(text)
+    tokens: List[Token] = []
+    for match in TOKEN_RE.finditer(text, pos, endpos):
+        kind = match.lastgroup
+        body = kind + "_body"
+        token = Token(
+            kind,
+            match.start(),
+            match.end(),
+            match.start(body),
+            match.end(body),
+            (match.group("lang") or "") if kind == "fence" else "",
+        )
+        tokens.append(token)
+        if nested and kind in NESTING_KINDS:
+            tokens.extend(tokenize(text, token.inner_start, token.inner_end, nested=True))
+    return tokens
+
+
+@lru_cache(maxsize=128)
+def tokenize_document(text: str) -> Tuple[Token, ...]:
+    """Nested tokens of a whole text, cached so every consumer shares one scan."""
+    return tuple(tokenize(text, nested=True))
+
+
+def top_level(tokens: Iterable[Token]) -> List[Token]:
+    """Drop tokens nested inside an earlier token."""
+    result: List[Token] = []
+    end = 0
+    for token in tokens:
+        if token.start >= end:
+            result.append(token)
+            end = token.end
+    return result
+
+
+def fenced_blocks(text: str) -> List[Token]:
+    """Return the fenced code blocks of ``text`` whose info string ends the line.
+
+    One-line spans such as ```` ```java x = 1;``` ```` are still ``fence``
+    tokens for the highlighter and fixers, but the web app renders them as
+    inline code, so they are not blocks here.
+    """
+    if "```" not in text:
+        return []
+    return [
+        token for token in tokenize_document(text)
+        if token.kind == "fence" and text[token.start + 3 + len(token.lang):token.inner_start] == "\n"
+    ]
+
+
+def code_ranges(tokens: Iterable[Token]) -> List[tuple]:
+    """Return ``(start, end)`` ranges of literal code among ``tokens``."""
+    return [(token.start, token.end) for token in tokens if token.kind in CODE_KINDS]
+
+
+def is_line_break(token: Token, text: str) -> bool:
+    """True for ``<br>`` style HTML tokens."""
+    return token.kind == "html" and bool(BR_TAG_RE.fullmatch(token.inner(text).strip()))
@@ -0,0 +1,578 @@
+"""Search indexes for finding questions across chapters and sections."""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from diagram_support import extract_fenced_blocks, resolve_engine
+
+TOKEN_RE = re.compile(r"[a-z0-9_+#]+")
+
+# Relative weight of a token hit per question field when ranking results.
+FIELD_WEIGHTS = {
+    "text": 2.0,
+    "choices": 1.0,
+    "explanation": 0.5,
+}
+
+
+# Dice similarity a word needs to count as a fuzzy match for a query word.
+FUZZY_MIN_SIMILARITY = 0.45
+
+# Query prefixes (``prefix:value``) and the question field each one searches.
+QUERY_FIELD_ALIASES = {
+    "text": "text",
+    "q": "text",
+    "exp": "explanation",
+    "explanation": "explanation",
+    "choice": "choices",
+    "choices": "choices",
+    "meta": "meta",
+    "id": "id",
+    "num": "number",
+    "number": "number",
+    "answer": "answer",
+    "ans": "answer",
+    "type": "type",
+    "image": "image",
+    "img": "image",
+    "has": "has",
+    "lang": "lang",
+}
+
+# Fields matched exactly rather than by substring.
+EXACT_QUERY_FIELDS = {"answer", "type", "has", "lang"}
+
+# A leading "-" only negates when a word, prefix or quote follows it, so
+# literals such as "-1" or "--verbose" are searched as typed.
+QUERY_TOKEN_RE = re.compile(r'(-(?=[A-Za-z"]))?(?:([A-Za-z]+):)?(?:"([^"]*)"?|(\S+))')
+INLINE_CODE_RE = re.compile(r"`[^`\n]+`|<code>|<pre>", re.IGNORECASE)
+MATH_RE = re.compile(r"\$[^$\n]+\$|\\\(|\\\[")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search tokens (keeps c++ / c# style tokens intact)."""
+    return TOKEN_RE.findall(str(text or "").lower())
+
+
+def normalize_text(value) -> str:
+    """Collapse whitespace and lowercase text for substring comparisons."""
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def normalize_answer(value) -> str:
+    """Normalize an answer key so "b", "B" and "A, C" compare as "B" and "AC"."""
+    return "".join(sorted(ch for ch in str(value or "").upper() if ch.isalnum()))
+
+
+def question_fields(question: Dict) -> Dict:
+    """Precompute the normalized per-field values a question is searched by."""
+    choice_parts = []
+    for choice in question.get("choices", []) or []:
+        if isinstance(choice, dict):
+            choice_parts.extend([
+                choice.get("value", ""),
+                choice.get("label", ""),
+                choice.get("text", ""),
+            ])
+
+    def join(parts):
+        return normalize_text(" ".join(str(part) for part in parts if part is not None))
+
+    text = str(question.get("text", "") or "")
+    explanation = str(question.get("explanation", "") or "")
+    langs = set()
+    has_diagram = False
+    for block in extract_fenced_blocks(text) + extract_fenced_blocks(explanation):
+        if block["lang"]:
+            langs.add(block["lang"])
+        engine = resolve_engine(block["lang"], block["code"])
+        if engine:
+            langs.add(engine)
+            has_diagram = True
+
+    flags = set()
+    if question.get("image"):
+        flags.add("image")
+    if explanation.strip():
+        flags.add("explanation")
+    if choice_parts:
+        flags.add("choices")
+    if "```" in text or "```" in explanation or INLINE_CODE_RE.search(text) or INLINE_CODE_RE.search(explanation):
+        flags.add("code")
+    if MATH_RE.search(text) or MATH_RE.search(explanation):
+        flags.add("math")
+    if has_diagram:
+        flags.add("diagram")
+
+    return {
+        "text": join([text]),
+        "explanation": join([explanation]),
+        "choices": join(choice_parts),
+        "meta": join([
+            question.get("id", ""),
+            question.get("number", ""),
+            question.get("correctAnswer", ""),
+            question.get("inputType", ""),
+            question.get("image", ""),
+        ]),
+        "id": normalize_text(question.get("id", "")),
+        "number": normalize_text(question.get("number", "")),
+        "answer": normalize_answer(question.get("correctAnswer", "")),
+        "type": normalize_text(question.get("inputType", "")),
+        "image": normalize_text(question.get("image", "")),
+        "has": frozenset(flags),
+        "lang": frozenset(langs),
+    }
+
+
+class SearchQuery:
+    """A question filter compiled once from the search box text.
+
+    Syntax: ``text:thread answer:B has:image -has:explanation lang:mermaid``.
+    ``field:"quoted phrase"`` matches a phrase, ``-`` before a word, prefix
+    or quote negates a clause and bare words match the default
+    (checkbox-selected) fields. A query without any prefix, quote or
+    negation is one plain phrase, as before.
+    """
+
+    def __init__(self, raw: str) -> None:
+        self.raw = str(raw or "")
+        self.clauses: Tuple[Tuple[bool, Optional[str], str], ...] = self._parse(self.raw)
+        self.is_plain = len(self.clauses) == 1 and self.clauses[0][:2] == (False, None)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, SearchQuery) and self.clauses == other.clauses
+
+    def __hash__(self) -> int:
+        return hash(self.clauses)
+
+    def __bool__(self) -> bool:
+        return bool(self.clauses)
+
+    @property
+    def plain_text(self) -> str:
+        return self.clauses[0][2] if self.is_plain else ""
+
+    @staticmethod
+    def _parse(raw: str) -> Tuple[Tuple[bool, Optional[str], str], ...]:
+        text = normalize_text(raw)
+        if not text:
+            return ()
+
+        clauses = []
+        structured = False
+        for match in QUERY_TOKEN_RE.finditer(raw.strip()):
+            negate, prefix, phrase, word = match.groups()
+            if not match.group(0).strip():
+                continue
+            field = QUERY_FIELD_ALIASES.get((prefix or "").lower())
+            if prefix and field is None:
+                # Not a known prefix (e.g. "std::vector"), keep it as text.
+                word = f"{prefix}:{phrase if phrase is not None else word or ''}"
+                phrase = None
+            value = phrase if phrase is not None else word or ""
+            value = normalize_answer(value) if field == "answer" else normalize_text(value)
+            if not value:
+                continue
+            if negate or field or phrase is not None:
+                structured = True
+            clauses.append((bool(negate), field, value))
+
+        if not structured:
+            return ((False, None, text),)
+        return tuple(clauses)
+
+    def matches(self, fields: Dict, default_fields: Iterable[str]) -> bool:
+        """Return True when precomputed question fields satisfy every clause."""
+        for negate, field, value in self.clauses:
+            if field is None:
+                hit = any(value in fields[name] for name in default_fields)
+            elif field in EXACT_QUERY_FIELDS:
+                hit = value in fields[field] if isinstance(fields[field], frozenset) else fields[field] == value
+            else:
+                hit = value in fields[field]
+            if hit == negate:
+                return False
+        return True
+
+    def refines(self, other: Optional["SearchQuery"]) -> bool:
+        """True when every match of this query is guaranteed to match ``other``.
+
+        Used to narrow incrementally: results only need re-filtering from the
+        previous query's matches when the new query is at least as strict.
+        """
+        if not other:
+            return False
+        for old_negate, old_field, old_value in other.clauses:
+            implied = False
+            for negate, field, value in self.clauses:
+                if negate != old_negate or field != old_field:
+                    continue
+                if field in EXACT_QUERY_FIELDS:
+                    implied = value == old_value
+                elif negate:
+                    implied = value in old_value
+                else:
+                    implied = old_value in value
+                if implied:
+                    break
+            if not implied:
+                return False
+        return True
+
+
+def compile_query(raw: str) -> SearchQuery:
+    """Parse search box text into a reusable :class:`SearchQuery`."""
+    return SearchQuery(raw)
+
+
+def trigrams(word: str) -> Set[str]:
+    """Return padded character trigrams for one word ("  ab " style padding)."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Word-level trigram index for typo-tolerant lookups.
+
+    Keys (questions, sections, chapters...) are indexed by the distinct words
+    of their text. A query word is matched against the vocabulary by trigram
+    overlap, so only words sharing at least one trigram are ever scored.
+    """
+
+    def __init__(self, min_similarity: float = FUZZY_MIN_SIMILARITY) -> None:
+        self.min_similarity = min_similarity
+        self._word_grams: Dict[str, Set[str]] = {}
+        self._gram_words: Dict[str, Set[str]] = {}
+        self._word_keys: Dict[str, Set[Hashable]] = {}
+        self._key_words: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._key_words)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._key_words
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Index (or re-index) one key by the words of its text."""
+        self.remove(key)
+        words = set(tokenize(text))
+        self._key_words[key] = words
+        for word in words:
+            keys = self._word_keys.get(word)
+            if keys is None:
+                keys = self._word_keys[word] = set()
+                grams = self._word_grams[word] = trigrams(word)
+                for gram in grams:
+                    self._gram_words.setdefault(gram, set()).add(word)
+            keys.add(key)
+
+    def remove(self, key: Hashable) -> None:
+        """Forget one key; words no other key uses leave the vocabulary."""
+        words = self._key_words.pop(key, None)
+        if not words:
+            return
+        for word in words:
+            keys = self._word_keys.get(word)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if keys:
+                continue
+            del self._word_keys[word]
+            for gram in self._word_grams.pop(word, ()):
+                gram_words = self._gram_words.get(gram)
+                if gram_words is not None:
+                    gram_words.discard(word)
+                    if not gram_words:
+                        del self._gram_words[gram]
+
+    def clear(self) -> None:
+        self._word_grams.clear()
+        self._gram_words.clear()
+        self._word_keys.clear()
+        self._key_words.clear()
+
+    def similar_words(self, word: str, min_similarity: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return vocabulary words similar to ``word`` as (word, dice score), best first."""
+        word = str(word or "").lower()
+        if not word:
+            return []
+        threshold = self.min_similarity if min_similarity is None else min_similarity
+        grams = trigrams(word)
+        overlaps: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._gram_words.get(gram, ()):
+                overlaps[candidate] = overlaps.get(candidate, 0) + 1
+
+        matches = []
+        for candidate, shared in overlaps.items():
+            score = 2.0 * shared / (len(grams) + len(self._word_grams[candidate]))
+            if score >= threshold:
+                matches.append((candidate, score))
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """Return keys matching every query word approximately, ranked by similarity."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Optional[Dict[Hashable, float]] = None
+        for term in terms:
+            term_scores: Dict[Hashable, float] = {}
+            for word, similarity in self.similar_words(term):
+                for key in self._word_keys.get(word, ()):
+                    if similarity > term_scores.get(key, 0.0):
+                        term_scores[key] = similarity
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {key: score + term_scores[key]
+                          for key, score in scores.items() if key in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(key, score / len(terms)) for key, score in ranked]
+
+
+def _load_json(path: Path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def _chapter_questions(payload) -> list:
+    data = payload[0] if isinstance(payload, list) and payload else payload
+    if not isinstance(data, dict):
+        return []
+    questions = data.get("questions", [])
+    return questions if isinstance(questions, list) else []
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ProjectSearchIndex:
+    """Token inverted index over the questions of every chapter in a project.
+
+    The index is refreshed incrementally: only chapter files whose size or
+    modification time changed since the last refresh are re-read.
+    """
+
+    def __init__(self) -> None:
+        self._files: Dict[str, Dict] = {}
+        self._docs: Dict[int, Dict] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+        self._vocabulary = TrigramIndex()
+        self._next_doc_id = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def refresh(self, base_path, sections: Iterable[Dict]) -> Dict[str, int]:
+        """Sync the index with the chapter files listed by each section's chapters.json."""
+        base = Path(base_path)
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+
+        for section in sections or []:
+            section_rel = str(section.get("path", "")).strip()
+            if not section_rel:
+                continue
+            section_dir = base / section_rel
+            try:
+                chapters = _load_json(section_dir / "chapters.json")
+            except Exception:
+                continue
+            if not isinstance(chapters, list):
+                continue
+
+            for chapter in chapters:
+                if not isinstance(chapter, dict) or not chapter.get("file"):
+                    continue
+                path = section_dir / chapter["file"]
+                key = str(path)
+                if key in seen:
+                    continue
+                signature = _file_signature(path)
+                if signature is None:
+                    continue
+                seen.add(key)
+
+                entry = self._files.get(key)
+                location = {
+                    "section_id": section.get("id", ""),
+                    "section_name": section.get("name", section.get("id", "")),
+                    "section_path": section_rel,
+                    "chapter_name": chapter.get("name", chapter.get("id", "")),
+                    "chapter_file": key,
+                }
+                if entry and entry["signature"] == signature and entry["location"] == location:
+                    stats["unchanged"] += 1
+                    continue
+                self.index_file(path, location, signature)
+                stats["indexed"] += 1
+
+        for key in list(self._files):
+            if key not in seen:
+                self.remove_file(key)
+                stats["removed"] += 1
+        return stats
+
+    def index_file(self, path, location: Dict, signature=None) -> int:
+        """(Re)index every question of one chapter file and return the question count."""
+        key = str(path)
+        self.remove_file(key)
+        try:
+            questions = _chapter_questions(_load_json(Path(path)))
+        except Exception:
+            questions = []
+
+        doc_ids = []
+        for q_idx, question in enumerate(questions):
+            if not isinstance(question, dict):
+                continue
+            doc_ids.append(self._add_question(question, q_idx, location))
+
+        self._files[key] = {
+            "signature": signature if signature is not None else _file_signature(Path(path)),
+            "location": dict(location),
+            "doc_ids": doc_ids,
+        }
+        return len(doc_ids)
+
+    def remove_file(self, path) -> None:
+        """Drop every question that was indexed from one chapter file."""
+        entry = self._files.pop(str(path), None)
+        if not entry:
+            return
+        for doc_id in entry["doc_ids"]:
+            doc = self._docs.pop(doc_id, None)
+            self._doc_lengths.pop(doc_id, None)
+            if not doc:
+                continue
+            for token in doc["tokens"]:
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary.remove(token)
+                    self._sorted_tokens = None
+
+    def _add_question(self, question: Dict, q_idx: int, location: Dict) -> int:
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+
+        choice_text = " ".join(
+            str(choice.get("text", "")) for choice in question.get("choices", []) or []
+            if isinstance(choice, dict)
+        )
+        weights: Dict[str, float] = {}
+        for field, text in (
+            ("text", question.get("text", "")),
+            ("choices", choice_text),
+            ("explanation", question.get("explanation", "")),
+        ):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + weight
+
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocabulary.add(token, token)
+                self._sorted_tokens = None
+            postings[doc_id] = weight
+
+        preview = re.sub(r"\s+", " ", str(question.get("text", ""))).strip()
+        self._docs[doc_id] = dict(
+            location,
+            question_index=q_idx,
+            number=str(question.get("number", q_idx + 1)),
+            preview=preview[:120],
+            tokens=tuple(weights),
+        )
+        self._doc_lengths[doc_id] = float(sum(weights.values()) or 1.0)
+        return doc_id
+
+    def _tokens_with_prefix(self, prefix: str) -> List[str]:
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        tokens = self._sorted_tokens
+        start = bisect_left(tokens, prefix)
+        matches = []
+        for token in tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query: str, limit: int = 200) -> List[Dict]:
+        """Return ranked question hits that contain every query token.
+
+        The last token also matches as a prefix so results appear while typing.
+        Query words with no exact hit fall back to similar indexed words, so
+        a typo such as "polymorphsm" still finds "polymorphism".
+        """
+        terms = tokenize(query)
+        if not terms or not self._docs:
+            return []
+
+        total_docs = len(self._docs)
+        avg_length = sum(self._doc_lengths.values()) / total_docs
+        scores: Optional[Dict[int, float]] = None
+
+        for position, term in enumerate(terms):
+            if position == len(terms) - 1:
+                variants = [(token, 1.0 if token == term else 0.6)
+                            for token in self._tokens_with_prefix(term)]
+            else:
+                variants = [(term, 1.0)] if term in self._postings else []
+            if not variants:
+                variants = [(token, 0.5 * similarity)
+                            for token, similarity in self._vocabulary.similar_words(term)[:8]]
+
+            term_scores: Dict[int, float] = {}
+            for token, bonus in variants:
+                postings = self._postings[token]
+                idf = math.log(1.0 + total_docs / len(postings))
+                for doc_id, weight in postings.items():
+                    norm = weight / (weight + 1.2 * self._doc_lengths[doc_id] / avg_length)
+                    term_scores[doc_id] = term_scores.get(doc_id, 0.0) + idf * norm * bonus
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id]
+                          for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        results = []
+        for doc_id, score in ranked:
+            doc = self._docs[doc_id]
+            hit = {k: v for k, v in doc.items() if k != "tokens"}
+            hit["score"] = round(score, 4)
+            results.append(hit)
+        return results
@@ -0,0 +1,147 @@
+"""Thumbnail cache for image previews in the chapter editor.
+
+Thumbnails are keyed by the image's path, modification time and size, kept
+in a small in-memory LRU and written as PNG files to
+``.editor_cache/thumbnails`` so they survive restarts. Decoding a full-size
+image only happens the first time it is previewed or after it changed.
+Nothing here touches Tk: :meth:`ThumbnailCache.get` runs on a worker and
+the editor turns the returned Pillow image into a ``PhotoImage``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from editor_cache import cache_dir_for
+
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_SIZE = (360, 200)
+MEMORY_ITEMS = 64
+
+# Oldest thumbnails beyond this count are removed by prune(), which runs
+# after every PRUNE_INTERVAL new thumbnails.
+MAX_DISK_FILES = 2000
+PRUNE_INTERVAL = 100
+
+_CACHES: Dict[str, "ThumbnailCache"] = {}
+
+
+def _load_image_module():
+    try:
+        from PIL import Image
+    except Exception:
+        return None
+    return Image
+
+
+def get_thumbnail_cache(base_path) -> "ThumbnailCache":
+    """Return the shared cache of a project so every editor window reuses it."""
+    key = str(Path(base_path).resolve())
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = _CACHES[key] = ThumbnailCache(base_path)
+    return cache
+
+
+class ThumbnailCache:
+    """Two-level (memory, disk) cache of preview thumbnails. Thread-safe."""
+
+    def __init__(self, base_path, size=THUMBNAIL_SIZE, memory_items: int = MEMORY_ITEMS) -> None:
+        self.base_path = Path(base_path)
+        self.directory = cache_dir_for(self.base_path) / THUMBNAIL_DIR
+        self.size = tuple(size)
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._built = 0
+
+    def key_for(self, path, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """Cache key of ``path``'s current content, or None when it does not exist."""
+        path = Path(path)
+        try:
+            stat = stat or path.stat()
+        except OSError:
+            return None
+        raw = f"{path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def peek(self, path, stat: Optional[os.stat_result] = None):
+        """Return the thumbnail from memory without decoding anything, or None."""
+        key = self.key_for(path, stat)
+        if key is None:
+            return None
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+            return image
+
+    def get(self, path, stat: Optional[os.stat_result] = None):
+        """Return the thumbnail of ``path``, reading or building it as needed.
+
+        Returns None when the file is missing or Pillow is not installed;
+        decoding errors propagate.
+        """
+        Image = _load_image_module()
+        key = self.key_for(path, stat)
+        if Image is None or key is None:
+            return None
+        image = self.peek(path, stat)
+        if image is not None:
+            return image
+
+        thumb_path = self.directory / f"{key}.png"
+        try:
+            with Image.open(thumb_path) as cached:
+                cached.load()
+                image = cached.copy()
+        except (OSError, ValueError):
+            image = self._build(Image, Path(path), thumb_path)
+
+        with self._lock:
+            self._memory[key] = image
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return image
+
+    def _build(self, Image, source: Path, thumb_path: Path):
+        with Image.open(source) as img:
+            # JPEGs can decode directly at a reduced scale.
+            img.draft("RGB", self.size)
+            image = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+        lanczos = getattr(getattr(Image, "Resampling", Image), "LANCZOS", None)
+        image.thumbnail(self.size, lanczos)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = thumb_path.with_suffix(f".{threading.get_ident()}.tmp")
+            image.save(temp_path, format="PNG")
+            os.replace(temp_path, thumb_path)
+        except OSError:
+            return image
+        with self._lock:
+            self._built += 1
+            prune = self._built % PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+        return image
+
+    def prune(self, max_files: int = MAX_DISK_FILES) -> int:
+        """Delete the least recently written thumbnails beyond ``max_files``."""
+        try:
+            files = sorted(self.directory.glob("*.png"), key=lambda item: item.stat().st_mtime)
+        except OSError:
+            return 0
+        removed = 0
+        for path in files[:max(0, len(files) - max_files)]:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
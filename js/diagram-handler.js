@@ -5,6 +5,7 @@
  * - map subjects to preferred diagram engines
  * - auto-detect diagram code blocks from fenced language hints
  * - lazy-load rendering libraries only when needed
+ * - use SVGs pre-rendered by the builder and load an engine only as a fallback
  * - allow future engine registration without touching exam flow
  */
 const DiagramHandler = {
@@ -20,6 +21,8 @@ const DiagramHandler = {
         algorithm: ['mermaid']
     },
     _viewBoxPrecision: 2,
+    _prerenderedManifestUrl: 'assets/diagrams/manifest.json',
+    _prerenderedManifest: null,
 
     init() {
         if (this._initialized) return;
@@ -193,6 +196,48 @@ const DiagramHandler = {
         return candidates;
     },
 
+    _loadPrerenderedManifest() {
+        if (!this._prerenderedManifest) {
+            this._prerenderedManifest = fetch(this._prerenderedManifestUrl)
+                .then(response => (response.ok ? response.json() : {}))
+                .catch(() => ({}));
+        }
+        return this._prerenderedManifest;
+    },
+
+    // cyrb53 over UTF-16 code units; must match diagram_key() in builder/diagram_prerender.py.
+    _diagramKey(code) {
+        const text = String(code || '').trim();
+        let h1 = 0xdeadbeef;
+        let h2 = 0x41c6ce57;
+        for (let i = 0; i < text.length; i++) {
+            const ch = text.charCodeAt(i);
+            h1 = Math.imul(h1 ^ ch, 2654435761);
+            h2 = Math.imul(h2 ^ ch, 1597334677);
+        }
+        h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507);
+        h1 ^= Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+        h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507);
+        h2 ^= Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+        return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+    },
+
+    async _renderPrerendered(code, engineName, mountEl) {
+        const manifest = await this._loadPrerenderedManifest();
+        const entries = manifest && manifest[engineName];
+        const url = entries && entries[this._diagramKey(code)];
+        if (!url) return false;
+
+        try {
+            const response = await fetch(url);
+            if (!response.ok) return false;
+            mountEl.innerHTML = await response.text();
+            return !!mountEl.querySelector('svg');
+        } catch (_) {
+            return false;
+        }
+    },
+
     _raf() {
         return new Promise(resolve => requestAnimationFrame(() => resolve()));
     },
@@ -310,8 +355,12 @@ const DiagramHandler = {
         pre.replaceWith(mount);
 
         try {
-            await engine.load();
-            await engine.render(candidate.code, mount);
+            // Builder-rendered SVGs skip loading the engine entirely.
+            const prerendered = await this._renderPrerendered(candidate.code, engineName, mount);
+            if (!prerendered) {
+                await engine.load();
+                await engine.render(candidate.code, mount);
+            }
             await this._waitForRenderStability();
 
             // Normalize SVG viewBox and dimensions for responsive scaling
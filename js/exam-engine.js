@@ -19,6 +19,7 @@ const app = {
     _resultsFilterHintVisible: true,
     _resultStatusByIndex: [],
     _subjectIconObserver: null, // IntersectionObserver for subject icons
+    _imageManifest: {},      // Image path -> builder variants/metadata, merged per loaded subject
     _themeToggleOriginalParent: null,
     _examControlsPlaceholder: null,
     _controlLabelSyncBound: null,
@@ -647,6 +648,8 @@ const app = {
                     description: subjectConfig.description,
                     iconEmoji: iconMeta.emoji,
                     iconPath: iconMeta.path,
+                    iconSprite: subjectConfig.iconSprite || null,
+                    path: subjectConfig.path || '',
                     chaptersConfig: subjectConfig.chapters || [], // Save config for later loading
                     chapters: [], // Loaded data goes here
                     loaded: false // Track if chapters are loaded
@@ -1047,12 +1050,34 @@ const app = {
         const fallback = this.escapeHtml(subject.iconEmoji || '📚');
         if (!subject.iconPath) return fallback;
 
-        const src = this.escapeHtml(subject.iconPath);
         const sid = this.escapeHtml(subject.id || '');
         const alt = this.escapeHtml(`${subject.name || 'Subject'} icon`);
+        const sprite = typeof EXAM_ICON_SPRITE !== 'undefined' ? EXAM_ICON_SPRITE : null;
+        if (sprite && subject.iconSprite) {
+            return this._renderSubjectIconSprite(subject.iconSprite, sprite, sid, alt);
+        }
+
+        const src = this.escapeHtml(subject.iconPath);
         return `<img class="subject-icon-image" data-src="${src}" alt="${alt}" loading="lazy" decoding="async" fetchpriority="low" data-sid="${sid}">`;
     },
 
+    /**
+     * Show one cell of the builder's section icon sprite sheet
+     * (EXAM_ICON_SPRITE), so all subject cards share a single image request.
+     */
+    _renderSubjectIconSprite(position, sprite, sid, alt) {
+        const cell = sprite.cell;
+        const columns = sprite.width / cell;
+        const rows = sprite.height / cell;
+        // Percent positions map the cell's corner onto the element's corner.
+        const posX = columns > 1 ? (position.x / (sprite.width - cell)) * 100 : 0;
+        const posY = rows > 1 ? (position.y / (sprite.height - cell)) * 100 : 0;
+        const style = `background-image: url('${this.escapeHtml(sprite.src)}'); `
+            + `background-size: ${columns * 100}% ${rows * 100}%; `
+            + `background-position: ${posX}% ${posY}%;`;
+        return `<span class="subject-icon-sprite" role="img" aria-label="${alt}" data-sid="${sid}" style="${style}"></span>`;
+    },
+
     _hydrateDeferredImage(img, prioritize = false) {
         if (!img || img.dataset.loaded === '1') return;
         const src = img.getAttribute('data-src');
@@ -1071,12 +1096,76 @@ const app = {
             }
         }
 
+        if (img.dataset.srcset) {
+            img.sizes = img.dataset.sizes || '';
+            img.srcset = img.dataset.srcset;
+        }
         img.src = src;
         if (typeof img.decode === 'function') {
             img.decode().catch(() => { });
         }
     },
 
+    /** Builder manifest entry of a question's image, or null. */
+    _imageInfo(question) {
+        const image = question && String(question.image || '').trim().replace(/\\/g, '/');
+        return (image && this._imageManifest[image]) || null;
+    },
+
+    /**
+     * Attach the builder's responsive WebP variants (the image manifest's
+     * srcset) so the browser picks the smallest adequate file.
+     */
+    _applyImageVariants(img, question, deferred) {
+        const info = this._imageInfo(question);
+        if (!info || !Array.isArray(info.srcset)) return;
+
+        const srcset = info.srcset
+            .filter(item => item && item.src && item.width > 0)
+            .map(item => `${item.src} ${item.width}w`)
+            .join(', ');
+        if (!srcset) return;
+
+        const sizes = '(max-width: 768px) 100vw, 720px';
+        if (deferred) {
+            img.dataset.srcset = srcset;
+            img.dataset.sizes = sizes;
+        } else {
+            img.sizes = sizes;
+            img.srcset = srcset;
+        }
+    },
+
+    /**
+     * Reserve the final box of a question image from the builder's image
+     * manifest and paint its inline placeholder until the real image loads,
+     * so lazy images do not shift the layout.
+     */
+    _applyImageMeta(img, question) {
+        const meta = this._imageInfo(question);
+        if (!meta || !(meta.width > 0) || !(meta.height > 0)) return;
+
+        // Same box the browser computes for the loaded image under max-width/max-height.
+        img.style.aspectRatio = `${meta.width} / ${meta.height}`;
+        img.style.width = `min(100%, ${meta.width}px, calc(var(--question-image-max-h) * ${meta.width / meta.height}))`;
+        img.style.height = 'auto';
+
+        if (!meta.placeholder && !meta.color) return;
+        img.classList.add('has-placeholder');
+        if (meta.color) img.style.backgroundColor = meta.color;
+        if (meta.placeholder) img.style.backgroundImage = `url("${meta.placeholder}")`;
+
+        const clear = () => {
+            // Deferred images first load a 1px stand-in; keep the placeholder until the real source.
+            if (img.dataset.src && img.getAttribute('src') !== img.dataset.src) return;
+            img.classList.remove('has-placeholder');
+            img.style.backgroundImage = '';
+            img.style.backgroundColor = '';
+            img.removeEventListener('load', clear);
+        };
+        img.addEventListener('load', clear);
+    },
+
     _loadSubjectIconImage(img, prioritize = false) {
         this._hydrateDeferredImage(img, prioritize);
     },
@@ -1204,6 +1293,20 @@ const app = {
             }, { once: true });
         });
 
+        // Same fallback for the sprite sheet, which as a CSS background reports no errors itself.
+        const spriteIcons = grid.querySelectorAll('.subject-icon-sprite');
+        if (spriteIcons.length) {
+            const probe = new Image();
+            probe.addEventListener('error', () => {
+                spriteIcons.forEach((el) => {
+                    const sid = el.getAttribute('data-sid') || '';
+                    const subject = this.subjects.find(s => s.id === sid);
+                    el.replaceWith(document.createTextNode((subject && subject.iconEmoji) || this.getIconForSubject(sid)));
+                });
+            }, { once: true });
+            probe.src = EXAM_ICON_SPRITE.src;
+        }
+
         this._initSubjectIconLazyLoad(grid);
     },
 
@@ -1257,6 +1360,7 @@ const app = {
         const MAX_CONCURRENT = 4;
         const configs = subject.chaptersConfig.filter(ch => ch.file);
         const chapters = [];
+        const manifestLoad = this._fetchImageManifest(subject, signal);
 
         for (let i = 0; i < configs.length; i += MAX_CONCURRENT) {
             if (signal.aborted) break;
@@ -1271,11 +1375,25 @@ const app = {
             }
         }
 
+        Object.assign(this._imageManifest, await manifestLoad);
         subject.chapters = chapters;
         subject.loaded = true;
         this._chapterLoadController = null;
     },
 
+    /** Fetch the builder's image manifest of a subject; resolves to {} when there is none */
+    async _fetchImageManifest(subject, signal) {
+        if (!subject.path) return {};
+        try {
+            const response = await fetch(`./${subject.path}/images/manifest.json`, { signal });
+            if (!response.ok) return {};
+            const data = await response.json();
+            return (data && data.images) || {};
+        } catch (_) {
+            return {};
+        }
+    },
+
     /** Fetch and parse a single chapter file */
     async _fetchChapter(chInfo, signal, subjectId = '') {
         try {
@@ -1668,6 +1786,8 @@ const app = {
             const imgWrapper = document.createElement('div');
             imgWrapper.className = 'question-image';
             const img = document.createElement('img');
+            this._applyImageVariants(img, question, false);
+            this._applyImageMeta(img, question);
             img.src = question.image;
             img.alt = 'Question illustration';
             img.loading = 'lazy';
@@ -2435,6 +2555,8 @@ const app = {
             imgWrap.className = 'question-image';
             const img = document.createElement('img');
             img.dataset.src = question.image;
+            this._applyImageVariants(img, question, true);
+            this._applyImageMeta(img, question);
             img.src = 'data:image/gif;base64,R0lGODlhAQABAAAAACw=';
             img.alt = 'Question illustration';
             img.loading = 'lazy';